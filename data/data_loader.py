@@ -1,23 +1,16 @@
-import os
-import zipfile
+import argparse
 
-path = r""
+from src.classes.ArchiveConverter import ArchiveConverter
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest the zip archives of the recordings without extracting them.')
+    parser.add_argument('path', help='Directory containing the zip archives')
+    parser.add_argument('--target', default='raw', help='Directory the recordings are written to')
+    parser.add_argument('--format', choices=ArchiveConverter.FORMATS, default='columns',
+                        help="'columns' converts the CSV files into column stores for MobileData, 'csv' copies them")
+    parser.add_argument('--workers', type=int, default=None, help='Archives converted at the same time')
+    args = parser.parse_args()
 
-def extract_files(directory):
-    files = os.listdir(directory)
-
-    for file in files:
-        file_path = os.path.join(directory, file)
-        # most files are zipped in that case it must be extracted
-        if file.endswith('.zip'):
-            folder_name = os.path.splitext(file)[0]
-            extract_path = os.path.join('raw', folder_name)
-            # create new directory to keep the data structure
-            os.makedirs(extract_path, exist_ok=True)
-
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
-
-
-extract_files(path)
+    results = ArchiveConverter(args.path, args.target, args.format, args.workers).run()
+    print(str(list(results.values()).count('converted')) + ' archives converted, '
+          + str(list(results.values()).count('skipped')) + ' skipped')
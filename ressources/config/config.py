@@ -5,7 +5,12 @@
 # Configuration for drilling process
 drilling_config = {
     'process': 'PROCESS_23;PROCESS_28',  # Processes to be handled. To handle all existing processes set 'all'
+    'catalog_pattern': None,  # Pattern of the processes selected from the dataset catalog instead of 'process'
     'target_path': '../data/segmented/drilling_data',  # Path to save segmented data
+    'checkpoint_path': None,  # Path of run manifests to resume (e.g. '../data/checkpoints/drilling_data', None = off)
+    'resample': None,  # Uniform time grid of the recording: 'clean', 'interpolate' or 'mean' (None = raw timestamps)
+    'sample_period': None,  # Period of the uniform grid (e.g. '10ms', None = median sampling interval)
+    'max_gap': None,  # Longest interval bridged by the grid (e.g. '1s', None = no detected gap), split at longer gaps
     'estimated_cps': 360,  # Estimated change points (180 drills * 2)
     'model': 'l2',  # Model type
     'model_parameters': 2,  # Model parameters
@@ -13,15 +18,29 @@ drilling_config = {
     'algorithm': 'PELT',  # Algorithm used for segmentation
     'min_segment_size': 500,  # Minimum segment size
     'jump_points': 50,  # Jump points in data
-    'chunk_size': 40000,  # Chunk size for processing
+    'chunk_size': 40000,  # Chunk size for processing ('auto' = largest size within the memory budget per worker)
+    'chunk_window': None,  # Duration of a chunk aligned to machine time (e.g. '10min'), replaces chunk_size if set
     'overlap_region': 300,  # Overlap region size
     'min_cp_distance': 1400,  # Minimum change point distance
-    'filter_close_cps': True  # Whether to filter close change points
+    'filter_close_cps': True,  # Whether to filter close change points
+    'features': False,  # Whether to write a table of segment features (duration, mean, RMS, peak, energy)
+    'backend': 'process',  # Execution of the chunks: 'serial', 'thread', 'process' or 'auto' (chosen per recording)
+    'memory_budget': None,  # Memory budget in MB for all chunks processed at the same time (None = unlimited)
+    'chunk_timeout': None,  # Deadline in seconds for the detection on a single chunk (None = no deadline)
+    'max_retries': 1,  # Retries of a chunk that exceeded its deadline or whose worker died
+    'fallback': {'algorithm': 'BinSeg', 'jump_points': 200},  # Detector used once the retries are exhausted
+    'pipeline': False,  # Whether loading and writing of recordings overlap with the detection of other recordings
+    'prefetch': 1  # Number of recordings loaded ahead of and waiting behind the detection in pipelined mode
 }
 
 smoothing_config = {
     'process': 'PROCESS_26',  # Processes to be handled. To handle all existing processes set 'all'
+    'catalog_pattern': None,  # Pattern of the processes selected from the dataset catalog instead of 'process'
     'target_path': '../data/segmented/smoothing_data',  # Path to save segmented data
+    'checkpoint_path': None,  # Path of run manifests to resume (e.g. '../data/checkpoints/smoothing_data', None = off)
+    'resample': None,  # Uniform time grid of the recording: 'clean', 'interpolate' or 'mean' (None = raw timestamps)
+    'sample_period': None,  # Period of the uniform grid (e.g. '10ms', None = median sampling interval)
+    'max_gap': None,  # Longest interval bridged by the grid (e.g. '1s', None = no detected gap), split at longer gaps
     'estimated_cps': 360,  # Estimated change points (180 smoothings * 2)
     'model': 'rbf',  # Model type
     'model_parameter': 2,  # Model parameters
@@ -29,9 +48,18 @@ smoothing_config = {
     'algorithm': 'KernelCPD',  # Algorithm used for segmentation
     'min_segment_size': 1000,  # Minimum segment size
     'jump_points': 500,  # Jump points in data
-    'chunk_size': 10000,  # Chunk size for processing
+    'chunk_size': 10000,  # Chunk size for processing ('auto' = largest size within the memory budget per worker)
+    'chunk_window': None,  # Duration of a chunk aligned to machine time (e.g. '10min'), replaces chunk_size if set
     'overlap_region': 1000,  # Overlap region size
-    'filter_close_cps': False  # Whether to filter close change points
+    'filter_close_cps': False,  # Whether to filter close change points
+    'features': False,  # Whether to write a table of segment features (duration, mean, RMS, peak, energy)
+    'backend': 'process',  # Execution of the chunks: 'serial', 'thread', 'process' or 'auto' (chosen per recording)
+    'memory_budget': None,  # Memory budget in MB for all chunks processed at the same time (None = unlimited)
+    'chunk_timeout': None,  # Deadline in seconds for the detection on a single chunk (None = no deadline)
+    'max_retries': 1,  # Retries of a chunk that exceeded its deadline or whose worker died
+    'fallback': {'algorithm': 'BinSeg', 'model': 'l2', 'jump_points': 1000},  # Detector once retries are exhausted
+    'pipeline': False,  # Whether loading and writing of recordings overlap with the detection of other recordings
+    'prefetch': 1  # Number of recordings loaded ahead of and waiting behind the detection in pipelined mode
 }
 
 # List of segmentation configurations
@@ -40,6 +68,47 @@ seg_config = [
     ('smoothing_config', smoothing_config)
 ]
 
+# Configuration for the dataset catalog
+
+catalog_config = {
+    'data_root': '../data/raw',  # Directory searched for recordings. To disable the catalog set None
+    'index_path': '../data/catalog.json',  # Path of the index holding the metadata of the recordings
+    'name_pattern': r'(process_\d+)',  # The first group found in the file name is the process name (upper case)
+    'hash_content': True  # Whether to record the content hash of every recording (reads every new file once)
+}
+
+# Modules that register additional detector engines in the AlgorithmRegistry when imported (e.g. in-house engines)
+algorithm_plugins = []
+
+# Configuration for the result cache
+
+# Path of the content-addressed cache of segmentation results. To disable the cache set None
+cache_path = '../data/cache'
+
+# Maximum size of the result cache in MB, least recently used results are evicted first
+cache_max_size = 4096
+
+# Configuration for the result store
+
+# Path of the store recording the change points, segments and quality test outcomes of every run. To enable set a path,
+# e.g. '../data/results'
+result_store_path = None
+
+# Number of runs kept in the result store, older runs are deleted with their signal partitions (None = all)
+result_store_max_runs = 20
+
+# Configuration for distributing the chunks to worker agents on other machines (src/worker.py)
+
+distributed_config = {
+    'enabled': False,  # Whether main.py distributes the chunks instead of using a local process pool
+    'host': '127.0.0.1',  # Host the coordinator listens on ('0.0.0.0' to accept workers of other machines)
+    'port': 8766,  # Port the coordinator listens on
+    'authkey_env': 'SEGMENTATION_AUTHKEY',  # Environment variable holding the shared key of coordinator and workers
+    'min_workers': 1,  # Number of worker slots main.py waits for before the segmentation starts
+    'worker_timeout': 300,  # Maximum time in seconds to wait for the worker slots (at startup and for queued chunks)
+    'max_requeues': 3,  # Number of times a chunk is handed out again after its worker was lost
+}
+
 # Configuration for testing
 
 # Enable or disable testing mode
@@ -72,3 +141,56 @@ test_config = [
     ('drill_test_config', drill_test_config),
     ('smooth_test_config', smooth_test_config)
 ]
+
+# Configuration for instrumentation
+
+# Enable or disable recording of spans (load, scale, chunk, detect, merge, filter, label, write) and counters
+instrumentation_enabled = False
+
+# Path of the JSON-lines file the recorded spans and counters are appended to
+instrumentation_path = '../data/metrics/segmentation_metrics.jsonl'
+
+# Configuration for the ingestion of live machine data
+
+ingestion_config = {
+    'model': 'l2',  # Model type
+    'model_parameters': 2,  # Model parameters
+    'penalty_term': 'BIC',  # Penalty term for model selection
+    'algorithm': 'PELT',  # Algorithm used for segmentation
+    'min_segment_size': 500,  # Minimum segment size
+    'jump_points': 50,  # Jump points in data
+    'estimated_cps': 20,  # Estimated change points per window
+    'window_size': 20000,  # Number of frames per window
+    'overlap': 1000,  # Number of frames shared by two consecutive windows
+    'workers': None,  # Number of worker processes shared by all sources (None = number of CPUs)
+    'max_in_flight': None,  # Maximum number of windows detected at the same time (None = 2 * workers)
+    'sources': [
+        # type: 'socket' (port or path), 'csv' (path of a file that is still written) or 'simulated'
+        {'type': 'simulated', 'name': 'SPINDLE_1', 'n_frames': 200000, 'rate': 10000},
+        {'type': 'socket', 'name': 'SPINDLE_2', 'port': 5002},
+    ]
+}
+
+# Configuration for the segmentation server
+
+server_config = {
+    'host': '127.0.0.1',  # Host to listen on, keep it local as jobs may read any file the server can access
+    'port': 8765,  # Port to listen on
+    'workers': None,  # Number of warm worker processes (None = half of the CPUs)
+    'job_runners': 1,  # Number of jobs executed at the same time, all jobs share the warm workers
+    'job_ttl': 3600,  # Seconds a finished job and its result are kept (None = until max_finished_jobs is exceeded)
+    'max_finished_jobs': 1000  # Maximum number of finished jobs kept, the oldest are dropped first (None = unlimited)
+}
+
+# Configuration for the import-time report (src/import_report.py)
+
+# Maximum import time in seconds of every entry point and of the worker bootstrap (the module a worker process imports
+# to run a chunk). The report fails if one of them is exceeded
+import_time_budget = {
+    'src.main': 3.0,
+    'src.ingest': 3.0,
+    'src.server': 3.0,
+    'src.client': 0.5,
+    'src.classes.ChunkProcessor': 2.5,  # worker bootstrap of the segmentation
+    'src.classes.IngestionService': 2.5,  # worker bootstrap of the ingestion
+}
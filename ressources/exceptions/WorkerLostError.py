@@ -0,0 +1,8 @@
+from ressources.exceptions.SegmentationError import SegmentationError
+
+
+class WorkerLostError(SegmentationError):
+    """Raised for a task whose remote workers were lost more often than allowed."""
+
+    def __init__(self, message):
+        super().__init__(message)
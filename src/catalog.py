@@ -0,0 +1,17 @@
+import argparse
+
+from ressources.config.config import catalog_config
+from src.classes.DatasetCatalog import DatasetCatalog
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Index the recordings of the data root and list them.')
+    parser.add_argument('pattern', nargs='?', default='all', help="Process names to list, e.g. 'PROCESS_2*'")
+    parser.add_argument('--root', default=catalog_config['data_root'], help='Directory searched for recordings')
+    parser.add_argument('--index', default=catalog_config['index_path'], help='Path of the index')
+    args = parser.parse_args()
+
+    catalog = DatasetCatalog(args.root, args.index, catalog_config['name_pattern'], catalog_config['hash_content'])
+    print(str(catalog.refresh()) + ' recordings indexed')
+    entries = catalog.entries()
+    selected = [process.value for process in catalog.select(args.pattern)]
+    print(entries[entries['path'].isin(selected)].drop(columns=['path', 'content_hash']).to_string(index=False))
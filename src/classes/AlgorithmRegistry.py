@@ -0,0 +1,243 @@
+import importlib
+
+import ruptures as rpt
+
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.BoundedDynp import BoundedDynp
+from src.classes.PrefixCost import PrefixCost
+from src.classes.SlidingWindow import SlidingWindow
+
+# cost models of ruptures usable by every search method, KernelCPD only supports the kernels
+RUPTURES_MODELS = ('l1', 'l2', 'normal', 'rbf', 'cosine', 'linear', 'clinear', 'rank', 'mahalanobis', 'ar')
+RUPTURES_KERNELS = ('linear', 'rbf', 'cosine')
+
+
+class AlgorithmInfo:
+    """
+    Detector engine and its capability and cost metadata.
+
+    An engine is any class that is created with keyword arguments and offers 'fit(signal)' and 'predict(pen=...)' or
+    'predict(n_bkps=...)' like the search methods of ruptures.
+    """
+
+    def __init__(self, name, engine, models=None, params=('jump', 'min_size'), predict=('pen', 'n_bkps'),
+                 model_keyword='model', time_complexity='O(n)', time_exponent=1.0, memory=None, kernel_gram=True):
+        """
+        Initialize the AlgorithmInfo.
+
+        Args:
+            name: The name of the algorithm as used in the configuration (case-insensitive).
+            engine: The engine class.
+            models: The supported models (None = any model).
+            params: The honored construction parameters out of 'jump', 'min_size' and 'width'.
+            predict: The accepted stopping criteria out of 'pen' and 'n_bkps'.
+            model_keyword: The keyword the model is passed with to the engine (e.g. 'kernel' for KernelCPD).
+            time_complexity: Human-readable time complexity (n = number of samples, K = number of change points).
+            time_exponent: Exponent of the number of admissible indexes (n / jump) in the run time, used for
+                scheduling.
+            memory: Function (chunk_len, jump_points, n_cps) returning the memory in bytes the search needs in
+                addition to the signal and the cost function (optional).
+            kernel_gram: Whether the kernel models ('rbf', 'cosine') build the n x n gram matrix.
+        """
+        self.name = name.lower()
+        self.engine = engine
+        self.models = None if models is None else tuple(m.lower() for m in models)
+        self.params = tuple(params)
+        self.predict = tuple(predict)
+        self.model_keyword = model_keyword
+        self.time_complexity = time_complexity
+        self.time_exponent = time_exponent
+        self._memory = memory
+        self.kernel_gram = kernel_gram
+
+    def supports_model(self, model):
+        """
+        Check whether a model is supported.
+
+        Args:
+            model: The name of the model.
+
+        Returns:
+            True if the engine supports the model.
+        """
+        return self.models is None or model.lower() in self.models
+
+    def create(self, model, min_size=None, jump=None, width=None):
+        """
+        Create an engine instance. Parameters the engine does not honor are not passed.
+
+        Args:
+            model: The model used for change point detection.
+            min_size: Minimum segment size (optional).
+            jump: Number of jump points (optional).
+            width: Window size (optional).
+
+        Returns:
+            The engine instance.
+        """
+        kwargs = {self.model_keyword: model}
+        for param, value in (('min_size', min_size), ('jump', jump), ('width', width)):
+            if value is not None and param in self.params:
+                kwargs[param] = value
+        return self.engine(**kwargs)
+
+    def estimate_memory(self, model, chunk_len, n_dims=1, jump_points=1, n_cps=None):
+        """
+        Estimate the peak memory of the detection of change points on a single chunk.
+
+        The estimate covers the copies of the signal, the gram matrix of kernel based costs (n x n) and the memory of
+        the search method itself.
+
+        Args:
+            model: The model used for change point detection.
+            chunk_len: The number of samples in the chunk.
+            n_dims: The number of dimensions of the signal.
+            jump_points: The number of jump points.
+            n_cps: The number of change points to detect per chunk (optional).
+
+        Returns:
+            The estimated memory in bytes.
+        """
+        n_cps = int(n_cps) + 1 if n_cps is not None else 1
+        memory = 4 * chunk_len * n_dims * 8  # chunk, pickled copy, values and copy of the cost function
+        if self.kernel_gram and model.lower() in ('rbf', 'cosine'):
+            memory += int(2.5 * chunk_len ** 2 * 8)  # condensed distances, square matrix and exponential
+        if self._memory is not None:
+            memory += self._memory(chunk_len, max(jump_points or 1, 1), n_cps)
+        return memory
+
+    def estimate_cost(self, chunk_len, jump_points=1):
+        """
+        Estimate the relative run time of the detection on a single chunk.
+
+        Args:
+            chunk_len: The number of samples in the chunk.
+            jump_points: The number of jump points.
+
+        Returns:
+            The run time in arbitrary units, only comparable between chunks of the same algorithm.
+        """
+        return (chunk_len / max(jump_points or 1, 1)) ** self.time_exponent
+
+    def max_chunk_size(self, model, memory_budget, n_dims=1, jump_points=1, n_cps=None, upper=10 ** 8):
+        """
+        Get the largest chunk size whose estimated memory fits into a budget.
+
+        Args:
+            model: The model used for change point detection.
+            memory_budget: The memory available for a single chunk in bytes.
+            n_dims: The number of dimensions of the signal.
+            jump_points: The number of jump points.
+            n_cps: The number of change points to detect per chunk (optional).
+            upper: The largest chunk size considered.
+
+        Returns:
+            The chunk size or 0 if not even a chunk of a single sample fits.
+        """
+        low, high = 0, upper
+        while low < high:  # the estimate grows monotonically with the chunk size
+            mid = (low + high + 1) // 2
+            if self.estimate_memory(model, mid, n_dims, jump_points, n_cps) <= memory_budget:
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+
+class AlgorithmRegistry:
+    """
+    Registry of the detector engines available to CPDetector.
+
+    The engines of ruptures are registered by default. Further engines are registered with 'register', either directly
+    or from a plugin module listed in 'algorithm_plugins' of the configuration, which is imported on the first lookup.
+    """
+    _algorithms = {}
+    _plugins_loaded = False
+
+    @classmethod
+    def register(cls, info: AlgorithmInfo, replace=False):
+        """
+        Register a detector engine.
+
+        Args:
+            info: The AlgorithmInfo of the engine.
+            replace: Whether an engine with the same name may be replaced.
+
+        Raises:
+            SegmentationError: If an engine with the same name is already registered and replace is False.
+        """
+        if info.name in cls._algorithms and not replace:
+            raise SegmentationError('Algorithm already registered: ' + info.name)
+        cls._algorithms[info.name] = info
+
+    @classmethod
+    def get(cls, name) -> AlgorithmInfo:
+        """
+        Get the AlgorithmInfo of a registered engine.
+
+        Args:
+            name: The name of the algorithm (case-insensitive).
+
+        Returns:
+            The AlgorithmInfo.
+
+        Raises:
+            SegmentationError: If no engine is registered with the name.
+        """
+        cls._load_plugins()
+        info = cls._algorithms.get(name.lower())
+        if info is None:
+            raise SegmentationError('Algorithm class not defined: ' + name)
+        return info
+
+    @classmethod
+    def names(cls):
+        """
+        Get the names of all registered engines.
+
+        Returns:
+            List of algorithm names.
+        """
+        cls._load_plugins()
+        return list(cls._algorithms)
+
+    @classmethod
+    def _load_plugins(cls):
+        """Import the plugin modules of the configuration once; they register their engines on import."""
+        if cls._plugins_loaded:
+            return
+        cls._plugins_loaded = True
+        from ressources.config.config import algorithm_plugins
+        for module in algorithm_plugins:
+            importlib.import_module(module)
+
+
+AlgorithmRegistry.register(AlgorithmInfo('pelt', rpt.Pelt, RUPTURES_MODELS, predict=('pen',),
+                                         time_complexity='O(n) on average, O(n^2) in the worst case',
+                                         time_exponent=1.0))
+AlgorithmRegistry.register(AlgorithmInfo('binseg', rpt.Binseg, RUPTURES_MODELS, time_complexity='O(n log n)',
+                                         time_exponent=1.1))
+AlgorithmRegistry.register(AlgorithmInfo('bottomup', rpt.BottomUp, RUPTURES_MODELS, time_complexity='O(n log n)',
+                                         time_exponent=1.1))
+AlgorithmRegistry.register(AlgorithmInfo('window', rpt.Window, RUPTURES_MODELS, params=('jump', 'min_size', 'width'),
+                                         time_complexity='O(n)', time_exponent=1.0))
+# opt-in: prefix sums of the statistics at the window borders, the rbf approximation has the most statistics per
+# position
+AlgorithmRegistry.register(AlgorithmInfo('slidingwindow', SlidingWindow, SlidingWindow.MODELS,
+                                         params=('jump', 'min_size', 'width'), time_complexity='O(n)',
+                                         time_exponent=1.0, kernel_gram=False,
+                                         memory=lambda n, jump, n_cps: (3 * (n // jump) + 2 + PrefixCost.BLOCK_ROWS)
+                                         * (PrefixCost.N_FEATURES + 1) * 8))
+# lru cache entries of the partial segmentations, one per pair of admissible indexes and number of change points
+AlgorithmRegistry.register(AlgorithmInfo('dynp', rpt.Dynp, RUPTURES_MODELS, predict=('n_bkps',),
+                                         time_complexity='O(K n^2)', time_exponent=2.0,
+                                         memory=lambda n, jump, n_cps: (n // jump + 1) ** 2 // 2 * n_cps * 250))
+# opt-in: rows of back pointers, prefix sums at the admissible indexes and one block of evaluated pairs
+AlgorithmRegistry.register(AlgorithmInfo('boundeddynp', BoundedDynp, BoundedDynp.MODELS, predict=('n_bkps',),
+                                         time_complexity='O(K n^2)', time_exponent=2.0, kernel_gram=False,
+                                         memory=lambda n, jump, n_cps: (n // jump + 2) * (n_cps * 4 + 2 * (
+                                             PrefixCost.N_FEATURES + 1) * 8) + BoundedDynp.VALUES_PER_BLOCK * 8 * 3))
+# cost and path matrix of the dynamic programming in C
+AlgorithmRegistry.register(AlgorithmInfo('kernelcpd', rpt.KernelCPD, RUPTURES_KERNELS, model_keyword='kernel',
+                                         time_complexity='O(K n^2)', time_exponent=2.0,
+                                         memory=lambda n, jump, n_cps: (n + 1) * n_cps * 16))
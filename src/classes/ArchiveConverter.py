@@ -0,0 +1,139 @@
+import concurrent.futures
+import json
+import os
+import shutil
+import warnings
+import zipfile
+
+import pandas as pd
+
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.ColumnStore import ColumnStore
+from src.classes.Utility import Utility
+
+
+class ArchiveConverter:
+    """
+    Ingests the zip archives of the recordings without extracting them first.
+
+    Every CSV member of an archive is read as a stream and written either as CSV or straight into a ColumnStore, so
+    the archives are never extracted to disk in between. The archives are converted in parallel processes. An archive
+    is skipped if it was converted before with the same content and format, which is recorded in a marker file in its
+    target folder.
+    """
+    FORMATS = ('csv', 'columns')
+    MARKER_FILE = '.ingested.json'
+
+    def __init__(self, source_path, target_path='raw', output_format='columns', num_workers=None,
+                 chunksize=500000):
+        """
+        Initialize the ArchiveConverter.
+
+        Args:
+            source_path: The directory containing the zip archives.
+            target_path: The directory the recordings are written to, one folder per archive.
+            output_format: 'columns' to convert the CSV files into column stores or 'csv' to copy them.
+            num_workers: Number of archives converted at the same time (None = number of CPUs).
+            chunksize: Number of rows parsed at once while a CSV file is converted.
+
+        Raises:
+            SegmentationError: If the output format is not defined.
+        """
+        if output_format not in self.FORMATS:
+            raise SegmentationError('Output format not defined: ' + str(output_format))
+        self._source_path = source_path
+        self._target_path = target_path
+        self._output_format = output_format
+        self._num_workers = num_workers or os.cpu_count() or 1
+        self._chunksize = chunksize
+
+    def run(self):
+        """
+        Convert all archives of the source directory.
+
+        Returns:
+            Dictionary mapping the archive names to 'converted' or 'skipped'.
+        """
+        archives = sorted(file for file in os.listdir(self._source_path) if file.endswith('.zip'))
+        args = [(os.path.join(self._source_path, archive), self._target_path, self._output_format, self._chunksize)
+                for archive in archives]
+        # the largest archives first, so a large archive does not start last and delay the whole run
+        args.sort(key=lambda arg: os.path.getsize(arg[0]), reverse=True)
+        results = {}
+        if self._num_workers <= 1 or len(args) <= 1:
+            for arg in args:
+                results[os.path.basename(arg[0])] = ArchiveConverter._convert_archive(*arg)
+                print(os.path.basename(arg[0]) + ': ' + results[os.path.basename(arg[0])])
+            return results
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(self._num_workers, len(args))) as executor:
+            futures = {executor.submit(ArchiveConverter._convert_archive, *arg): os.path.basename(arg[0])
+                       for arg in args}
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+                print(futures[future] + ': ' + results[futures[future]])
+        return results
+
+    @staticmethod
+    def _convert_archive(archive_path, target_path, output_format, chunksize):
+        """
+        Convert the CSV members of an archive. Runs inside a worker process.
+
+        Args:
+            archive_path: The path of the zip archive.
+            target_path: The directory the recordings are written to.
+            output_format: 'columns' or 'csv'.
+            chunksize: Number of rows parsed at once.
+
+        Returns:
+            'converted' or 'skipped' if the archive was converted before.
+        """
+        folder = os.path.join(target_path, os.path.splitext(os.path.basename(archive_path))[0])
+        marker_path = os.path.join(folder, ArchiveConverter.MARKER_FILE)
+        marker = {'fingerprint': Utility.file_fingerprint(archive_path), 'format': output_format}
+        if os.path.isfile(marker_path):
+            with open(marker_path) as file:
+                if json.load(file) == marker:
+                    return 'skipped'
+        os.makedirs(folder, exist_ok=True)
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.namelist():
+                if not member.endswith('.csv'):
+                    continue
+                csv_path = os.path.join(folder, *member.split('/'))
+                # a member name like '../x.csv' must not write outside the folder of the archive
+                if os.path.commonpath([os.path.realpath(folder), os.path.realpath(csv_path)]) != \
+                        os.path.realpath(folder):
+                    warnings.warn('Skipping archive member outside of the target directory: ' + member)
+                    continue
+                os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+                with archive.open(member) as stream:
+                    if output_format == 'csv':
+                        with open(csv_path + '.tmp', 'wb') as file:
+                            shutil.copyfileobj(stream, file, 1024 ** 2)
+                        os.replace(csv_path + '.tmp', csv_path)
+                    else:
+                        dataframe = ArchiveConverter._read_csv(stream, chunksize)
+                        ColumnStore.write(ColumnStore.store_path(csv_path), dataframe,
+                                          {'source': os.path.basename(archive_path) + '/' + member})
+        # the marker is written last, an interrupted archive is converted again on the next run
+        with open(marker_path, 'w') as file:
+            json.dump(marker, file)
+        return 'converted'
+
+    @staticmethod
+    def _read_csv(stream, chunksize):
+        """
+        Parse a CSV stream of a recording in chunks of rows.
+
+        Args:
+            stream: The binary stream of the CSV file.
+            chunksize: Number of rows parsed at once.
+
+        Returns:
+            DataFrame indexed by time with the numeric columns of the recording.
+        """
+        parts = []
+        for part in pd.read_csv(stream, chunksize=chunksize):
+            part['time'] = pd.to_datetime(part['time'], format='ISO8601')
+            parts.append(part.set_index('time').select_dtypes('number'))
+        return pd.concat(parts) if len(parts) > 1 else parts[0]
@@ -0,0 +1,136 @@
+import numpy as np
+
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.PrefixCost import PrefixCost
+
+
+class BoundedDynp:
+    """
+    Exact segmentation with a fixed number of change points by dynamic programming in bounded memory.
+
+    Like ruptures' Dynp, change points lie on the multiples of 'jump' and segments are at least 'min_size' long, but
+    instead of memoizing every partial segmentation the engine keeps one row of optimal costs and one row of back
+    pointers per change point (O(n/jump * K) memory). Segment costs come from prefix sums (see PrefixCost) and are
+    evaluated on demand for blocks of pairs, so the exact search over all pairs never holds more than
+    VALUES_PER_BLOCK summed statistics at once. The engine is registered as 'boundeddynp'; 'dynp' stays ruptures'
+    Dynp, which supports every model.
+    """
+    MODELS = PrefixCost.MODELS
+    VALUES_PER_BLOCK = 2 ** 22  # summed statistics of the pairs of admissible indexes evaluated at the same time
+
+    def __init__(self, model='l2', min_size=2, jump=5, n_features=PrefixCost.N_FEATURES, gamma=None, seed=0):
+        """
+        Initialize the BoundedDynp engine.
+
+        Args:
+            model: The cost model, one out of MODELS.
+            min_size: Minimum segment size.
+            jump: Only every jump-th sample is an admissible change point.
+            n_features: Number of random Fourier features approximating the rbf kernel.
+            gamma: Bandwidth of the rbf kernel (None = median heuristic like ruptures).
+            seed: Seed of the random Fourier features, fixed so repeated runs detect the same change points.
+
+        Raises:
+            SegmentationError: If the model is not supported.
+        """
+        self.cost = PrefixCost(model, n_features, gamma, seed)
+        self.min_size = max(int(min_size), 1)
+        self.jump = max(int(jump), 1)
+        self.n_samples = None
+
+    def fit(self, signal):
+        """
+        Sum up the statistics of the signal at the admissible indexes.
+
+        Args:
+            signal: The signal, shape (n_samples, n_features) or (n_samples,).
+
+        Returns:
+            self
+        """
+        self.n_samples = len(signal)
+        positions = np.arange(0, self.n_samples, self.jump)
+        self.cost.fit(signal, np.append(positions, self.n_samples))
+        return self
+
+    def _candidates(self, previous, first, last):
+        """
+        Evaluate pairs of a previous change point and a segment end.
+
+        Args:
+            previous: The optimal costs of the previous row.
+            first: Indexes of the previous change points.
+            last: Indexes of the segment ends.
+
+        Returns:
+            The total costs, infinite where the segment is shorter than min_size.
+        """
+        positions = self.cost.positions
+        feasible = (positions[last] - positions[first]) >= self.min_size
+        return np.where(feasible, previous[first] + self.cost.error_at(first, last), np.inf)
+
+    def _scan(self, previous, ends):
+        """
+        Compute a row of the dynamic program, one block of segment ends at a time.
+
+        Args:
+            previous: The optimal costs of the previous row.
+            ends: Indexes of the segment ends to compute.
+
+        Returns:
+            Tuple of the optimal costs and the optimal previous change points of the ends.
+        """
+        costs = np.full(len(ends), np.inf)
+        pointers = np.zeros(len(ends), dtype=np.int32)
+        lowest = int(np.argmax(np.isfinite(previous)))  # change points before it leave no room for the others
+        block = max(self.VALUES_PER_BLOCK // (len(previous) * self.cost.n_statistics()), 1)
+        for start in range(0, len(ends), block):
+            last = ends[start:start + block]
+            first = np.arange(lowest, max(last[-1], lowest + 1))
+            values = self._candidates(previous, first[None, :], last[:, None])
+            best = values.argmin(axis=1)
+            pointers[start:start + block] = first[best]
+            costs[start:start + block] = values[np.arange(len(last)), best]
+        return costs, pointers
+
+    def predict(self, n_bkps):
+        """
+        Compute the optimal segmentation.
+
+        Args:
+            n_bkps: Number of change points (rounded up, the pipeline passes fractional numbers per chunk).
+
+        Returns:
+            Sorted list of change points, ending with the number of samples.
+
+        Raises:
+            SegmentationError: If fit was not called or no segmentation with n_bkps change points exists.
+        """
+        if self.n_samples is None:
+            raise SegmentationError('The dynamic program must be fitted before predicting.')
+        n_bkps = int(np.ceil(n_bkps))
+        positions = self.cost.positions
+        n = len(positions) - 1  # index of the end of the signal
+        if n_bkps == 0:
+            return [self.n_samples]
+        # row k holds the optimal costs of the signal up to every admissible index with k change points
+        ends = np.arange(1, n)
+        row = np.full(n + 1, np.inf)
+        row[1:n] = np.where(positions[1:n] >= self.min_size, self.cost.error_at(0, ends), np.inf)
+        pointers = []
+        for _ in range(n_bkps - 1):
+            costs, back = self._scan(row, ends)
+            row = np.full(n + 1, np.inf)
+            row[1:n] = costs
+            pointers.append(back)
+        last = self._candidates(row, np.arange(n), np.full(n, n))
+        end = int(last.argmin())
+        if not np.isfinite(last[end]):
+            raise SegmentationError('No segmentation with ' + str(n_bkps) + ' change points of at least '
+                                    + str(self.min_size) + ' samples exists for ' + str(self.n_samples) + ' samples.')
+        bkps = [self.n_samples]
+        for back in reversed(pointers):
+            bkps.append(int(positions[end]))
+            end = int(back[end - 1])
+        bkps.append(int(positions[end]))
+        return sorted(bkps)
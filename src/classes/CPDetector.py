@@ -1,5 +1,6 @@
+import copy
 from ressources.exceptions.SegmentationError import SegmentationError
-import ruptures as rpt
+from src.classes.AlgorithmRegistry import AlgorithmRegistry, AlgorithmInfo
 import numpy as np
 import warnings
 
@@ -21,24 +22,18 @@ class CPDetector:
             window: Window size for the detection.
          """
         self._model = model
+        self._algorithm_name = algorithm_name
+        self._jump_points = jump_points
         self._model_params = model_params
         self._penalty = penalty
         self._n_cps = n_cps
         self._window = window
-        self._algorithm_map = {
-            'pelt': 'Pelt',
-            'kernelcpd': 'KernelCPD',
-            'dynp': 'Dynp',
-            'binseg': 'Binseg',
-            'bottomup': 'BottomUp',
-            'window': 'Window'
-        }
         self._sanity_check()
         self._algorithm = self.map_algorithm_by_name(algorithm_name, min_seg_size, jump_points)
 
     def map_algorithm_by_name(self, algorithm_name, min_seg_size, jump_points):
         """
-        Map the algorithm name to the corresponding ruptures algorithm.
+        Create the engine registered for the algorithm name.
 
         Args:
             algorithm_name: The name of the algorithm to map.
@@ -46,38 +41,28 @@ class CPDetector:
             jump_points: Number of jump points.
 
         Returns:
-            The mapped algorithm instance.
-        """
-        algorithm_name = algorithm_name.lower()
-        algorithm_name = self._algorithm_map.get(algorithm_name)
-        try:
-            algo = getattr(rpt, algorithm_name)
-        except AttributeError:
-            raise SegmentationError('Algorithm class not defined')
-        if algorithm_name != 'KernelCPD':
-            if self._window is None:
-                return algo(model=self._model, min_size=min_seg_size, jump=jump_points)
-            else:
-                return algo(width=self._window, model=self._model, jump=jump_points)
-        else:
-            return algo(kernel=self._model, min_size=min_seg_size, jump=jump_points)
+            The engine instance.
+        """
+        return AlgorithmRegistry.get(algorithm_name).create(self._model, min_seg_size, jump_points, self._window)
 
     def run(self, data):
         """
         Run the change point detection algorithm on the data.
 
         Args:
-            data: The data to run the algorithm on.
+            data: The data to run the algorithm on (pandas DataFrame or NumPy ndarray).
 
         Returns:
             List of detected change points.
         """
-        self._algorithm.fit(data.values)
+        # the configured engine stays unfitted, so the detector can be shared by threads and pickled without a signal
+        algorithm = copy.deepcopy(self._algorithm)
+        algorithm.fit(np.asarray(data))
         if self._penalty is not None:
             pen = self._get_penalty_value(len(data), self._penalty, self._n_cps, self._model_params)
-            cps = self._algorithm.predict(pen=pen)
+            cps = algorithm.predict(pen=pen)
         else:
-            cps = self._algorithm.predict(n_bkps=self._n_cps)
+            cps = algorithm.predict(n_bkps=self._n_cps)
         return cps
 
     def _get_penalty_value(self, time_series_len, pen_type: str, aprox_number_of_cps, modell_params):
@@ -156,6 +141,15 @@ class CPDetector:
             self._model_params = 2
         if self._penalty is None and self._model_params is None:
             warnings.warn('Penalty is not defined, so model parameters are ignored.')
+        info = self.get_info()
+        if not info.supports_model(self._model):
+            raise SegmentationError(f"Model '{self._model}' is not supported by {self._algorithm_name}.")
+        if self._penalty is not None and 'pen' not in info.predict:
+            raise SegmentationError(f'{self._algorithm_name} does not accept a penalty, use n_cps instead.')
+        if self._penalty is None and 'n_bkps' not in info.predict:
+            raise SegmentationError(f'{self._algorithm_name} does not accept n_cps, use a penalty instead.')
+        if self._window is not None and 'width' not in info.params:
+            warnings.warn(f'{self._algorithm_name} does not use a window, so the window is ignored.')
 
     def set_n_cps(self, n_cps):
         """
@@ -174,3 +168,39 @@ class CPDetector:
             The number of change points.
         """
         return self._n_cps
+
+    def get_algorithm_name(self):
+        """
+        Get the name of the configured algorithm.
+
+        Returns:
+            The algorithm name as given in the configuration.
+        """
+        return self._algorithm_name
+
+    def get_model(self):
+        """
+        Get the model used for change point detection.
+
+        Returns:
+            The model name.
+        """
+        return self._model
+
+    def get_jump_points(self):
+        """
+        Get the number of jump points.
+
+        Returns:
+            The number of jump points.
+        """
+        return self._jump_points
+
+    def get_info(self) -> AlgorithmInfo:
+        """
+        Get the capability and cost metadata of the algorithm.
+
+        Returns:
+            The AlgorithmInfo of the registered engine.
+        """
+        return AlgorithmRegistry.get(self._algorithm_name)
@@ -2,29 +2,84 @@ from numpy import ndarray
 
 
 class Chunk:
+    """
+    A part of a recording processed by a single worker.
 
-    def __init__(self, c_id, data: ndarray):
+    A chunk either holds its data (e.g. the change points of a processed chunk) or is a lazy view: it keeps a reference
+    to the array of the whole recording and its bounds, and slices the view only when the data is accessed. Pickling a
+    lazy chunk (when it is sent to a worker process) ships only its rows.
+    """
+    __slots__ = ('c_id', 'data', 'bounds', 'owned', 'stats', 'source')
+
+    def __init__(self, c_id, data: ndarray = None, bounds=None, source: ndarray = None, owned=None):
         """
         Initialize a Chunk instance.
 
         Args:
             c_id: The unique identifier for the chunk.
-            data: The data contained in the chunk, represented as a NumPy ndarray.
+            data: The data contained in the chunk, represented as a NumPy ndarray (None for a lazy view).
+            bounds: The (start, end) indexes of the chunk within the general dataset (optional, required for a lazy
+                view).
+            source: The array of the general dataset a lazy view slices its data from (optional).
+            owned: The (start, end) indexes of the rows within the general dataset the chunk reports change points for
+                (optional, None = all rows of the chunk).
         """
         self.c_id = c_id
         self.data = data
+        self.bounds = bounds
+        self.owned = owned
+        self.stats = {}
+        self.source = source
+
+    def __getstate__(self):
+        """
+        Get the state for pickling, a lazy view is replaced by its rows.
+
+        Returns:
+            Dictionary of the state.
+        """
+        return {'c_id': self.c_id, 'data': self.get_data(), 'bounds': self.bounds, 'owned': self.owned,
+                'stats': self.stats}
+
+    def __setstate__(self, state):
+        """
+        Restore the state after unpickling.
+
+        Args:
+            state: Dictionary of the state.
+        """
+        self.c_id = state['c_id']
+        self.data = state['data']
+        self.bounds = state['bounds']
+        self.owned = state['owned']
+        self.stats = state['stats']
+        self.source = None
 
     def get_data(self):
         """
-        Get the data contained in the chunk.
+        Get the data contained in the chunk. A lazy view is sliced from the general dataset without copying.
 
         Returns:
             The data as a NumPy ndarray.
         """
+        if self.data is None and self.source is not None:
+            return self.source[self.bounds[0]:self.bounds[1]]
         return self.data
 
     def set_data(self, data):
         self.data = data
+        self.source = None
+
+    def get_length(self):
+        """
+        Get the number of rows of the chunk without slicing a lazy view.
+
+        Returns:
+            The number of rows.
+        """
+        if self.data is None and self.bounds is not None:
+            return self.bounds[1] - self.bounds[0]
+        return len(self.data)
 
     def get_id(self):
         """
@@ -34,3 +89,39 @@ class Chunk:
              The unique identifier (chunk ID).
         """
         return self.c_id
+
+    def get_bounds(self):
+        """
+        Get the position of the chunk within the general dataset.
+
+        Returns:
+            Tuple of the start and end index or None if the chunk was created without bounds.
+        """
+        return self.bounds
+
+    def get_owned(self):
+        """
+        Get the rows within the general dataset the chunk reports change points for.
+
+        Returns:
+            Tuple of the start and end index or None if the chunk reports the change points of all its rows.
+        """
+        return self.owned
+
+    def get_stats(self):
+        """
+        Get the statistics measured while the chunk was processed (e.g. detection time and worker id).
+
+        Returns:
+            Dictionary containing the statistics.
+        """
+        return self.stats
+
+    def set_stats(self, stats: dict):
+        """
+        Set the statistics measured while the chunk was processed.
+
+        Args:
+            stats: Dictionary containing the statistics.
+        """
+        self.stats = stats
@@ -1,10 +1,36 @@
 import concurrent.futures
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from src.classes.AlgorithmRegistry import AlgorithmRegistry
 from src.classes.Chunk import Chunk
 from src.classes.CPDetector import CPDetector
+from src.classes.Instrumentation import Instrumentation
+from src.classes.RunManifest import RunManifest
+from src.classes.SerialExecutor import SerialExecutor
+from ressources.exceptions.SegmentationError import SegmentationError
+from ressources.exceptions.WorkerLostError import WorkerLostError
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 
 class ChunkProcessor:
-    def __init__(self, chunks: list, cpd_method: CPDetector, num_workers):
+    BACKENDS = ('serial', 'thread', 'process')
+    # cost model of the automatic backend selection
+    PROCESS_STARTUP = 0.05 if multiprocessing.get_start_method() == 'fork' else 1.5  # seconds per worker process
+    TRANSFER_RATE = 500 * 1024 ** 2  # bytes per second to pickle a chunk to a worker process and back
+    THREAD_EFFICIENCY = 0.5  # share of a thread that runs in parallel, ruptures only partly releases the GIL
+
+    def __init__(self, chunks: list, cpd_method: CPDetector, num_workers, instrumentation: Instrumentation = None,
+                 memory_budget=None, chunk_timeout=None, max_retries=1, fallback_method: CPDetector = None,
+                 manifest: RunManifest = None, executor: concurrent.futures.Executor = None, backend='process'):
         """
         Initialize the ChunkProcessor.
 
@@ -12,11 +38,34 @@ class ChunkProcessor:
             chunks: List of Chunk objects to be processed.
             cpd_method: An instance of CPDetector used for detecting change points.
             num_workers: Number of worker processes to use for parallel processing.
+            instrumentation: Instrumentation used to record the detection time of each chunk (optional).
+            memory_budget: Maximum estimated memory in bytes of all chunks processed at the same time (optional).
+            chunk_timeout: Deadline in seconds for the detection on a single chunk (optional).
+            max_retries: Number of retries of a chunk that exceeded its deadline or whose worker died.
+            fallback_method: CPDetector used for a chunk once its retries are exhausted (optional).
+            manifest: RunManifest finished chunks are persisted to and restored from (optional).
+            executor: Already running executor with num_workers workers (e.g. a warm pool of a server). It is not shut
+                down after the chunks are processed, but replaced by a new pool if it breaks (optional).
+            backend: Executor created if no executor is given: 'serial', 'thread', 'process' or 'auto'. 'auto' times
+                the most expensive chunk in the calling thread and chooses the backend with the lowest estimated run
+                time for the remaining chunks.
         """
+        if backend not in self.BACKENDS + ('auto',):
+            raise SegmentationError('Backend not defined: ' + str(backend))
         self.chunks = chunks
         self.cpd_method = cpd_method
         self.num_workers = num_workers
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+        self.memory_budget = memory_budget
+        self.chunk_timeout = chunk_timeout
+        self.max_retries = max_retries
+        self.fallback_method = fallback_method
+        self.manifest = manifest
+        self.executor = executor
+        self.backend = backend
         self.results = []
+        self.degraded_chunks = {}
+        self.worker_peak_rss = {}
         self.total_cps = self.cpd_method.get_n_cps()
         self._adjust_number_of_cps(self.total_cps)
 
@@ -24,44 +73,360 @@ class ChunkProcessor:
         """
         Process all chunks using the CPDetector method.
         """
+        self._restore_chunks()
         self._process_all_chunks()
         self.cpd_method.set_n_cps(self.total_cps)
+        if self.fallback_method is not None:
+            self.fallback_method.set_n_cps(self.total_cps)
 
-    def _process_chunk(self, chunk: Chunk):
+    @staticmethod
+    def _process_chunk(cpd_method: CPDetector, chunk: Chunk):
         """
-        Process a single chunk.
+        Process a single chunk. Runs inside a worker process or thread.
 
         Args:
+            cpd_method: The CPDetector used for detecting change points.
             chunk: The Chunk object to be processed.
 
         Returns:
-            The processed Chunk object.
+            The processed Chunk object including the detection time, the worker id and the worker's peak RSS.
         """
-        print("Processing chunk_nr: " + str(chunk.get_id()) + "...")
-        chunk.set_data(self.cpd_method.run(chunk.get_data()))
-        return chunk
+        start = time.perf_counter()
+        # a new Chunk, because in the serial and thread backends the submitted chunk is not a copy
+        result = Chunk(chunk.get_id(), cpd_method.run(chunk.get_data()), chunk.get_bounds(), owned=chunk.get_owned())
+        result.set_stats({'detect': time.perf_counter() - start, 'worker': os.getpid(),
+                          'peak_rss': ChunkProcessor._get_peak_rss()})
+        return result
 
     def _process_all_chunks(self):
         """
-        Process all chunks in parallel using ProcessPoolExecutor.
-        """
-        chunks_copy = list(self.chunks)
-        print('Queue size of Chunks: ' + str(len(self.chunks)))
-        with concurrent.futures.ProcessPoolExecutor(max_workers=self.num_workers) as executor:
-            futures = {executor.submit(self._process_chunk, chunk): chunk for chunk in
-                       chunks_copy[:min(self.num_workers, len(chunks_copy))]}
-            for future in concurrent.futures.as_completed(futures):
-                chunk = futures[future]
-                result = future.result()
-                self.chunks.remove(chunk)
-                self.results.append(result)
-                print(
-                    "Chunk_nr: " + str(chunk.get_id()) + " has processed successfully. Number of changpoints found: " +
-                    str(len(result.get_data()) - 1))
-        if not self.chunks:
+        Process all chunks in parallel using the executor of the selected backend.
+
+        Chunks are only submitted while the estimated memory of all chunks in flight stays within the memory budget,
+        at least one chunk is always in flight. The most expensive chunks are submitted first, so a large last chunk
+        does not run alone at the end. A chunk that exceeds its deadline or whose worker died is retried up to
+        'max_retries' times and afterwards processed with the fallback method. Workers stuck on an expired chunk are
+        not available until the chunk finishes; if every worker is stuck the pool is replaced. If the pool breaks (e.g.
+        a worker was killed because it ran out of memory) it is restarted with half the number of workers and the
+        chunks lost with it are requeued without using up a retry, only a chunk that breaks a single worker pool is
+        retried or degraded. Other executors (e.g. a DistributedExecutor) are never replaced: a task they lost is
+        handled like a dead worker and while every worker is stuck the processor waits for the first of them to finish.
+        """
+        info = self.cpd_method.get_info()
+        jump_points = self.cpd_method.get_jump_points()
+        pending = deque(sorted(((chunk, False) for chunk in self.chunks),
+                               key=lambda task: -info.estimate_cost(task[0].get_length(), jump_points)))
+        in_flight = {}
+        abandoned = set()
+        attempts = {}
+        num_workers = self.num_workers
+        executor = self.executor
+        if executor is None:
+            executor = self._create_executor(pending, num_workers)
+        try:
+            while pending or in_flight:
+                abandoned = {future for future in abandoned if not future.done()}
+                if len(abandoned) >= num_workers and not isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+                    concurrent.futures.wait(abandoned, return_when=concurrent.futures.FIRST_COMPLETED)
+                    continue
+                if len(abandoned) >= num_workers:
+                    # every worker is stuck on a chunk that exceeded its deadline
+                    self._terminate_executor(executor)
+                    self._requeue(in_flight, pending)
+                    abandoned.clear()
+                    self.instrumentation.count('pool_restarts')
+                    executor = concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+                self._submit_chunks(executor, pending, in_flight, num_workers - len(abandoned))
+
+                done, _ = concurrent.futures.wait(in_flight, timeout=self._get_wait_timeout(in_flight),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    if isinstance(future.exception(), BrokenProcessPool):
+                        # the chunk stays in flight, the restart of the pool below decides about it
+                        broken = True
+                        continue
+                    chunk, use_fallback, estimate, submitted = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except WorkerLostError:
+                        self._handle_failure(chunk, use_fallback, 'worker died', attempts, pending)
+                        continue
+                    self._accept_result(chunk, result, use_fallback)
+
+                if self.chunk_timeout is not None and not broken:
+                    now = time.monotonic()
+                    for future in [f for f, task in in_flight.items() if now - task[3] > self.chunk_timeout]:
+                        chunk, use_fallback, estimate, submitted = in_flight.pop(future)
+                        abandoned.add(future)
+                        self.instrumentation.count('chunks_timed_out')
+                        self._handle_failure(chunk, use_fallback, 'timeout', attempts, pending)
+
+                if broken:
+                    # the chunks in flight are lost with the pool but not necessarily to blame, so they are requeued
+                    # without using up an attempt; only a chunk that broke a pool of a single worker is charged
+                    if num_workers == 1 and len(in_flight) == 1:
+                        chunk, use_fallback, estimate, submitted = in_flight.popitem()[1]
+                        self._handle_failure(chunk, use_fallback, 'worker died', attempts, pending)
+                    self._requeue(in_flight, pending)
+                    abandoned.clear()
+                    self._terminate_executor(executor)
+                    num_workers = max(num_workers // 2, 1)
+                    warnings.warn('Worker pool broke, restarting with ' + str(num_workers) + ' workers.')
+                    self.instrumentation.count('pool_restarts')
+                    executor = concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+        finally:
+            stuck = any(not future.done() for future in abandoned)
+            if stuck and isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+                self._terminate_executor(executor)
+            elif executor is not self.executor:
+                executor.shutdown(wait=not stuck, cancel_futures=True)
+
+    def _accept_result(self, chunk: Chunk, result: Chunk, use_fallback):
+        """
+        Take over the result of a processed chunk.
+
+        Args:
+            chunk: The Chunk object that was submitted.
+            result: The processed Chunk object.
+            use_fallback: Whether the chunk was processed with the fallback method.
+        """
+        self.chunks.remove(chunk)
+        self.results.append(result)
+        self._record_chunk(result)
+        if self.manifest is not None:
+            cpd_method = self.fallback_method if use_fallback else self.cpd_method
+            self.manifest.add_chunk(result.get_bounds(), cpd_method.get_algorithm_name(), result.get_data())
+
+    def _create_executor(self, pending, num_workers):
+        """
+        Create the executor of the configured backend.
+
+        Args:
+            pending: Queue of (chunk, use_fallback) tuples waiting for submission, most expensive first. In 'auto' mode
+                the first chunk is processed for calibration and removed.
+            num_workers: Number of workers.
+
+        Returns:
+            The executor.
+        """
+        backend = self.backend
+        if backend == 'auto':
+            backend = self._select_backend(pending, num_workers)
+        self.instrumentation.count('backend_' + backend)
+        if backend == 'serial':
+            return SerialExecutor()
+        if backend == 'thread':
+            return concurrent.futures.ThreadPoolExecutor(max_workers=num_workers)
+        return concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+
+    def _select_backend(self, pending, num_workers):
+        """
+        Choose the backend with the lowest estimated run time. The most expensive chunk is processed in the calling
+        thread and its detection time is extrapolated to the remaining chunks with the cost metadata of the algorithm.
+
+        Args:
+            pending: Queue of (chunk, use_fallback) tuples waiting for submission, most expensive first.
+            num_workers: Number of workers.
+
+        Returns:
+            The name of the backend.
+        """
+        if num_workers <= 1 or len(pending) <= 1:
+            return 'serial'
+        chunk, use_fallback = pending.popleft()
+        with self.instrumentation.span('calibrate'):
+            result = ChunkProcessor._process_chunk(self.cpd_method, chunk)
+        self._accept_result(chunk, result, use_fallback)
+        info = self.cpd_method.get_info()
+        jump_points = self.cpd_method.get_jump_points()
+        calibration_cost = info.estimate_cost(chunk.get_length(), jump_points)
+        work = sum(info.estimate_cost(c.get_length(), jump_points) for c, _ in pending) / calibration_cost
+        work *= result.get_stats()['detect']
+        transfer = 2 * sum(c.get_data().size * 8 for c, _ in pending) / self.TRANSFER_RATE
+        workers = min(num_workers, len(pending))
+        estimates = {'serial': work,
+                     'thread': work / max(workers * self.THREAD_EFFICIENCY, 1),
+                     'process': work / workers + workers * self.PROCESS_STARTUP + transfer / workers}
+        return min(estimates, key=estimates.get)
+
+    def _restore_chunks(self):
+        """
+        Take over the change points of all chunks that were finished by a previous run from the manifest.
+        """
+        if self.manifest is None:
+            return
+        for chunk in list(self.chunks):
+            cps = self.manifest.get_chunk(chunk.get_bounds())
+            if cps is None:
+                continue
+            self.chunks.remove(chunk)
+            self.results.append(Chunk(chunk.get_id(), cps, chunk.get_bounds(), owned=chunk.get_owned()))
+            self.instrumentation.count('chunks_restored')
+
+    def _submit_chunks(self, executor, pending, in_flight, capacity):
+        """
+        Submit pending chunks as long as workers are free and the memory budget allows it.
+
+        Args:
+            executor: The executor the chunks are submitted to.
+            pending: Queue of (chunk, use_fallback) tuples waiting for submission.
+            in_flight: Dictionary mapping futures to (chunk, use_fallback, estimate, submission time).
+            capacity: Number of workers that are not stuck on an expired chunk.
+        """
+        in_flight_memory = sum(task[2] for task in in_flight.values())
+        while pending and len(in_flight) < capacity:
+            chunk, use_fallback = pending[0]
+            cpd_method = self.fallback_method if use_fallback else self.cpd_method
+            estimate = self.estimate_chunk_memory(chunk, cpd_method)
+            if self.memory_budget is not None and estimate > self.memory_budget and not in_flight:
+                warnings.warn('Chunk ' + str(chunk.get_id()) + ' exceeds the memory budget and is processed on its '
+                                                               'own.')
+            elif self.memory_budget is not None and in_flight_memory + estimate > self.memory_budget:
+                self.instrumentation.count('chunks_held_back')
+                break
+            pending.popleft()
+            future = executor.submit(ChunkProcessor._process_chunk, cpd_method, chunk)
+            in_flight[future] = (chunk, use_fallback, estimate, time.monotonic())
+            in_flight_memory += estimate
+
+    def _get_wait_timeout(self, in_flight):
+        """
+        Get the time until the next chunk in flight exceeds its deadline.
+
+        Args:
+            in_flight: Dictionary mapping futures to (chunk, use_fallback, estimate, submission time).
+
+        Returns:
+            The timeout in seconds or None if no deadline is configured.
+        """
+        if self.chunk_timeout is None or not in_flight:
+            return None
+        first_submission = min(task[3] for task in in_flight.values())
+        return max(first_submission + self.chunk_timeout - time.monotonic(), 0)
+
+    def _handle_failure(self, chunk: Chunk, use_fallback, reason, attempts, pending):
+        """
+        Retry a chunk that failed or continue with the fallback method once the retries are exhausted.
+
+        Args:
+            chunk: The Chunk object that failed.
+            use_fallback: Whether the chunk was processed with the fallback method.
+            reason: The reason of the failure ('timeout' or 'worker died').
+            attempts: Dictionary mapping chunk ids to the number of failed attempts.
+            pending: Queue of (chunk, use_fallback) tuples waiting for submission.
+
+        Raises:
+            SegmentationError: If the fallback failed as well or no fallback method is configured.
+        """
+        if use_fallback:
+            raise SegmentationError('Fallback failed for chunk ' + str(chunk.get_id()) + ' (' + reason + ').')
+        attempts[chunk.get_id()] = attempts.get(chunk.get_id(), 0) + 1
+        if attempts[chunk.get_id()] <= self.max_retries:
+            self.instrumentation.count('chunks_retried')
+            pending.appendleft((chunk, False))
+            return
+        if self.fallback_method is None:
+            raise SegmentationError('Chunk ' + str(chunk.get_id()) + ' failed (' + reason + ') and no fallback '
+                                                                                          'method is configured.')
+        self.degraded_chunks[chunk.get_id()] = reason
+        self.instrumentation.count('chunks_degraded')
+        pending.appendleft((chunk, True))
+
+    @staticmethod
+    def _requeue(in_flight, pending):
+        """
+        Move all chunks in flight back to the front of the pending queue.
+
+        Args:
+            in_flight: Dictionary mapping futures to (chunk, use_fallback, estimate, submission time).
+            pending: Queue of (chunk, use_fallback) tuples waiting for submission.
+        """
+        for chunk, use_fallback, estimate, submitted in in_flight.values():
+            pending.appendleft((chunk, use_fallback))
+        in_flight.clear()
+
+    @staticmethod
+    def _terminate_executor(executor):
+        """
+        Shut down a process pool without waiting for running chunks.
+
+        Args:
+            executor: The ProcessPoolExecutor to terminate.
+        """
+        executor.shutdown(wait=False, cancel_futures=True)
+        if hasattr(executor, 'terminate_workers'):  # Python >= 3.14
+            executor.terminate_workers()
             return
-        else:
-            self.process_chunks()
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.terminate()
+
+    def estimate_chunk_memory(self, chunk: Chunk, cpd_method: CPDetector = None):
+        """
+        Estimate the peak memory a worker needs to process a chunk.
+
+        Args:
+            chunk: The Chunk object to be processed.
+            cpd_method: The CPDetector used for the chunk. If None, the CPDetector of the processor is used.
+
+        Returns:
+            The estimated memory in bytes.
+        """
+        cpd_method = cpd_method if cpd_method is not None else self.cpd_method
+        data = chunk.get_data()
+        n_dims = data.shape[1] if len(data.shape) > 1 else 1
+        return self.estimate_memory(cpd_method.get_algorithm_name(), cpd_method.get_model(), len(data), n_dims,
+                                    cpd_method.get_jump_points(), cpd_method.get_n_cps())
+
+    @staticmethod
+    def estimate_memory(algorithm_name, model, chunk_len, n_dims=1, jump_points=1, n_cps=None):
+        """
+        Estimate the peak memory of the detection of change points on a single chunk from the metadata of the
+        algorithm in the AlgorithmRegistry.
+
+        Args:
+            algorithm_name: The name of the algorithm.
+            model: The model used for change point detection.
+            chunk_len: The number of samples in the chunk.
+            n_dims: The number of dimensions of the signal.
+            jump_points: The number of jump points.
+            n_cps: The number of change points to detect per chunk (optional).
+
+        Returns:
+            The estimated memory in bytes.
+        """
+        return AlgorithmRegistry.get(algorithm_name).estimate_memory(model, chunk_len, n_dims, jump_points, n_cps)
+
+    @staticmethod
+    def _get_peak_rss():
+        """
+        Get the peak resident set size of the current process.
+
+        Returns:
+            The peak RSS in bytes or None if it cannot be determined on this platform.
+        """
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, Linux kilobytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def _record_chunk(self, chunk: Chunk):
+        """
+        Record the worker-side timing, the peak RSS and the number of change points of a processed chunk.
+
+        Args:
+            chunk: The processed Chunk object.
+        """
+        stats = chunk.get_stats()
+        worker = stats.get('worker')
+        peak_rss = stats.get('peak_rss')
+        if peak_rss is not None:
+            self.worker_peak_rss[worker] = max(self.worker_peak_rss.get(worker, 0), peak_rss)
+        self.instrumentation.record('detect_chunk', stats.get('detect', 0.0), chunk=chunk.get_id(), worker=worker,
+                                    peak_rss=peak_rss)
+        self.instrumentation.count('chunks_processed')
+        self.instrumentation.count('chunk_changepoints', len(chunk.get_data()) - 1)
 
     def get_results(self):
         """
@@ -72,6 +437,24 @@ class ChunkProcessor:
         """
         return self.results
 
+    def get_degraded_chunks(self):
+        """
+        Get the chunks that were processed with the fallback method.
+
+        Returns:
+            Dictionary mapping the chunk id to the reason of the degradation ('timeout' or 'worker died').
+        """
+        return dict(self.degraded_chunks)
+
+    def get_worker_peak_rss(self):
+        """
+        Get the peak resident set size of each worker process.
+
+        Returns:
+            Dictionary mapping the worker id to its peak RSS in bytes.
+        """
+        return dict(self.worker_peak_rss)
+
     def set_chunks(self, chunks: list[Chunk]):
         """
         Set the chunks to be processed.
@@ -90,5 +473,6 @@ class ChunkProcessor:
         """
         n_chunks = len(self.chunks)
         new_n_cps = (old_n_cps / n_chunks) + 2  # +2 to consider irregularities
-        print('adjusted number of cps per chunk: ' + str(new_n_cps))
         self.cpd_method.set_n_cps(new_n_cps)
+        if self.fallback_method is not None:
+            self.fallback_method.set_n_cps(new_n_cps)
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ressources.exceptions.SegmentationError import SegmentationError
+
+
+class ColumnStore:
+    """
+    Binary columnar storage of a recording.
+
+    A store is a directory holding the time index and every column as a NumPy .npy file and a 'meta.json' describing
+    them. Loading a store reads the arrays as they are, without parsing text or sorting. A store is written next to
+    the CSV file it replaces ('x.csv' -> 'x.cols'), so the paths of the process enums stay valid.
+    """
+    SUFFIX = '.cols'
+    META_FILE = 'meta.json'
+
+    @classmethod
+    def store_path(cls, csv_path):
+        """
+        Get the path of the store of a CSV file.
+
+        Args:
+            csv_path: The path of the CSV file.
+
+        Returns:
+            The path of the store.
+        """
+        return os.path.splitext(csv_path)[0] + cls.SUFFIX
+
+    @classmethod
+    def locate(cls, path):
+        """
+        Find the store of a path.
+
+        Args:
+            path: The path of a store or of a CSV file that may have been converted.
+
+        Returns:
+            The path of the store or None if there is none.
+        """
+        for candidate in (path, cls.store_path(path)):
+            if os.path.isfile(os.path.join(candidate, cls.META_FILE)):
+                return candidate
+        return None
+
+    @classmethod
+    def write(cls, path, dataframe: pd.DataFrame, metadata: dict = None):
+        """
+        Write a DataFrame with a DatetimeIndex to a store. The store is written to a temporary directory first and
+        then renamed, so an interrupted write never leaves a partial store behind.
+
+        Args:
+            path: The path of the store.
+            dataframe: The DataFrame, its rows are sorted by time before they are written.
+            metadata: Additional entries of the meta file (e.g. the source of the data).
+        """
+        if not isinstance(dataframe.index, pd.DatetimeIndex):
+            raise SegmentationError('A column store requires a DatetimeIndex.')
+        if not dataframe.index.is_monotonic_increasing:
+            dataframe = dataframe.sort_index(kind='stable')
+        index = dataframe.index
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'time.npy'), index.asi8)
+        columns = []
+        for i, column in enumerate(dataframe.columns):
+            file = 'col_' + str(i) + '.npy'
+            np.save(os.path.join(tmp_path, file), dataframe[column].to_numpy())
+            columns.append({'name': str(column), 'file': file})
+        meta = {'rows': len(dataframe), 'unit': index.unit, 'tz': str(index.tz) if index.tz is not None else None,
+                'start': str(index[0]) if len(index) else None, 'end': str(index[-1]) if len(index) else None,
+                'columns': columns}
+        meta.update(metadata or {})
+        with open(os.path.join(tmp_path, cls.META_FILE), 'w') as file:
+            json.dump(meta, file, indent=1)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read_meta(cls, path):
+        """
+        Read the meta file of a store.
+
+        Args:
+            path: The path of the store.
+
+        Returns:
+            Dictionary with the number of rows, time unit and zone, first and last timestamp and the columns.
+        """
+        with open(os.path.join(path, cls.META_FILE)) as file:
+            return json.load(file)
+
+    @classmethod
+    def read(cls, path, columns=None, rows=None):
+        """
+        Read a store.
+
+        Args:
+            path: The path of the store.
+            columns: The columns to read (None = all).
+            rows: Tuple of the first and last row + 1 to read (None = all). The files are memory mapped, so only
+                these rows are read from disk.
+
+        Returns:
+            DataFrame indexed by time.
+
+        Raises:
+            SegmentationError: If a requested column is not in the store.
+        """
+        meta = cls.read_meta(path)
+        files = {column['name']: column['file'] for column in meta['columns']}
+        if columns is None:
+            columns = list(files)
+        missing = [column for column in columns if column not in files]
+        if missing:
+            raise SegmentationError('Columns not in store ' + path + ': ' + str(missing))
+        selection = slice(None) if rows is None else slice(*rows)
+        mmap_mode = None if rows is None else 'r'
+
+        def load(file):
+            array = np.load(os.path.join(path, file), mmap_mode=mmap_mode)[selection]
+            return array if rows is None else np.array(array)  # copies the rows out of the mapping
+
+        time = load('time.npy').view('datetime64[' + meta['unit'] + ']')
+        index = pd.DatetimeIndex(time, name='time')
+        if meta['tz'] is not None:
+            index = index.tz_localize('UTC').tz_convert(meta['tz'])
+        data = {column: load(files[column]) for column in columns}
+        return pd.DataFrame(data, index=index)
@@ -0,0 +1,267 @@
+import fnmatch
+import json
+import os
+import re
+from collections import Counter
+from enum import Enum
+
+import pandas as pd
+
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.ColumnStore import ColumnStore
+from src.classes.Utility import Utility
+
+
+class DatasetCatalog:
+    """
+    Index of the recordings under a data root.
+
+    The catalog discovers the CSV files and column stores of the recordings and records their metadata once: row
+    count, time span, sampling rate, byte size and content hash. The index is a JSON file; a recording is only read
+    again if its size or modification time changed. Processes are selected from the catalog by name pattern and are
+    returned as members of an Enum, like the members of DrillingProcess and SmoothingProcess.
+    """
+
+    def __init__(self, data_root, index_path, name_pattern=r'(process_\d+)', hash_content=True):
+        """
+        Initialize the DatasetCatalog and load its index.
+
+        Args:
+            data_root: The directory searched for recordings.
+            index_path: The path of the JSON index.
+            name_pattern: Regular expression whose first group, found in the file name, is the name of the process
+                (upper case). Recordings without a match are named by their file name.
+            hash_content: Whether to record the content hash of every recording (reads every new file once).
+        """
+        self._data_root = data_root
+        self._index_path = index_path
+        self._name_pattern = re.compile(name_pattern, re.IGNORECASE) if name_pattern else None
+        self._hash_content = hash_content
+        self._entries = self._load_index()
+        self._enum = None
+
+    def _load_index(self):
+        """
+        Load the index.
+
+        Returns:
+            Dictionary mapping the paths of the recordings to their entries.
+        """
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, 'r', encoding='utf-8') as file:
+                    return json.load(file)['recordings']
+            except (json.JSONDecodeError, KeyError):
+                pass
+        return {}
+
+    def _save_index(self):
+        """Write the index atomically."""
+        directory = os.path.dirname(self._index_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'data_root': self._data_root, 'recordings': self._entries}, file, indent=1)
+        os.replace(tmp_path, self._index_path)
+
+    def _discover(self):
+        """
+        Find the recordings under the data root.
+
+        Returns:
+            Sorted list of the paths of the recordings. A CSV file that was converted into a store is listed once by
+            the path of the CSV file, a store without CSV file by the path of the store.
+        """
+        paths = set()
+        for directory, sub_directories, files in os.walk(self._data_root):
+            stores = [d for d in sub_directories if d.endswith(ColumnStore.SUFFIX)]
+            sub_directories[:] = [d for d in sub_directories if d not in stores and not d.endswith('.tmp')]
+            csv_files = {os.path.splitext(f)[0] for f in files if f.endswith('.csv')}
+            paths.update(os.path.join(directory, f + '.csv') for f in csv_files)
+            paths.update(os.path.join(directory, d) for d in stores if d[:-len(ColumnStore.SUFFIX)] not in csv_files)
+        return sorted(paths)
+
+    def refresh(self):
+        """
+        Discover the recordings and index the new and changed ones. Recordings that disappeared are removed.
+
+        Returns:
+            The number of recordings that were (re)indexed.
+        """
+        indexed = 0
+        entries = {}
+        for path in self._discover():
+            source = ColumnStore.locate(path) or path
+            stat_path = os.path.join(source, ColumnStore.META_FILE) if os.path.isdir(source) else source
+            stat = os.stat(stat_path)
+            entry = self._entries.get(path)
+            if entry is None or entry['source'] != source or entry['mtime'] != stat.st_mtime_ns \
+                    or entry['stat_size'] != stat.st_size:
+                print('Indexing ' + path)
+                try:
+                    entry = self._read_metadata(path, source)
+                except ValueError as e:  # e.g. a CSV file without a time column, which is no recording
+                    print('Skipping ' + path + ', it cannot be indexed: ' + str(e))
+                    continue
+                entry.update({'source': source, 'mtime': stat.st_mtime_ns, 'stat_size': stat.st_size})
+                indexed += 1
+            entries[path] = entry
+        changed = indexed > 0 or set(entries) != set(self._entries)
+        self._entries = entries
+        self._assign_names()
+        self._enum = None
+        if changed:
+            self._save_index()
+        return indexed
+
+    def _read_metadata(self, path, source):
+        """
+        Read the metadata of a recording.
+
+        Args:
+            path: The path of the recording.
+            source: The path of the file or store that MobileData loads for the recording.
+
+        Returns:
+            Dictionary with rows, start, end, sampling_rate, bytes and content_hash.
+        """
+        if os.path.isdir(source):
+            meta = ColumnStore.read_meta(source)
+            rows, start, end = meta['rows'], meta['start'], meta['end']
+            size = sum(os.path.getsize(os.path.join(source, f)) for f in os.listdir(source))
+        else:
+            time = pd.to_datetime(pd.read_csv(source, usecols=['time'])['time'], format='ISO8601')
+            rows = len(time)
+            start, end = (str(time.min()), str(time.max())) if rows else (None, None)
+            size = os.path.getsize(source)
+        sampling_rate = None
+        if rows > 1:
+            duration = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds()
+            sampling_rate = (rows - 1) / duration if duration > 0 else None
+        return {'file': os.path.basename(path), 'rows': rows, 'start': start, 'end': end,
+                'sampling_rate': sampling_rate, 'bytes': size,
+                'content_hash': Utility.content_hash(source) if self._hash_content else None}
+
+    def _assign_names(self):
+        """
+        Name the recordings. Recordings whose names collide are named by their file name instead, and by their path
+        relative to the data root if the file names collide as well (e.g. 'B/PROCESS_1.csv' -> 'B_PROCESS_1').
+        """
+        names = {}
+        for path, entry in self._entries.items():
+            stem = os.path.splitext(entry['file'])[0]
+            match = self._name_pattern.search(stem) if self._name_pattern is not None else None
+            names[path] = re.sub(r'\W', '_', (match.group(1) if match else stem).upper())
+        for fallback in (lambda p: self._entries[p]['file'], lambda p: os.path.relpath(p, self._data_root)):
+            counts = Counter(names.values())
+            for path in self._entries:
+                if counts[names[path]] > 1:
+                    names[path] = re.sub(r'\W', '_', os.path.splitext(fallback(path))[0].upper())
+        counts = Counter(names.values())
+        seen = Counter()
+        for path, entry in self._entries.items():
+            name = names[path]
+            if counts[name] > 1:  # only left if the relative paths differ in non-word characters alone
+                seen[name] += 1
+                name += '_' + str(seen[name])
+            entry['name'] = name
+
+    def entries(self):
+        """
+        Get the indexed recordings.
+
+        Returns:
+            DataFrame with one row per recording: name, path, rows, start, end, sampling_rate, bytes and content_hash.
+        """
+        columns = ['name', 'path', 'rows', 'start', 'end', 'sampling_rate', 'bytes', 'content_hash']
+        rows = [dict(entry, path=path) for path, entry in self._entries.items()]
+        return pd.DataFrame(rows, columns=columns)
+
+    def get_enum(self):
+        """
+        Get the Enum of all indexed recordings, mapping the process names to the paths.
+
+        Returns:
+            The Enum.
+        """
+        if self._enum is None:
+            self._enum = Enum('CatalogProcess', {entry['name']: path for path, entry in self._entries.items()})
+        return self._enum
+
+    def select(self, pattern):
+        """
+        Select processes by name.
+
+        Args:
+            pattern: 'all' or glob patterns of process names separated by semicolons (e.g. 'PROCESS_2*;PROCESS_31'),
+                case-insensitive.
+
+        Returns:
+            List of the selected Enum members in catalog order.
+
+        Raises:
+            SegmentationError: If a pattern does not match any process.
+        """
+        members = list(self.get_enum())
+        if pattern.lower() == 'all':
+            return members
+        selected = []
+        for part in pattern.upper().split(';'):
+            matches = [member for member in members if fnmatch.fnmatchcase(member.name, part.strip())]
+            if not matches:
+                raise SegmentationError('No process in the catalog matches: ' + part)
+            selected.extend(member for member in matches if member not in selected)
+        return selected
+
+    def get_entry(self, path):
+        """
+        Get the entry of a recording.
+
+        Args:
+            path: The path of the recording (e.g. the value of a process enum member). A CSV file that was converted
+                into a store without keeping the CSV file is found by the path of its store.
+
+        Returns:
+            The entry or None if the recording is not in the catalog.
+        """
+        for candidate in (path, ColumnStore.store_path(path)):
+            entry = self._entries.get(candidate)
+            if entry is None:
+                abs_path = os.path.abspath(candidate)
+                entry = next((e for p, e in self._entries.items() if os.path.abspath(p) == abs_path), None)
+            if entry is not None:
+                return entry
+        return None
+
+    def order_by_size(self, processes):
+        """
+        Order processes by their number of rows, the largest first. Processes that are not in the catalog keep their
+        order after the others.
+
+        Args:
+            processes: List of Enum members whose values are paths of recordings.
+
+        Returns:
+            The ordered list.
+        """
+        rows = {process: (self.get_entry(process.value) or {}).get('rows') for process in processes}
+        known = sorted((p for p in processes if rows[p] is not None), key=lambda p: rows[p], reverse=True)
+        return known + [p for p in processes if rows[p] is None]
+
+    def estimate_chunks(self, path, chunk_size, overlap_region):
+        """
+        Estimate the number of chunks of a recording without opening it.
+
+        Args:
+            path: The path of the recording.
+            chunk_size: The chunk size.
+            overlap_region: The size of the overlap region between chunks.
+
+        Returns:
+            The number of chunks or None if the recording is not in the catalog.
+        """
+        entry = self.get_entry(path)
+        if entry is None or not isinstance(chunk_size, int):
+            return None
+        return max(-(-entry['rows'] // (chunk_size - 2 * overlap_region)), 1)
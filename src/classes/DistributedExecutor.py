@@ -0,0 +1,217 @@
+import concurrent.futures
+import pickle
+import socket
+import threading
+import zlib
+from collections import deque
+from multiprocessing.connection import Connection, answer_challenge, deliver_challenge
+
+from ressources.exceptions.WorkerLostError import WorkerLostError
+
+
+class DistributedExecutor(concurrent.futures.Executor):
+    """
+    Executor that distributes tasks to worker agents on other machines over TCP.
+
+    The executor is the coordinator: it listens for WorkerAgent connections, one connection per worker slot, and hands
+    out the queued tasks (e.g. ChunkProcessor._process_chunk with the CPDetector and the chunk) as compressed pickles.
+    Connections are authenticated with a shared key, because tasks are unpickled on the other side. If a worker is
+    lost while it runs a task, the task is queued again for another worker.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, authkey: bytes = None, max_requeues=3, compress_level=1,
+                 worker_timeout=300):
+        """
+        Initialize the DistributedExecutor and start listening.
+
+        Args:
+            host: The host to listen on. Use '0.0.0.0' to accept workers of other machines.
+            port: The port to listen on (0 = any free port).
+            authkey: The shared key the worker agents authenticate with.
+            max_requeues: Number of times a task is queued again after its worker was lost, afterwards the task fails
+                with WorkerLostError.
+            compress_level: zlib compression level of the tasks and results (0 = no compression).
+            worker_timeout: Maximum time in seconds shutdown waits for a worker to connect while tasks are queued and
+                no worker is connected, afterwards the queued tasks fail with WorkerLostError (None = no limit).
+        """
+        if not authkey:
+            raise ValueError('authkey is required, tasks are unpickled by the workers')
+        self._authkey = authkey
+        self._max_requeues = max_requeues
+        self._compress_level = compress_level
+        self._worker_timeout = worker_timeout
+        self._tasks = deque()  # (future, payload, number of lost workers)
+        self._condition = threading.Condition()
+        self._connections = set()
+        self._shutdown = False
+        self._server = socket.create_server((host, port))
+        self._server.settimeout(0.5)
+        self._accept_thread = threading.Thread(target=self._accept, name='coordinator-accept', daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def address(self):
+        """
+        Get the address the coordinator listens on.
+
+        Returns:
+            Tuple of host and port.
+        """
+        return self._server.getsockname()[:2]
+
+    @property
+    def max_workers(self):
+        """
+        Get the number of connected worker slots.
+
+        Returns:
+            The number of worker slots, at least 1.
+        """
+        with self._condition:
+            return max(len(self._connections), 1)
+
+    def wait_for_workers(self, n_workers, timeout=None):
+        """
+        Block until a number of worker slots is connected.
+
+        Args:
+            n_workers: The number of worker slots.
+            timeout: Maximum time to wait in seconds (None = no limit).
+
+        Returns:
+            True if the worker slots are connected, False if the timeout expired.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self._connections) >= n_workers, timeout)
+
+    def submit(self, fn, /, *args, **kwargs):
+        """
+        Queue a task for the next free worker.
+
+        Args:
+            fn: The function to execute. It must be importable by the workers.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            A Future of the result.
+        """
+        payload = zlib.compress(pickle.dumps((fn, args, kwargs)), self._compress_level)
+        future = concurrent.futures.Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._tasks.append((future, payload, 0))
+            self._condition.notify()
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """
+        Stop accepting tasks. The worker agents are told to stop once the queue is empty.
+
+        Args:
+            wait: Whether to wait until all queued tasks are finished. While no worker is connected, it waits at most
+                worker_timeout seconds for one before the queued tasks fail.
+            cancel_futures: Whether to cancel the tasks that are still queued.
+        """
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                while self._tasks:
+                    self._tasks.popleft()[0].cancel()
+            self._condition.notify_all()
+            while wait and (self._tasks or self._connections):
+                if self._connections:
+                    self._condition.wait()
+                elif not self._condition.wait_for(lambda: self._connections or not self._tasks, self._worker_timeout):
+                    self._fail_queued('no worker connected within ' + str(self._worker_timeout) + ' seconds')
+        self._server.close()
+
+    def _fail_queued(self, reason):
+        """
+        Fail all queued tasks. The caller holds the condition.
+
+        Args:
+            reason: The reason of the failure.
+        """
+        while self._tasks:
+            future = self._tasks.popleft()[0]
+            if not future.cancelled():
+                future.set_exception(WorkerLostError('Task failed, ' + reason + '.'))
+
+    def _accept(self):
+        """Accept and authenticate worker connections until the executor is shut down."""
+        while not self._shutdown:
+            try:
+                sock, address = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            sock.settimeout(None)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)  # notices workers of machines that went down
+            connection = Connection(sock.detach())
+            try:
+                deliver_challenge(connection, self._authkey)
+                answer_challenge(connection, self._authkey)
+            except Exception:
+                connection.close()  # wrong key or not a worker agent
+                continue
+            with self._condition:
+                self._connections.add(connection)
+                self._condition.notify_all()
+            threading.Thread(target=self._serve, args=(connection,), name='coordinator-' + str(address),
+                             daemon=True).start()
+
+    def _serve(self, connection: Connection):
+        """
+        Hand out tasks to a single worker slot, one at a time.
+
+        Args:
+            connection: The authenticated connection of the worker slot.
+        """
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._tasks or self._shutdown)
+                    if not self._tasks:
+                        connection.send_bytes(b'')  # tells the worker to stop
+                        return
+                    future, payload, lost = self._tasks.popleft()
+                if not (future.running() or future.set_running_or_notify_cancel()):
+                    continue  # cancelled while queued
+                try:
+                    connection.send_bytes(payload)
+                    status, result = pickle.loads(zlib.decompress(connection.recv_bytes()))
+                except (EOFError, OSError):
+                    self._requeue(future, payload, lost)
+                    return
+                if status == 'ok':
+                    future.set_result(result)
+                elif status == 'lost':
+                    self._requeue(future, payload, lost)  # the worker process of the agent died
+                else:
+                    future.set_exception(result)
+        except (EOFError, OSError):
+            pass
+        finally:
+            connection.close()
+            with self._condition:
+                self._connections.discard(connection)
+                self._condition.notify_all()
+
+    def _requeue(self, future, payload, lost):
+        """
+        Queue a task again after its worker was lost or fail it once the requeues are exhausted.
+
+        Args:
+            future: The Future of the task.
+            payload: The compressed task.
+            lost: The number of workers lost on the task so far.
+        """
+        if lost >= self._max_requeues:
+            future.set_exception(WorkerLostError('Task failed, ' + str(lost + 1) + ' workers were lost.'))
+            return
+        with self._condition:
+            self._tasks.appendleft((future, payload, lost + 1))
+            self._condition.notify()
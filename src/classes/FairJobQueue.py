@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict, deque
+
+
+class FairJobQueue:
+    """
+    Thread-safe job queue that serves its clients round robin.
+
+    Every client has its own FIFO queue, so a client that submits many jobs at once does not delay the jobs of other
+    clients by more than one job each.
+    """
+
+    def __init__(self):
+        """Initialize an empty FairJobQueue."""
+        self._queues = OrderedDict()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def put(self, client, job):
+        """
+        Add a job to the queue of a client.
+
+        Args:
+            client: The identifier of the client.
+            job: The job to be queued.
+        """
+        with self._condition:
+            self._queues.setdefault(client, deque()).append(job)
+            self._condition.notify()
+
+    def get(self):
+        """
+        Take the next job, blocking until a job is available.
+
+        Returns:
+            The next job or None once the queue has been closed.
+        """
+        with self._condition:
+            while not self._queues and not self._closed:
+                self._condition.wait()
+            if not self._queues:
+                return None
+            client, jobs = self._queues.popitem(last=False)
+            job = jobs.popleft()
+            if jobs:
+                self._queues[client] = jobs  # the client moves to the end of the round
+            return job
+
+    def close(self):
+        """Wake up all waiting consumers; jobs still queued are returned before None."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return sum(len(jobs) for jobs in self._queues.values())
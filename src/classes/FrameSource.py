@@ -0,0 +1,220 @@
+import asyncio
+import os
+
+import numpy as np
+
+
+class FrameSource:
+    """
+    Base class of the sources of live sensor frames consumed by the IngestionService.
+
+    A source yields batches of frames as 2D NumPy arrays (frames x channels). Subclasses implement 'frames' as an
+    asynchronous generator; a source that is not consumed fast enough is not read any further (backpressure).
+    """
+
+    def __init__(self, name, n_channels=3):
+        """
+        Initialize the FrameSource.
+
+        Args:
+            name: The name of the source (e.g. the name of the spindle).
+            n_channels: The number of sensor channels per frame.
+        """
+        self.name = name
+        self.n_channels = n_channels
+
+    async def frames(self):
+        """
+        Yield batches of frames until the source is exhausted.
+
+        Returns:
+            An asynchronous generator of 2D NumPy arrays.
+        """
+        raise NotImplementedError
+        yield
+
+    def _parse_line(self, line):
+        """
+        Parse a line of comma separated values into a frame. Columns beyond the sensor channels are ignored.
+
+        Args:
+            line: The line to parse.
+
+        Returns:
+            The frame as a list of floats or None if the line is empty or not numeric (e.g. a header).
+        """
+        values = line.strip().split(',')
+        try:
+            return [float(v) for v in values[-self.n_channels:]]
+        except ValueError:
+            return None
+
+
+class SocketFrameSource(FrameSource):
+    """
+    Source that receives comma separated frames, one per line, from local socket connections.
+
+    Listens on a TCP port or, if a path is given, on a Unix domain socket. Every accepted connection feeds the same
+    source, so a machine may reconnect after a network interruption.
+    """
+
+    def __init__(self, name, n_channels=3, host='127.0.0.1', port=0, path=None, batch_size=256):
+        """
+        Initialize the SocketFrameSource.
+
+        Args:
+            name: The name of the source.
+            n_channels: The number of sensor channels per frame.
+            host: The host to listen on.
+            port: The TCP port to listen on (0 = any free port).
+            path: Path of a Unix domain socket. If given, host and port are ignored.
+            batch_size: Maximum number of frames yielded at once.
+        """
+        super().__init__(name, n_channels)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = asyncio.Queue(maxsize=16)
+        self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        batch = []
+        try:
+            async for line in reader:
+                frame = self._parse_line(line.decode())
+                if frame is None:
+                    continue
+                batch.append(frame)
+                if len(batch) >= self.batch_size:
+                    await self._queue.put(np.array(batch))  # blocks the connection while the consumer is busy
+                    batch = []
+            if batch:
+                await self._queue.put(np.array(batch))
+        finally:
+            writer.close()
+
+    async def start(self):
+        """
+        Start listening. Called by 'frames', but can be awaited beforehand to know the bound port.
+        """
+        if self._server is not None:
+            return
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop listening. Frames received before are still yielded."""
+        if self._server is not None:
+            self._server.close()
+        await self._queue.put(None)
+
+    async def frames(self):
+        await self.start()
+        while True:
+            batch = await self._queue.get()
+            if batch is None:
+                return
+            yield batch
+
+
+class CsvTailFrameSource(FrameSource):
+    """
+    Source that follows a CSV file that is still being written, similar to 'tail -f'.
+    """
+
+    def __init__(self, name, path, n_channels=3, from_start=True, poll_interval=0.5, idle_timeout=None,
+                 batch_size=4096):
+        """
+        Initialize the CsvTailFrameSource.
+
+        Args:
+            name: The name of the source.
+            path: The path of the CSV file. The last n_channels columns are used as sensor channels.
+            n_channels: The number of sensor channels per frame.
+            from_start: Whether existing lines are read or only lines appended after the start.
+            poll_interval: Seconds between two checks for new lines.
+            idle_timeout: Seconds without new lines after which the source ends (None = follow forever).
+            batch_size: Maximum number of frames yielded at once.
+        """
+        super().__init__(name, n_channels)
+        self.path = path
+        self.from_start = from_start
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.batch_size = batch_size
+
+    async def frames(self):
+        while not os.path.exists(self.path):
+            await asyncio.sleep(self.poll_interval)
+        idle = 0.0
+        rest = ''
+        with open(self.path, 'r', encoding='utf-8') as file:
+            if not self.from_start:
+                file.seek(0, os.SEEK_END)
+            while True:
+                lines = file.readlines(self.batch_size * 64)
+                if not lines:
+                    if self.idle_timeout is not None and idle >= self.idle_timeout:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    idle += self.poll_interval
+                    continue
+                idle = 0.0
+                lines[0] = rest + lines[0]
+                # the last line may still be incomplete
+                rest = '' if lines[-1].endswith('\n') else lines.pop()
+                batch = [frame for frame in map(self._parse_line, lines) if frame is not None]
+                if batch:
+                    yield np.array(batch)
+
+
+class SimulatedFrameSource(FrameSource):
+    """
+    Local stand-in for a machine: generates a piecewise constant signal with noise and regime changes.
+    """
+
+    def __init__(self, name, n_channels=3, n_frames=100000, segment_length=2000, rate=None, batch_size=1000,
+                 seed=None):
+        """
+        Initialize the SimulatedFrameSource.
+
+        Args:
+            name: The name of the source.
+            n_channels: The number of sensor channels per frame.
+            n_frames: The total number of generated frames (None = endless).
+            segment_length: The mean number of frames between two regime changes.
+            rate: Frames per second (None = as fast as they are consumed).
+            batch_size: Number of frames yielded at once.
+            seed: Seed of the random generator.
+        """
+        super().__init__(name, n_channels)
+        self.n_frames = n_frames
+        self.segment_length = segment_length
+        self.rate = rate
+        self.batch_size = batch_size
+        self._rng = np.random.default_rng(seed)
+        self.changepoints = []
+
+    async def frames(self):
+        produced = 0
+        level = self._rng.normal(0, 5, self.n_channels)
+        next_change = int(self._rng.exponential(self.segment_length)) + 1
+        while self.n_frames is None or produced < self.n_frames:
+            size = self.batch_size if self.n_frames is None else min(self.batch_size, self.n_frames - produced)
+            batch = np.empty((size, self.n_channels))
+            filled = 0
+            while filled < size:
+                part = min(size - filled, next_change - produced - filled)
+                batch[filled:filled + part] = level + self._rng.normal(0, 1, (part, self.n_channels))
+                filled += part
+                if produced + filled == next_change:
+                    self.changepoints.append(next_change)
+                    level = self._rng.normal(0, 5, self.n_channels)
+                    next_change += int(self._rng.exponential(self.segment_length)) + 1
+            produced += size
+            yield batch
+            await asyncio.sleep(size / self.rate if self.rate else 0)
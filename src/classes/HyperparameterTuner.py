@@ -0,0 +1,273 @@
+import concurrent.futures
+import contextlib
+import io
+import itertools
+import pprint
+import time
+
+import numpy as np
+import pandas as pd
+from ruptures.metrics import precision_recall
+
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.MetricSummary import MetricSummary
+from src.classes.SegmentationProcessor import SegmentationProcessor
+
+
+class HyperparameterTuner:
+    """
+    Parallel hyperparameter search for a segmentation configuration with successive halving.
+
+    All candidates of the search space are first scored on a short slice from the start of the recording. Only the
+    best 1 / eta of them are promoted to a slice eta times longer, until the remaining candidates are scored on the
+    full recording. Every candidate runs the same chunked detection and filtering as the segmentation and is scored
+    against the ground truth with the metrics of MetricSummary.
+    """
+    METRICS = ('F1', 'Randindex', 'NMI', 'Hausdorff')
+    _data = None  # the recording, set once per worker process
+
+    def __init__(self, config: dict, search_space: dict, metric='F1', eta=3, min_length=None, margin=100,
+                 num_workers=1, n_candidates=None, seed=None):
+        """
+        Initialize the HyperparameterTuner.
+
+        Args:
+            config: The segmentation configuration the candidates are derived from (e.g. drilling_config).
+            search_space: Dictionary mapping configuration keys (e.g. penalty_term, model_parameters,
+                min_segment_size, jump_points, min_cp_distance) to the list of values to try.
+            metric: The metric the candidates are ranked by ('F1', 'Randindex', 'NMI' or 'Hausdorff').
+            eta: Factor by which the slice grows and the number of candidates shrinks from one rung to the next.
+            min_length: Length of the shortest slice (None = full length / eta^(rungs - 1), at least one chunk).
+            margin: Margin in samples within which a change point counts as found for precision and recall.
+            num_workers: Number of worker processes scoring candidates in parallel.
+            n_candidates: Number of randomly drawn candidates if the grid is larger (None = full grid).
+            seed: Seed of the random candidate selection.
+        """
+        if metric not in self.METRICS:
+            raise SegmentationError('Metric not defined: ' + str(metric))
+        self._config = config
+        self._search_space = search_space
+        self._metric = metric
+        self._eta = eta
+        self._min_length = min_length
+        self._margin = margin
+        self._num_workers = num_workers
+        self._n_candidates = n_candidates
+        self._seed = seed
+        self._results = None
+
+    def _get_candidates(self):
+        """
+        Get the candidates of the search space.
+
+        Returns:
+            List of dictionaries with the values of the searched keys.
+        """
+        keys = list(self._search_space)
+        grid = [dict(zip(keys, values)) for values in itertools.product(*(self._search_space[k] for k in keys))]
+        if self._n_candidates is not None and self._n_candidates < len(grid):
+            rng = np.random.default_rng(self._seed)
+            grid = [grid[i] for i in sorted(rng.choice(len(grid), self._n_candidates, replace=False))]
+        return grid
+
+    def _get_rung_lengths(self, n_samples, n_candidates):
+        """
+        Get the slice length of every rung.
+
+        Args:
+            n_samples: The length of the recording.
+            n_candidates: The number of candidates of the first rung.
+
+        Returns:
+            List of slice lengths, the last one is the full length.
+        """
+        n_rungs = max(int(np.ceil(np.log(max(n_candidates, 1)) / np.log(self._eta))), 0) + 1
+        min_length = self._min_length or n_samples // self._eta ** (n_rungs - 1)
+        if self._config.get('chunk_window') is None and self._config['chunk_size'] != 'auto':
+            # a slice holds at least one chunk, 'auto' chunk sizes shrink with the slice
+            min_length = max(min_length, self._config['chunk_size'])
+        lengths = [n_samples]
+        while len(lengths) < n_rungs and lengths[0] // self._eta >= min_length:
+            lengths.insert(0, lengths[0] // self._eta)
+        return lengths
+
+    def tune(self, data: pd.DataFrame, ground_truth: list):
+        """
+        Search the best configuration.
+
+        Args:
+            data: The recording (unscaled, as loaded by MobileData).
+            ground_truth: List of the true change points (sample indexes).
+
+        Returns:
+            The ranked table of all candidates (see 'get_results').
+        """
+        candidates = self._get_candidates()
+        lengths = self._get_rung_lengths(len(data), len(candidates))
+        rows = []
+        alive = list(range(len(candidates)))
+        with self._create_executor(data) as executor:
+            for rung, length in enumerate(lengths):
+                futures = [executor.submit(HyperparameterTuner._score, self._candidate_config(candidates[i]), length,
+                                           ground_truth, self._margin) for i in alive]
+                scores = [future.result() for future in futures]
+                for i, score in zip(alive, scores):
+                    rows.append(dict(candidates[i], **score, Rung=rung, Length=length, Candidate=i))
+                if rung < len(lengths) - 1:
+                    ranked = sorted(zip(alive, scores), key=lambda item: self._sort_key(item[1]))
+                    alive = [i for i, _ in ranked[:max(len(alive) // self._eta, 1)]]
+        table = pd.DataFrame(rows)
+        # the result of every candidate is its score on the longest slice it reached
+        table = table.sort_values('Rung').groupby('Candidate').tail(1)
+        order = sorted(table.index, key=lambda i: (-table.at[i, 'Rung'], self._sort_key(table.loc[i])))
+        self._results = table.loc[order].reset_index(drop=True)
+        return self._results
+
+    def _create_executor(self, data):
+        """
+        Create the executor the candidates are scored with. The recording is sent to every worker only once.
+
+        Args:
+            data: The recording.
+
+        Returns:
+            The executor.
+        """
+        if self._num_workers <= 1:
+            HyperparameterTuner._set_data(data)
+            return concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self._num_workers,
+                                                      initializer=HyperparameterTuner._set_data, initargs=(data,))
+
+    @staticmethod
+    def _set_data(data):
+        """
+        Set the recording of the current process.
+
+        Args:
+            data: The recording.
+        """
+        HyperparameterTuner._data = data
+
+    def _sort_key(self, score):
+        """
+        Get the sort key of a score, the best score first. Failed candidates are ranked last.
+
+        Args:
+            score: Dictionary or Series with the metrics of a candidate.
+
+        Returns:
+            The sort key.
+        """
+        value = score[self._metric]
+        if value is None or np.isnan(value):
+            return np.inf
+        return value if self._metric == 'Hausdorff' else -value
+
+    def _apply_candidate(self, candidate: dict):
+        """
+        Update the base configuration with the values of a candidate. A searched minimum distance turns the filter of
+        close change points on, otherwise it would not change the result.
+
+        Args:
+            candidate: The values of the searched keys.
+
+        Returns:
+            The configuration.
+        """
+        config = dict(self._config, **candidate)
+        if 'min_cp_distance' in candidate:
+            config['filter_close_cps'] = True
+        return config
+
+    def _candidate_config(self, candidate: dict):
+        """
+        Build the configuration a candidate is scored with. The chunks are processed serially, the candidates run in
+        parallel.
+
+        Args:
+            candidate: The values of the searched keys.
+
+        Returns:
+            The configuration.
+        """
+        config = self._apply_candidate(candidate)
+        config.update({'backend': 'serial', 'checkpoint_path': None, 'chunk_timeout': None})
+        return config
+
+    @staticmethod
+    def _score(config, length, ground_truth, margin):
+        """
+        Segment a slice of the recording with a configuration and score it. Runs inside a worker process.
+
+        Args:
+            config: The configuration.
+            length: The length of the slice from the start of the recording.
+            ground_truth: List of the true change points of the full recording.
+            margin: Margin in samples for precision and recall.
+
+        Returns:
+            Dictionary with the metrics, the number of change points and the runtime.
+        """
+        data = HyperparameterTuner._data.iloc[:length].copy()
+        n_samples = len(HyperparameterTuner._data)
+        config = dict(config)
+        if config.get('estimated_cps') is not None:
+            # the penalty and the number of change points refer to the length of the slice
+            config['estimated_cps'] = max(config['estimated_cps'] * length / n_samples, 1)
+        true_cps = sorted(int(cp) for cp in ground_truth if 0 < cp < length) + [length]
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):  # silence the progress output of every candidate
+                seg_proc = SegmentationProcessor(('tuning', config), 'Segment Number', 1)
+                cps = seg_proc.segment_data('tuning', data)
+        except Exception as e:
+            return {'F1': np.nan, 'Randindex': np.nan, 'NMI': np.nan, 'Hausdorff': np.nan, 'n_cps': None,
+                    'Runtime': time.perf_counter() - start, 'Error': type(e).__name__ + ': ' + str(e)}
+        runtime = time.perf_counter() - start
+        predicted = sorted(int(cp) for cp in cps if 0 < cp < length) + [length]
+        metrics = MetricSummary()
+        precision, recall = precision_recall(true_cps, predicted, margin=margin)
+        hausdorff = metrics.hausdorff(predicted, true_cps) if len(predicted) > 1 and len(true_cps) > 1 else np.nan
+        return {'F1': metrics._calc_f1_score(precision, recall), 'Randindex': metrics.randindex(predicted, true_cps),
+                'NMI': metrics._calc_nmi(predicted, true_cps, length), 'Hausdorff': hausdorff,
+                'n_cps': len(predicted) - 1, 'Runtime': runtime, 'Error': None}
+
+    def get_results(self):
+        """
+        Get the ranked table of the last search.
+
+        Returns:
+            DataFrame with one row per candidate: the searched values, the metrics and runtime on the longest slice
+            the candidate reached, the rung and the slice length. Candidates that reached the full length come first.
+        """
+        return self._results
+
+    def get_best_config(self):
+        """
+        Get the configuration of the best candidate.
+
+        Returns:
+            The base configuration updated with the values of the best candidate, as it was scored.
+        """
+        if self._results is None or self._results.empty:
+            raise SegmentationError('No tuning results, call tune first.')
+        best = self._results.iloc[0]
+        candidate = {}
+        for key in self._search_space:
+            value = best[key]
+            candidate[key] = value.item() if isinstance(value, np.generic) else value
+        return self._apply_candidate(candidate)
+
+    def format_best_config(self, name='tuned_config'):
+        """
+        Format the configuration of the best candidate like an entry of config.py.
+
+        Args:
+            name: The variable name of the configuration.
+
+        Returns:
+            The configuration as Python source.
+        """
+        lines = pprint.pformat(self.get_best_config(), indent=4, width=116, sort_dicts=False)
+        return name + ' = {\n ' + lines[1:-1] + '\n}\n'
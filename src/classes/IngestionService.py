@@ -0,0 +1,209 @@
+import asyncio
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+
+from src.classes.CPDetector import CPDetector
+from src.classes.FrameSource import FrameSource
+from src.classes.Instrumentation import Instrumentation
+
+
+class IngestionService:
+    """
+    Asynchronous ingestion of live sensor frames from many sources.
+
+    Every source is buffered into fixed-size windows. Consecutive windows share 'overlap' frames, so change points close
+    to a window border are not lost; each window only reports the change points of the region it owns (the middle of
+    the overlap is the border). Full windows are dispatched to a pool of worker processes shared by all sources. The
+    number of windows in flight is limited, so a source is not read any further while the pool is saturated.
+    """
+
+    def __init__(self, cpd_method: CPDetector, window_size, overlap=0, num_workers=None, max_in_flight=None,
+                 scale=True, on_changepoints=None, instrumentation: Instrumentation = None):
+        """
+        Initialize the IngestionService.
+
+        Args:
+            cpd_method: The CPDetector used for every window.
+            window_size: The number of frames per window.
+            overlap: The number of frames shared by two consecutive windows.
+            num_workers: Number of worker processes shared by all sources (None = number of CPUs).
+            max_in_flight: Maximum number of windows dispatched at the same time (None = 2 * num_workers).
+            scale: Whether every window is standardized before the detection.
+            on_changepoints: Callback called with every result dictionary (optional). If it is set, the results are not
+                emitted to the results queue.
+            instrumentation: Instrumentation used to record the detection time of each window (optional).
+        """
+        if overlap >= window_size // 2:
+            raise ValueError('overlap must be smaller than half of the window_size')
+        self._cpd_method = cpd_method
+        self._window_size = window_size
+        self._overlap = overlap
+        self._num_workers = num_workers
+        self._max_in_flight = max_in_flight
+        self._scale = scale
+        self._on_changepoints = on_changepoints
+        self._instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+        self._sources = []
+        self._results = None
+        self._executor = None
+        self._slots = None
+
+    def add_source(self, source: FrameSource):
+        """
+        Add a source. Sources must be added before 'run' is called.
+
+        Args:
+            source: The FrameSource to be consumed.
+        """
+        self._sources.append(source)
+
+    @property
+    def results(self):
+        """
+        Get the queue the results are emitted to while the service is running, unless an on_changepoints callback is
+        set. The queue holds as many results as windows may be in flight; while it is full no further window is
+        dispatched, so the caller has to drain it.
+
+        Returns:
+            An asyncio.Queue of result dictionaries with the keys 'source', 'window', 'changepoints' (absolute frame
+            indexes of the source) and 'duration'.
+        """
+        return self._results
+
+    async def run(self):
+        """
+        Consume all sources until they are exhausted.
+        """
+        num_workers = self._num_workers or os.cpu_count() or 1
+        max_in_flight = self._max_in_flight or 2 * num_workers
+        self._results = asyncio.Queue(maxsize=max_in_flight) if self._results is None else self._results
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        try:
+            await asyncio.gather(*(self._consume(source) for source in self._sources))
+        finally:
+            self._executor.shutdown(wait=True)
+
+    async def _consume(self, source: FrameSource):
+        """
+        Buffer the frames of a source into windows and dispatch every full window. A full window is held back until
+        the next frame arrives, so the last window of the source always owns the end of the source.
+
+        Args:
+            source: The FrameSource to be consumed.
+
+        Raises:
+            Exception: The first error raised while detecting or emitting a window of the source.
+        """
+        window = np.empty((self._window_size, source.n_channels))
+        filled = 0
+        offset = 0  # absolute index of the first frame of the window
+        window_nr = 0
+        pending = None  # full window that has not been dispatched yet (number, frames, offset)
+        tasks = []
+        try:
+            async for batch in source.frames():
+                position = 0
+                while position < len(batch):
+                    if pending is not None:
+                        # more frames follow, so the held back window does not own the end of the source
+                        await self._submit(tasks, source.name, *pending, last=False)
+                        pending = None
+                    part = min(len(batch) - position, self._window_size - filled)
+                    window[filled:filled + part] = batch[position:position + part]
+                    filled += part
+                    position += part
+                    if filled == self._window_size:
+                        pending = (window_nr, window.copy(), offset)
+                        window[:self._overlap] = window[self._window_size - self._overlap:]
+                        offset += self._window_size - self._overlap
+                        filled = self._overlap
+                        window_nr += 1
+            if pending is not None:
+                # the source ended on a window boundary if no frame followed the overlap of the held back window
+                await self._submit(tasks, source.name, *pending, last=filled == self._overlap)
+            if filled > self._overlap or (window_nr == 0 and filled > 0):
+                await self._submit(tasks, source.name, window_nr, window[:filled].copy(), offset, last=True)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _submit(self, tasks, source_name, window_nr, window, offset, last):
+        """
+        Wait for a free slot and dispatch a window. Finished windows are removed from the tasks, the first error of a
+        finished window is raised.
+
+        Args:
+            tasks: The list of the dispatched windows of the source that may not have finished yet.
+            source_name: The name of the source.
+            window_nr: The number of the window within the source.
+            window: The frames of the window.
+            offset: The absolute index of the first frame of the window.
+            last: Whether the window is the last one of the source.
+
+        Raises:
+            Exception: The error raised while detecting or emitting a finished window.
+        """
+        await self._slots.acquire()  # backpressure: wait for a free slot before reading on
+        finished = [task for task in tasks if task.done()]
+        tasks[:] = [task for task in tasks if not task.done()]
+        tasks.append(asyncio.ensure_future(self._dispatch(source_name, window_nr, window, offset, last)))
+        for task in finished:
+            if task.exception() is not None:
+                raise task.exception()
+
+    async def _dispatch(self, source_name, window_nr, window, offset, last):
+        """
+        Detect the change points of a window in the worker pool and emit them.
+
+        Args:
+            source_name: The name of the source.
+            window_nr: The number of the window within the source.
+            window: The frames of the window.
+            offset: The absolute index of the first frame of the window.
+            last: Whether the window is the last one of the source.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            cps, duration = await loop.run_in_executor(self._executor, IngestionService._detect_window,
+                                                       self._cpd_method, window, self._scale)
+            half_overlap = self._overlap // 2
+            lower = 0 if window_nr == 0 else half_overlap
+            upper = len(window) if last else len(window) - (self._overlap - half_overlap)
+            changepoints = [offset + cp for cp in cps if lower <= cp < upper]
+            result = {'source': source_name, 'window': window_nr, 'changepoints': changepoints, 'duration': duration}
+            self._instrumentation.record('detect_window', duration, source=source_name, window=window_nr)
+            self._instrumentation.count('windows')
+            self._instrumentation.count('changepoints', len(changepoints))
+            if self._on_changepoints is not None:
+                self._on_changepoints(result)
+            else:
+                # the slot is held until the result is queued, so a full queue stops reading the sources
+                await self._results.put(result)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _detect_window(cpd_method: CPDetector, window, scale):
+        """
+        Detect the change points of a window. Runs inside a worker process.
+
+        Args:
+            cpd_method: The CPDetector used for the window.
+            window: The frames of the window.
+            scale: Whether the window is standardized before the detection.
+
+        Returns:
+            Tuple of the change points relative to the window (without the end of the window) and the detection time.
+        """
+        start = time.perf_counter()
+        if scale:
+            std = window.std(axis=0)
+            window = (window - window.mean(axis=0)) / np.where(std == 0, 1, std)
+        cps = [int(cp) for cp in cpd_method.run(window)[:-1]]
+        return cps, time.perf_counter() - start
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+
+class Instrumentation:
+    """
+    Lightweight instrumentation layer for the segmentation pipeline.
+
+    Records named spans (load, scale, chunk, detect, merge, filter, label, write, ...) and counters (rows, chunks,
+    changepoints, ...). Timings measured inside worker processes can be added afterwards with 'record'. When the
+    instrumentation is disabled every call returns immediately, so it can stay in the hot paths of the pipeline.
+    """
+    _NULL_SPAN = nullcontext()
+
+    def __init__(self, enabled=True, output_path=None):
+        """
+        Initialize the Instrumentation instance.
+
+        Args:
+            enabled: Whether spans and counters are recorded.
+            output_path: Path of the JSON-lines file used by 'export_jsonl' if no path is given there.
+        """
+        self._enabled = enabled
+        self._output_path = output_path
+        self._events = []
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """
+        Get the state of the instrumentation.
+
+        Returns:
+            True if spans and counters are recorded.
+        """
+        return self._enabled
+
+    def span(self, name, **attributes):
+        """
+        Measure the duration of a block of code.
+
+        Args:
+            name: The name of the span (e.g. 'load' or 'detect').
+            **attributes: Additional attributes stored with the span (e.g. process=...).
+
+        Returns:
+            A context manager that records the span when the block is left.
+        """
+        if not self._enabled:
+            return self._NULL_SPAN
+        return self._measure(name, attributes)
+
+    @contextmanager
+    def _measure(self, name, attributes):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **attributes)
+
+    def record(self, name, duration, **attributes):
+        """
+        Record a span that has been measured elsewhere, e.g. inside a worker process.
+
+        Args:
+            name: The name of the span.
+            duration: The duration of the span in seconds.
+            **attributes: Additional attributes stored with the span (e.g. worker=pid).
+        """
+        if not self._enabled:
+            return
+        event = {'type': 'span', 'name': name, 'duration': duration, 'timestamp': time.time()}
+        event.update(attributes)
+        if 'worker' not in event:
+            event['worker'] = os.getpid()
+        self._events.append(event)
+
+    def count(self, name, value=1):
+        """
+        Increase a counter.
+
+        Args:
+            name: The name of the counter (e.g. 'rows' or 'changepoints').
+            value: The value to add to the counter.
+        """
+        if not self._enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get_counters(self):
+        """
+        Get the current counter values.
+
+        Returns:
+            Dictionary mapping counter names to their values.
+        """
+        return dict(self._counters)
+
+    def get_events(self):
+        """
+        Get the recorded spans.
+
+        Returns:
+            List of span dictionaries.
+        """
+        return list(self._events)
+
+    def summary(self):
+        """
+        Summarize the recorded spans per name.
+
+        Returns:
+            A pandas DataFrame with count, total, mean, min and max duration per span name sorted by total duration.
+        """
+        columns = ['Span', 'Count', 'Total [s]', 'Mean [s]', 'Min [s]', 'Max [s]']
+        if not self._events:
+            return pd.DataFrame(columns=columns)
+        events = pd.DataFrame(self._events)
+        grouped = events.groupby('name')['duration'].agg(['count', 'sum', 'mean', 'min', 'max']).reset_index()
+        grouped.columns = columns
+        return grouped.sort_values('Total [s]', ascending=False).reset_index(drop=True)
+
+    def export_jsonl(self, path=None):
+        """
+        Append the recorded spans and counters to a JSON-lines file.
+
+        Args:
+            path: The target file. If None, the output path of the instance is used.
+
+        Returns:
+            The path of the written file or None if nothing was written.
+        """
+        path = path if path is not None else self._output_path
+        if not self._enabled or path is None:
+            return None
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, 'a', encoding='utf-8') as file:
+            for event in self._events:
+                file.write(json.dumps(event, default=str) + '\n')
+            for name, value in self._counters.items():
+                file.write(json.dumps({'type': 'counter', 'name': name, 'value': value}, default=str) + '\n')
+        return path
+
+    def reset(self):
+        """Remove all recorded spans and counters."""
+        self._events = []
+        self._counters = {}
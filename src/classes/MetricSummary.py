@@ -1,9 +1,9 @@
 import pandas as pd
-from ruptures.metrics import hausdorff, precision_recall, randindex
-from sklearn.metrics import normalized_mutual_info_score
+from ruptures.metrics import precision_recall
 from ressources.exceptions.SegmentationError import SegmentationError
 from src.classes.Utility import Utility
 import time
+import tracemalloc
 import numpy as np
 
 
@@ -16,19 +16,24 @@ class MetricSummary:
         self.columns = ['Algorithm', 'Known CPs', 'Penalty', 'n_cps',
                         'Annotation Error', 'Hausdorff',
                         'Precision',
-                        'Recall', 'F1', 'Randindex', 'NMI', 'Runtime']
-        self._df = pd.DataFrame(columns=self.columns)
+                        'Recall', 'F1', 'Randindex', 'NMI', 'Runtime',
+                        'Runtime IQR', 'Fit', 'Predict', 'Peak Memory [MB]']
+        self._rows = []
+        self._df = None
         self._margin = 0
 
     def add_row(self, row: list):
         """
-        Add a row of metrics to the DataFrame.
+        Add a row of metrics. The rows are collected and only turned into a DataFrame when it is requested.
 
         Args:
             row: A list containing the metric values.
         """
-        n_rows = len(self._df)
-        self._df.loc[n_rows] = row
+        if len(row) != len(self.columns):
+            raise SegmentationError('Row has ' + str(len(row)) + ' values, but there are ' + str(len(self.columns)) +
+                                    ' columns.')
+        self._rows.append(row)
+        self._df = None
 
     def calc_metrics(self, predicted_cp, ground_truth, data, margin_percent):
         """
@@ -44,11 +49,11 @@ class MetricSummary:
             A tuple of calculated metrics.
         """
         an_error = abs(len(predicted_cp) - len(ground_truth))  # annotation error
-        hd = hausdorff(predicted_cp, ground_truth)  # hausdorff-metric
+        hd = self.hausdorff(predicted_cp, ground_truth)  # hausdorff-metric
         self._margin = self._calc_margin_by_percent(data, margin_percent)
         p, r = precision_recall(ground_truth, predicted_cp, margin=self._margin)  # precision/recall with margin
         f1 = self._calc_f1_score(p, r)  # f1-score
-        ri = randindex(predicted_cp, ground_truth)  # randindex
+        ri = self.randindex(predicted_cp, ground_truth)  # randindex
         nmi = self._calc_nmi(predicted_cp, ground_truth, len(data))  # normalized mutual info score
         return an_error, hd, p, r, f1, ri, nmi
 
@@ -68,30 +73,49 @@ class MetricSummary:
         else:
             return 2 * ((p * r) / (p + r))
 
-    def _generate_labels(self, cps, n_samples):
+    @staticmethod
+    def _segment_overlaps(bkps1, bkps2, n_samples):
         """
-        Generate labels for each segment based on the change points.
+        Calculate the contingency table of two segmentations from the overlaps of their segments.
+
+        The union of both breakpoint lists splits the samples into intervals that lie in exactly one segment of each
+        segmentation, so the non-zero cells of the contingency table are the interval lengths (at most k1 + k2 cells).
 
         Args:
-            cps: List of change points.
+            bkps1: Sorted list of breakpoints of the first segmentation.
+            bkps2: Sorted list of breakpoints of the second segmentation.
             n_samples: Number of samples in the dataset.
 
         Returns:
-            A numpy array of labels.
-        """
-        labels = np.zeros(n_samples, dtype=int)
-        current_label = 0
-        prev_break = 0
-        for break_point in cps:
-            labels[prev_break:break_point] = current_label
-            current_label += 1
-            prev_break = break_point
-        labels[prev_break:n_samples] = current_label
-        return labels
+            Tuple of the segment lengths of the first and the second segmentation and the non-zero cells of the
+            contingency table.
+        """
+        edges1 = np.unique(np.clip(np.concatenate(([0], bkps1, [n_samples])), 0, n_samples).astype(np.int64))
+        edges2 = np.unique(np.clip(np.concatenate(([0], bkps2, [n_samples])), 0, n_samples).astype(np.int64))
+        cells = np.diff(np.union1d(edges1, edges2))
+        return np.diff(edges1), np.diff(edges2), cells
+
+    @staticmethod
+    def _entropy(sizes):
+        """
+        Calculate the entropy of a segmentation like sklearn (1.0 for a single segment).
+
+        Args:
+            sizes: The segment lengths.
+
+        Returns:
+            The entropy.
+        """
+        if len(sizes) == 1:
+            return 1.0
+        sizes = sizes.astype(np.float64)
+        total = sizes.sum()
+        return -np.sum((sizes / total) * (np.log(sizes) - np.log(total)))
 
     def _calc_nmi(self, predicted_cp, ground_truth, n_samples):
         """
-        Calculate the Normalized Mutual Information (NMI) score.
+        Calculate the Normalized Mutual Information (NMI) score with arithmetic normalization, equal to sklearn's
+        normalized_mutual_info_score on the sample labels but computed from the segment overlaps.
 
         Args:
             predicted_cp: List of predicted change points.
@@ -101,16 +125,89 @@ class MetricSummary:
         Returns:
             The NMI score.
         """
-        labels_true = self._generate_labels(ground_truth, n_samples)
-        labels_pred = self._generate_labels(predicted_cp, n_samples)
-        return normalized_mutual_info_score(labels_true, labels_pred)
+        sizes_true, sizes_pred, cells = self._segment_overlaps(ground_truth, predicted_cp, n_samples)
+        if len(sizes_true) == len(sizes_pred) == 1:
+            return 1.0
+        if len(sizes_true) == 1 or len(sizes_pred) == 1:
+            return 0.0
+        # segment index of every cell: the cells are ordered, a segment ends where its cumulative length is reached
+        ends = np.cumsum(cells)
+        seg_true = np.searchsorted(np.cumsum(sizes_true), ends, side='left')
+        seg_pred = np.searchsorted(np.cumsum(sizes_pred), ends, side='left')
+        total = float(n_samples)
+        joint = cells / total
+        outer = sizes_true[seg_true].astype(np.float64) * sizes_pred[seg_pred].astype(np.float64)
+        mi = joint * (np.log(cells) - np.log(total)) + joint * (np.log(total) * 2 - np.log(outer))
+        mi = np.where(np.abs(mi) < np.finfo(np.float64).eps, 0.0, mi)
+        mi = max(mi.sum(), 0.0)
+        if mi == 0:
+            return 0.0
+        normalizer = max((self._entropy(sizes_true) + self._entropy(sizes_pred)) / 2, np.finfo(np.float64).eps)
+        return float(mi / normalizer)
+
+    @classmethod
+    def randindex(cls, bkps1, bkps2):
+        """
+        Calculate the Rand index of two segmentations from the overlaps of their segments in O(k1 + k2).
+
+        Args:
+            bkps1: Sorted list of breakpoints, the last one is the number of samples.
+            bkps2: Sorted list of breakpoints, the last one is the number of samples.
+
+        Returns:
+            The Rand index.
+
+        Raises:
+            SegmentationError: If the breakpoint lists end at different numbers of samples.
+        """
+        if bkps1[-1] != bkps2[-1]:
+            raise SegmentationError('The breakpoint lists must end with the same number of samples.')
+        n_samples = bkps1[-1]
+        sizes1, sizes2, cells = cls._segment_overlaps(bkps1, bkps2, n_samples)
+        sizes1, sizes2, cells = sizes1.astype(np.float64), sizes2.astype(np.float64), cells.astype(np.float64)
+        # pairs of samples that are in the same segment in only one of the segmentations
+        disagreement = (np.sum(sizes1 ** 2) + np.sum(sizes2 ** 2) - 2 * np.sum(cells ** 2)) / 2
+        return 1.0 - disagreement / (n_samples * (n_samples - 1) / 2)
+
+    @staticmethod
+    def hausdorff(bkps1, bkps2):
+        """
+        Calculate the Hausdorff distance between the change points of two segmentations by merging the sorted lists.
+
+        Args:
+            bkps1: Sorted list of breakpoints, the last one is the number of samples.
+            bkps2: Sorted list of breakpoints, the last one is the number of samples.
+
+        Returns:
+            The Hausdorff distance.
+
+        Raises:
+            SegmentationError: If one of the segmentations has no change points.
+        """
+        cps1 = np.asarray(bkps1[:-1], dtype=np.float64)
+        cps2 = np.asarray(bkps2[:-1], dtype=np.float64)
+        if len(cps1) == 0 or len(cps2) == 0:
+            raise SegmentationError('Hausdorff distance requires change points in both segmentations.')
+
+        def directed(a, b):
+            # distance of every point of a to its nearest neighbour in b (left or right insertion neighbour)
+            idx = np.searchsorted(b, a)
+            left = np.abs(a - b[np.clip(idx - 1, 0, len(b) - 1)])
+            right = np.abs(b[np.clip(idx, 0, len(b) - 1)] - a)
+            return np.minimum(left, right).max()
+
+        return float(max(directed(cps1, cps2), directed(cps2, cps1)))
 
     def compare_cpd_algorithms(self, data, ground_truth: list, algorithm: list, penalties: list = None,
                                n_cps: int = None,
-                               metadata: dict = None):
+                               metadata: dict = None, repeats: int = 1, warmup: int = 0, track_memory: bool = False):
         """
         Compare different change point detection algorithms.
 
+        Every configuration is benchmarked: fit and predict are timed separately with a monotonic high-resolution
+        clock over 'repeats' runs after 'warmup' untimed runs. 'Runtime' is the median of fit plus predict, 'Runtime
+        IQR' its interquartile range and 'Fit' and 'Predict' the medians of the single steps, all in seconds.
+
         Args:
             data: The dataset being analyzed.
             ground_truth: List of ground truth change points.
@@ -118,6 +215,10 @@ class MetricSummary:
             penalties: List of penalties to apply (optional).
             n_cps: Number of change points to detect (optional).
             metadata: Additional metadata for the algorithms (optional).
+            repeats: Number of timed runs per configuration.
+            warmup: Number of untimed runs before the timed runs (e.g. to fill caches).
+            track_memory: Whether the peak memory of fit and predict is measured with tracemalloc in an additional
+                run. Memory allocated by C extensions outside of Python's allocators is not included.
 
         Raises:
             SegmentationError: If neither penalties nor n_cps are provided.
@@ -138,15 +239,15 @@ class MetricSummary:
             algo_name = algo.__class__.__name__
             algo_spec_data = static_data.copy()
             algo_spec_data.append(algo_name)
-            algo.fit(data.values)
             if penalties is not None:
                 for pen in penalties:
-                    spec_data = self._gen_penalized_stat(data, algo, ground_truth, pen, est_cp, mod_params)
+                    spec_data = self._gen_penalized_stat(data, algo, ground_truth, pen, est_cp, mod_params, repeats,
+                                                         warmup, track_memory)
                     stat_data = algo_spec_data.copy()
                     stat_data.extend(spec_data)
                     self.add_row(stat_data)
             else:
-                spec_data = self._gen_cp_stat(data, algo, ground_truth, n_cps)
+                spec_data = self._gen_cp_stat(data, algo, ground_truth, n_cps, repeats, warmup, track_memory)
                 algo_spec_data.extend(spec_data)
                 self.add_row(algo_spec_data)
 
@@ -160,15 +261,71 @@ class MetricSummary:
         Returns:
             A list of metadata values.
         """
-        content = []
         for i, key in enumerate(metadata.keys()):
             if key not in self.columns:
                 self.columns.insert(i, key)
-                content.append(metadata[key])
-        self._df = pd.DataFrame(columns=self.columns)
-        return content
+                self._rows = []  # rows of other columns can not be combined with the new ones
+                self._df = None
+        return [metadata[key] for key in metadata.keys()]
+
+    @staticmethod
+    def benchmark(algo, signal, predict_kwargs: dict, repeats=1, warmup=0, track_memory=False):
+        """
+        Benchmark fit and predict of an algorithm.
+
+        Args:
+            algo: The algorithm (ruptures search method or a compatible engine).
+            signal: The signal as NumPy array.
+            predict_kwargs: Keyword arguments of predict (e.g. pen or n_bkps).
+            repeats: Number of timed runs.
+            warmup: Number of untimed runs before the timed runs.
+            track_memory: Whether the peak memory is measured with tracemalloc in an additional run.
+
+        Returns:
+            Tuple of the change points of the last run and a dictionary with the median and interquartile range of
+            fit plus predict ('runtime', 'runtime_iqr'), the medians of fit and predict ('fit', 'predict') in seconds
+            and the peak memory in bytes ('peak_memory', None if not tracked).
+        """
+        cps = None
+        for _ in range(warmup):
+            cps = algo.fit(signal).predict(**predict_kwargs)
+        fit_times, predict_times = [], []
+        for _ in range(max(repeats, 1)):
+            start = time.perf_counter()
+            algo.fit(signal)
+            fitted = time.perf_counter()
+            cps = algo.predict(**predict_kwargs)
+            fit_times.append(fitted - start)
+            predict_times.append(time.perf_counter() - fitted)
+        peak_memory = None
+        if track_memory:
+            # separate run, tracing slows down the allocations and would distort the timings
+            tracemalloc.start()
+            try:
+                algo.fit(signal).predict(**predict_kwargs)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        totals = np.add(fit_times, predict_times)
+        q1, median, q3 = np.percentile(totals, [25, 50, 75])
+        return cps, {'runtime': median, 'runtime_iqr': q3 - q1, 'fit': float(np.median(fit_times)),
+                     'predict': float(np.median(predict_times)), 'peak_memory': peak_memory}
+
+    def _benchmark_columns(self, stats):
+        """
+        Get the values of the benchmark columns.
+
+        Args:
+            stats: The statistics returned by 'benchmark'.
+
+        Returns:
+            A list with runtime, runtime IQR, fit, predict and peak memory in MB.
+        """
+        peak_memory = None if stats['peak_memory'] is None else stats['peak_memory'] / 1024 ** 2
+        return [stats['runtime'], stats['runtime_iqr'], stats['fit'], stats['predict'], peak_memory]
 
-    def _gen_penalized_stat(self, data, algo, ground_truth, pen_name, est_cp, mod_params):
+    def _gen_penalized_stat(self, data, algo, ground_truth, pen_name, est_cp, mod_params, repeats=1, warmup=0,
+                            track_memory=False):
         """
         Generate statistics for a penalized change point detection algorithm.
 
@@ -179,20 +336,22 @@ class MetricSummary:
             pen_name: The name of the penalty.
             est_cp: Estimated number of change points.
             mod_params: Model parameters.
+            repeats: Number of timed runs.
+            warmup: Number of untimed runs before the timed runs.
+            track_memory: Whether the peak memory is measured.
 
         Returns:
             A list of calculated metrics.
         """
         spec_data = [False, pen_name, 'unknown']
-        start_time = time.time()
-        cps = algo.predict(pen=Utility.get_penalty(len(data), pen_name, est_cp, mod_params))
-        duration = time.time() - start_time
+        pen = Utility.get_penalty(len(data), pen_name, est_cp, mod_params)
+        cps, stats = self.benchmark(algo, data.values, {'pen': pen}, repeats, warmup, track_memory)
         metrics = self.calc_metrics(cps, ground_truth, data, 0.05)
         spec_data.extend(metrics)
-        spec_data.append(duration)
+        spec_data.extend(self._benchmark_columns(stats))
         return spec_data
 
-    def _gen_cp_stat(self, data, algo, ground_truth, n_cps):
+    def _gen_cp_stat(self, data, algo, ground_truth, n_cps, repeats=1, warmup=0, track_memory=False):
         """
         Generate statistics for a change point detection algorithm with a fixed number of change points.
 
@@ -201,17 +360,18 @@ class MetricSummary:
             algo: The algorithm being used.
             ground_truth: List of ground truth change points.
             n_cps: Number of change points to detect.
+            repeats: Number of timed runs.
+            warmup: Number of untimed runs before the timed runs.
+            track_memory: Whether the peak memory is measured.
 
         Returns:
         A list of calculated metrics.
         """
-        spec_data = [True, n_cps]
-        start_time = time.time()
-        cps = algo.predict(n_bkps=n_cps)
-        duration = time.time() - start_time
+        spec_data = [True, None, n_cps]
+        cps, stats = self.benchmark(algo, data.values, {'n_bkps': n_cps}, repeats, warmup, track_memory)
         metrics = self.calc_metrics(cps, ground_truth, data, 0.05)
         spec_data.extend(metrics)
-        spec_data.append(duration)
+        spec_data.extend(self._benchmark_columns(stats))
         return spec_data
 
     def _calc_margin_by_percent(self, data, margin_percent):
@@ -239,6 +399,8 @@ class MetricSummary:
         Returns:
             The DataFrame with metric summaries.
         """
+        if self._df is None:
+            self._df = pd.DataFrame(self._rows, columns=self.columns)
         return self._df
 
     @property
@@ -249,4 +411,4 @@ class MetricSummary:
         Returns:
             The number of rows in the DataFrame.
         """
-        return len(self._df)
+        return len(self._rows)
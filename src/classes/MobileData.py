@@ -2,21 +2,39 @@ from enum import Enum
 
 import pandas as pd
 
+from src.classes.ColumnStore import ColumnStore
+from src.classes.SampleGrid import SampleGrid
+
 
 class MobileData:
 
-    def __init__(self, process: Enum):
+    def __init__(self, process: Enum, resample=None, sample_period=None, max_gap=None):
         """
-        Initialize the MobileData instance.
+        Initialize the MobileData instance. If the CSV file was converted into a ColumnStore (see data_loader.py), the
+        store is loaded instead of parsing the CSV file.
 
         Args:
             process: An enum representing the process. The enum value should be the path to the CSV file.
+            resample: Method putting the recording onto a uniform time grid, 'clean', 'interpolate' or 'mean' (see
+                SampleGrid, None = keep the raw timestamps).
+            sample_period: Period of the uniform grid (e.g. '10ms', None = median sampling interval).
+            max_gap: Longest interval bridged by the grid (e.g. '1s', None = no detected gap), the grid is split at
+                longer gaps.
         """
-        dataframe = pd.read_csv(process.value)
-        dataframe['time'] = pd.to_datetime(dataframe['time'], format='ISO8601')
-        dataframe.set_index('time', inplace=True)
-        dataframe.sort_index(inplace=True)
-        self._df = dataframe[['Bending Moment', 'Axial Force', 'Torsion']]
+        columns = ['Bending Moment', 'Axial Force', 'Torsion']
+        self._report = None
+        store = ColumnStore.locate(process.value)
+        self._store = store if resample is None else None
+        if store is not None:
+            self._df = ColumnStore.read(store, columns)
+        else:
+            dataframe = pd.read_csv(process.value)
+            dataframe['time'] = pd.to_datetime(dataframe['time'], format='ISO8601')
+            dataframe.set_index('time', inplace=True)
+            dataframe.sort_index(inplace=True)
+            self._df = dataframe[columns]
+        if resample is not None:
+            self._df, self._report = SampleGrid(resample, sample_period, max_gap).apply(self._df)
 
     @property
     def df(self):
@@ -37,3 +55,22 @@ class MobileData:
             val: A pandas DataFrame containing the columns 'Bending Moment', 'Axial Force', and 'Torsion'.
         """
         self._df = val
+
+    def get_store(self):
+        """
+        Get the ColumnStore the rows of the dataframe were read from unchanged, in the same order.
+
+        Returns:
+            The path of the store or None if the recording was parsed from CSV or resampled.
+        """
+        return self._store
+
+    def get_report(self):
+        """
+        Get the report of the resampling (rows, NaN rows, duplicate timestamps, gaps, jitter, grid rows, splits and
+        period).
+
+        Returns:
+            Dictionary of the report or None if the recording was not resampled.
+        """
+        return self._report
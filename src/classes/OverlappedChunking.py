@@ -1,7 +1,10 @@
 from typing import List
 
+import numpy as np
+
 from ressources.exceptions.SegmentationError import SegmentationError
 from src.classes.Chunk import Chunk
+from src.classes.TimeWindowPlanner import TimeWindowPlanner
 
 
 class OverlappedChunking:
@@ -14,151 +17,167 @@ class OverlappedChunking:
        / 10 . 1080 / 10618600 . 2019 . 1647216. url: https : //doi.org/10.1080/10618600.2019.1647216.
 
     """
-    def __init__(self):
-        """chunk data into parts that can be processed with multiprocessing but at least 1 """
-        self.n = None
-        self.subset_size = None
-        self.real_subset_size = None
-        self.overlap_region = None
-        self.n_chunks = None
-        self.chunks = []
-        self.inkrement = 0
+    # columns of a plan: chunk id, first and last row + 1 of the chunk and of the rows the chunk owns (reports change
+    # points for); the owned rows of consecutive chunks meet in the middle of their shared rows
+    PLAN_COLUMNS = ('id', 'start', 'end', 'owned_start', 'owned_end')
 
-    def chunk_data(self, dataset, chunk_size, overlap_region, chunk_nr_start):
+    @staticmethod
+    def plan(n, chunk_size, overlap_region, chunk_nr_start=0):
         """
-        Chunk the data into overlapping subsets.
+        Plan overlapping chunks of a fixed number of rows.
 
         Args:
-            dataset: The dataset to be chunked.
+            n: The number of rows of the dataset.
             chunk_size: The size of each chunk.
             overlap_region: The size of the overlap region between chunks.
             chunk_nr_start: The starting chunk number.
 
         Returns:
-            List of created chunks.
-        """
-        self.overlap_region = overlap_region
-        self.n = len(dataset)
-        self.subset_size = chunk_size - 2 * overlap_region
-        self.n_chunks = self.n // self.subset_size
-
-        rest = self.n % self.subset_size
-        actual_chunk_nr = chunk_nr_start
-        last_index_reached = False
+            The plan, an int64 array of shape (chunks, 5) with the columns of PLAN_COLUMNS.
 
+        Raises:
+            SegmentationError: If the overlap region leaves no rows to a chunk.
+        """
+        subset_size = chunk_size - 2 * overlap_region
         # Ensure the overlap_region is appropriate for the given chunk_size (chunk_size - 2 * overlap_region > 0).
-        if self.subset_size == 0:
+        if subset_size <= 0:
             raise SegmentationError('overlap_region is too large for the given chunk_size. Consider : chunksize - 2 * '
                                     'overlap_region > 0')
+        n_chunks = n // subset_size
+        rest = n % subset_size
+        intervals = []
+        last_index_reached = False
 
         # split the dataset into subsets
         start = 0
-        for i in range(self.n_chunks):
-            end = start + self.subset_size
+        end = 0
+        for i in range(n_chunks):
+            end = start + subset_size
             # first and last only needs an overlap_region in one direction
             if i == 0:
                 end += overlap_region
             if i > 0:
                 start = start - overlap_region
-            if i < self.n_chunks - 1:
+            if i < n_chunks - 1:
                 end += overlap_region
             # if the end of data set is reached then no more chunking is necessary
-            if i == self.n_chunks - 1:
-                if rest != 0:
-                    end += overlap_region
-            if end >= self.n:
+            if i == n_chunks - 1 and rest != 0:
+                end += overlap_region
+            if end >= n:
                 last_index_reached = True
-                if rest != 0:
-                    end += overlap_region
-                self._set_chunk(actual_chunk_nr, dataset, self.calculate_interval_borders(start, end))
-                actual_chunk_nr += 1
+                intervals.append((start, end))
                 break
-
-            self._set_chunk(actual_chunk_nr, dataset, self.calculate_interval_borders(start, end))
-            actual_chunk_nr += 1
+            intervals.append((start, end))
             start = end - overlap_region
 
         # Additional chunk for the remaining data
         if rest > 0 and not last_index_reached:
-            start = start - overlap_region
-            self.chunks.append(Chunk(actual_chunk_nr, dataset[start:self.n]))
+            intervals.append((start - overlap_region, n))
+        bounds = np.clip(np.array(intervals, dtype=np.int64).reshape(-1, 2), 0, n)
+        return OverlappedChunking._assemble(bounds, chunk_nr_start)
+
+    @staticmethod
+    def plan_by_time(index, window, overlap_region, chunk_nr_start=0):
+        """
+        Plan overlapping chunks aligned to time windows of the index instead of a fixed number of rows. Windows
+        without rows (gaps in the recording) are skipped, every other window is one chunk.
+
+        Args:
+            index: The sorted timestamps of the dataset.
+            window: The duration covered by each chunk without its overlap regions (e.g. '10min').
+            overlap_region: The size of the overlap region between chunks in rows.
+            chunk_nr_start: The starting chunk number.
+
+        Returns:
+            The plan, an int64 array of shape (chunks, 5) with the columns of PLAN_COLUMNS.
+        """
+        windows = TimeWindowPlanner(index).plan(window, drop_empty=True)
+        # consecutive chunks share 2 * overlap_region rows, like the chunks of plan
+        bounds = np.clip(windows + np.array([-overlap_region, overlap_region]), 0, len(index))
+        return OverlappedChunking._assemble(bounds, chunk_nr_start)
+
+    @staticmethod
+    def _assemble(bounds, chunk_nr_start):
+        """
+        Assemble a plan. Every chunk owns the rows from the middle of the rows it shares with the previous chunk to the
+        middle of the rows it shares with the next chunk, so every row is owned by exactly one chunk.
 
-        return self.chunks
+        Args:
+            bounds: Array of shape (chunks, 2) with the start and end row of every chunk.
+            chunk_nr_start: The starting chunk number.
 
-    # create a new chunk that represents a subset of the general dataset
-    def _set_chunk(self, chunk_nr, dataset, interval):
+        Returns:
+            The plan, an int64 array of shape (chunks, 5) with the columns of PLAN_COLUMNS.
         """
-        Create a new chunk that represents a subset of the general dataset.
+        ids = np.arange(chunk_nr_start, chunk_nr_start + len(bounds))
+        borders = (bounds[1:, 0] + bounds[:-1, 1]) // 2  # middle of the rows shared by consecutive chunks
+        owned_start = np.concatenate((bounds[:1, 0], borders))
+        owned_end = np.maximum(np.concatenate((borders, bounds[-1:, 1])), owned_start)
+        return np.column_stack((ids, bounds, owned_start, owned_end)).astype(np.int64).reshape(
+            -1, len(OverlappedChunking.PLAN_COLUMNS))
+
+    @staticmethod
+    def get_chunks(plan, source):
+        """
+        Create the chunks of a plan as lazy views of the dataset.
 
         Args:
-            chunk_nr: The chunk number.
-            dataset: The original dataset.
-            interval: The interval (start, end) of the chunk within the dataset.
+            plan: The plan returned by plan or plan_by_time.
+            source: The dataset (NumPy array or DataFrame) the chunks are sliced from when they are processed.
+
+        Returns:
+            List of lazy Chunk objects.
         """
-        start, end = interval
-        self.chunks.append(Chunk(chunk_nr, dataset[start:end]))
+        return [Chunk(c_id, bounds=(start, end), source=source, owned=(owned_start, owned_end))
+                for c_id, start, end, owned_start, owned_end in plan.tolist()]
 
-    # the indexes + overlap_region cannot be out of the bounds
-    def calculate_interval_borders(self, start, end):
+    def chunk_data(self, dataset, chunk_size, overlap_region, chunk_nr_start):
         """
-        Calculate the interval borders ensuring they are within dataset bounds.
+        Chunk the data into overlapping subsets.
 
         Args:
-            start: The start index of the interval.
-            end: The end index of the interval.
+            dataset: The dataset to be chunked.
+            chunk_size: The size of each chunk.
+            overlap_region: The size of the overlap region between chunks.
+            chunk_nr_start: The starting chunk number.
 
         Returns:
-            List containing the adjusted start and end indices.
+            List of created chunks.
         """
-        return [max(start, 0), min(end, self.n)]
+        return self.get_chunks(self.plan(len(dataset), chunk_size, overlap_region, chunk_nr_start), dataset)
 
-    def merge_chunks(self, chunks: List[Chunk]):
+    def chunk_data_by_time(self, dataset, window, overlap_region, chunk_nr_start):
         """
-        Merge the chunks back into a single dataset.
+        Chunk the data into overlapping subsets aligned to time windows of the index (see plan_by_time).
 
         Args:
-            chunks: List of chunks to be merged.
+            dataset: The dataset to be chunked, indexed by its sorted timestamps.
+            window: The duration covered by each chunk without its overlap regions (e.g. '10min').
+            overlap_region: The size of the overlap region between chunks in rows.
+            chunk_nr_start: The starting chunk number.
 
         Returns:
-            Set of merged results.
+            List of created chunks.
         """
-        result = []
-        merged_result = set()
-        sorted_chunks = sorted(chunks, key=lambda x: x.get_id())
-        indexes_first_chunk = sorted_chunks[0].get_data()
-        for i in range(len(indexes_first_chunk)):
-            if i == len(indexes_first_chunk) - 1:
-                break
-            result.append(indexes_first_chunk[i])
-        self.inkrement += indexes_first_chunk[len(indexes_first_chunk) - 1]
-        for i in range(1, len(sorted_chunks)):
-            adjusted_data = self._adjust_chunk_data(sorted_chunks[i].get_data())
-            result.extend(adjusted_data)
-            #result.append(adjusted_data)
-        for cps in result:
-            merged_result.add(cps)
-        return merged_result
+        return self.get_chunks(self.plan_by_time(dataset.index, window, overlap_region, chunk_nr_start), dataset)
 
-    # calculate the right position of indexes in general dataset
-    def _adjust_chunk_data(self, data: List):
+    @staticmethod
+    def merge_chunks(chunks: List[Chunk]):
         """
-        Adjust the chunk data to its correct position in the general dataset.
+        Merge the change points of the chunks back into the general dataset. A chunk only contributes the change
+        points within the rows it owns, so a change point in the rows shared by two chunks is taken from one of them.
 
         Args:
-            data: List of data points in the chunk.
+            chunks: List of processed chunks, holding the change points relative to the chunk (the last one is the
+                length of the chunk), the bounds of the chunk and the rows it owns.
 
         Returns:
-             List of adjusted data points.
+            Set of merged results.
         """
-        real_p = []
-        for i, v in enumerate(data):
-            val = v + self.inkrement - 2 * self.overlap_region
-            if i == len(data) - 1:
-                self.inkrement = val
-                continue
-            real_p.append(val)
-        return real_p
-
-    def reset_inkrement(self):
-        """Reset the increment value to zero."""
-        self.inkrement = 0
+        merged_result = set()
+        for chunk in chunks:
+            start = chunk.get_bounds()[0]
+            owned_start, owned_end = chunk.get_owned() or chunk.get_bounds()
+            cps = np.asarray(list(chunk.get_data())[:-1], dtype=np.int64) + start
+            merged_result.update(cps[(cps >= owned_start) & (cps < owned_end)].tolist())
+        return merged_result
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+
+class PlotReducer:
+    """
+    Shape-preserving downsampling of long series before they are drawn.
+
+    A plot cannot show more points than it has pixels, so every series is reduced to a few thousand points with
+    Largest-Triangle-Three-Buckets (LTTB) or the per-bucket minimum and maximum. Only the samples of the visible
+    interval are reduced and the reduction is repeated whenever the x-axis is zoomed or panned. Change points and
+    segment boundaries are drawn from their sample positions, no label column is built for them.
+    """
+    METHODS = ('lttb', 'minmax')
+    MAX_POINTS = 2000  # points per series, about the width of the figure in pixels
+
+    @staticmethod
+    def lttb(x, y, n_out):
+        """
+        Select the points of a series with Largest-Triangle-Three-Buckets. The first and the last point are always
+        kept, of every bucket in between the point spanning the largest triangle with the previously selected point
+        and the average of the next bucket.
+
+        Args:
+            x: Numeric x values of the series (ascending).
+            y: The y values of the series.
+            n_out: The number of points to select.
+
+        Returns:
+            The positions of the selected points.
+        """
+        n = len(y)
+        if n_out >= n or n_out < 3:
+            return np.arange(n)
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets between first and last point
+        # average of every bucket, the last point is the average of the bucket after the last one
+        avg_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges), x[-1])
+        avg_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges), y[-1])
+        selected = np.empty(n_out, dtype=np.int64)
+        selected[0], selected[-1] = 0, n - 1
+        a = 0
+        for i in range(n_out - 2):
+            start, end = edges[i], edges[i + 1]
+            area = np.abs((x[a] - avg_x[i + 1]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a]))
+            a = start + int(np.argmax(area))
+            selected[i + 1] = a
+        return selected
+
+    @staticmethod
+    def min_max(y, n_out):
+        """
+        Select the minimum and the maximum of every bucket, so spikes stay visible at any zoom level.
+
+        Args:
+            y: The y values of the series.
+            n_out: The number of points to select (two per bucket).
+
+        Returns:
+            The positions of the selected points in ascending order.
+        """
+        n = len(y)
+        n_buckets = n_out // 2
+        if n_out >= n or n_buckets < 1:
+            return np.arange(n)
+        y = np.asarray(y, dtype=np.float64)
+        size = -(-n // n_buckets)
+        n_full = n // size
+        buckets = y[:n_full * size].reshape(n_full, size)
+        starts = np.arange(n_full) * size
+        selected = [starts + buckets.argmin(axis=1), starts + buckets.argmax(axis=1)]
+        if n_full * size < n:  # remainder of the last bucket
+            rest = y[n_full * size:]
+            selected.append(np.array([n_full * size + rest.argmin(), n_full * size + rest.argmax()]))
+        selected = np.unique(np.concatenate(selected))
+        return np.union1d(selected, [0, n - 1])
+
+    @staticmethod
+    def to_numeric(index: pd.Index):
+        """
+        Convert an index to the numeric x values matplotlib uses for it.
+
+        Args:
+            index: The index of the data.
+
+        Returns:
+            Tuple of the x values and whether they are dates.
+        """
+        if isinstance(index, pd.DatetimeIndex):
+            import matplotlib.dates as mdates  # only loaded on first use
+
+            if index.tz is not None:
+                index = index.tz_convert(None)
+            return mdates.date2num(index.to_numpy()), True
+        return np.asarray(index, dtype=np.float64), False
+
+    @classmethod
+    def reduce(cls, x, y, interval=None, max_points=MAX_POINTS, method='lttb'):
+        """
+        Reduce the part of a series that lies within an interval.
+
+        Args:
+            x: Numeric x values of the series (ascending).
+            y: The y values of the series.
+            interval: Tuple of the first and last numeric x value to keep (None = whole series). One sample beyond
+                either end is kept, so the line runs to the edges of the axes.
+            max_points: The maximum number of points returned.
+            method: The reduction method ('lttb' or 'minmax').
+
+        Returns:
+            Tuple of the reduced x and y values.
+        """
+        if method not in cls.METHODS:
+            raise ValueError('Reduction method not defined: ' + str(method))
+        start, end = 0, len(x)
+        if interval is not None:
+            start = max(int(np.searchsorted(x, interval[0], side='left')) - 1, 0)
+            end = min(int(np.searchsorted(x, interval[1], side='right')) + 1, len(x))
+        x, y = x[start:end], np.asarray(y)[start:end]
+        if method == 'lttb':
+            selected = cls.lttb(x, y, max_points)
+        else:
+            selected = cls.min_max(y, max_points)
+        return x[selected], y[selected]
+
+    @staticmethod
+    def run_starts(labels):
+        """
+        Get the positions where a label column changes its value.
+
+        Args:
+            labels: The label column (e.g. the segment numbers).
+
+        Returns:
+            The start positions of all runs of equal labels, the first one is 0.
+        """
+        labels = np.asarray(labels)
+        if len(labels) == 0:
+            return np.array([], dtype=np.int64)
+        return np.concatenate(([0], np.flatnonzero(labels[1:] != labels[:-1]) + 1))
+
+    @classmethod
+    def plot(cls, data, interval=None, title=None, xlabel='Time', ylabel=None, changepoints=None, boundaries=None,
+             max_points=MAX_POINTS, method='lttb', figsize=(20, 10), ax=None):
+        """
+        Plot the downsampled columns of a DataFrame or a Series. The lines are reduced again whenever the visible
+        x-range of the axes changes.
+
+        Args:
+            data: A pandas DataFrame or Series to plot.
+            interval: Tuple of the first and last index value shown on the x-axis (None = all).
+            title: The title of the plot.
+            xlabel: The label of the x-axis.
+            ylabel: The label of the y-axis.
+            changepoints: Sample positions of change points, drawn as dashed red lines (optional).
+            boundaries: Sample positions of segment boundaries (e.g. ground truth), drawn as grey lines (optional).
+            max_points: The maximum number of points per line.
+            method: The reduction method ('lttb' or 'minmax').
+            figsize: The size of the figure if a new one is created.
+            ax: The axes to draw on (None = new figure).
+
+        Returns:
+            The matplotlib axes.
+        """
+        import matplotlib.pyplot as plt  # only loaded on first use
+
+        frame = data.to_frame() if isinstance(data, pd.Series) else data
+        x, is_date = cls.to_numeric(frame.index)
+        limits = None
+        if interval is not None:
+            limits = cls.to_numeric(pd.Index([pd.Timestamp(v) for v in interval]) if is_date else pd.Index(interval))[0]
+        if ax is None:
+            _, ax = plt.subplots(figsize=figsize)
+        columns = [(column, frame[column].to_numpy()) for column in frame.columns]
+        lines = []
+        for column, y in columns:
+            line_x, line_y = cls.reduce(x, y, limits, max_points, method)
+            lines.append(ax.plot(line_x, line_y, linewidth=1, label=str(column))[0])
+        for positions, style in ((changepoints, {'color': 'red', 'linestyle': '--'}),
+                                 (boundaries, {'color': 'grey', 'linestyle': '-'})):
+            if positions is not None and len(positions) > 0:
+                positions = np.asarray(positions, dtype=np.int64)
+                positions = positions[(positions >= 0) & (positions < len(x))]
+                ax.vlines(x[positions], 0, 1, transform=ax.get_xaxis_transform(), linewidth=0.8, **style)
+        if is_date:
+            ax.xaxis_date()
+        if limits is not None:
+            ax.set_xlim(limits)
+        elif len(x) > 0:
+            ax.set_xlim(x[0], x[-1])
+
+        def on_xlim_changed(axes):
+            visible = axes.get_xlim()
+            for line, (_, y) in zip(lines, columns):
+                line.set_data(*cls.reduce(x, y, visible, max_points, method))
+
+        ax.callbacks.connect('xlim_changed', on_xlim_changed)
+        ax.set_title(title)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+        if len(columns) > 1:
+            ax.legend()
+        return ax
@@ -0,0 +1,166 @@
+import numpy as np
+from scipy.spatial.distance import pdist
+
+from ressources.exceptions.SegmentationError import SegmentationError
+
+
+class PrefixCost:
+    """
+    Segment costs computed from prefix sums of sufficient statistics.
+
+    The statistics of the model are summed up once at a sorted set of positions, afterwards the cost of any segment
+    between two of these positions is a difference of two sums, so the costs of many segments are a few array
+    operations. 'l2' and 'normal' give the costs of ruptures (CostL2, CostNormal); 'rbf' approximates CostRbf with
+    random Fourier features, which turns the kernel cost into an l2 cost in feature space and needs no gram matrix.
+    """
+    MODELS = ('l2', 'normal', 'rbf')
+    N_FEATURES = 100  # random Fourier features of the rbf approximation
+    BLOCK_ROWS = 65536  # rows whose statistics are expanded at the same time
+
+    def __init__(self, model='l2', n_features=N_FEATURES, gamma=None, seed=0):
+        """
+        Initialize the PrefixCost.
+
+        Args:
+            model: The cost model, one out of MODELS.
+            n_features: Number of random Fourier features approximating the rbf kernel.
+            gamma: Bandwidth of the rbf kernel (None = median heuristic like ruptures).
+            seed: Seed of the random Fourier features, fixed so repeated runs give the same costs.
+
+        Raises:
+            SegmentationError: If the model is not supported.
+        """
+        if model.lower() not in self.MODELS:
+            raise SegmentationError('Model not supported by prefix sum costs: ' + model)
+        self.model = model.lower()
+        self.n_features = n_features
+        self.gamma = gamma
+        self.seed = seed
+        self.positions = None
+        self._prefix = None
+        self._n_dims = None
+
+    def _rbf_map(self, signal):
+        """
+        Draw the random Fourier features of the rbf kernel k(x, y) = exp(-gamma * |x - y|^2).
+
+        Args:
+            signal: The signal (samples x dimensions).
+
+        Returns:
+            Tuple of the frequencies (dimensions x features) and phases (features).
+        """
+        gamma = self.gamma
+        if gamma is None:
+            # median heuristic of ruptures on an evenly spaced sample of at most 2000 rows
+            sample = signal[::max(len(signal) // 2000, 1)]
+            median = np.median(pdist(sample, metric='sqeuclidean')) if len(sample) > 1 else 0.0
+            gamma = 1.0 / median if median > 0 else 1.0
+        rng = np.random.default_rng(self.seed)
+        frequencies = rng.normal(0.0, np.sqrt(2.0 * gamma), size=(signal.shape[1], self.n_features))
+        phases = rng.uniform(0.0, 2.0 * np.pi, size=self.n_features)
+        return frequencies, phases
+
+    def _statistics(self, block, rbf_map):
+        """
+        Expand rows into the per-row sufficient statistics of the model.
+
+        Args:
+            block: Rows of the centered signal.
+            rbf_map: The random Fourier features of the rbf kernel (only used for 'rbf').
+
+        Returns:
+            2D array with one row of statistics per row of the signal.
+        """
+        if self.model == 'l2':
+            return np.column_stack((block, np.square(block).sum(axis=1)))
+        if self.model == 'normal':
+            outer = block[:, :, None] * block[:, None, :]
+            return np.column_stack((block, outer.reshape(len(block), -1)))
+        frequencies, phases = rbf_map
+        return np.sqrt(2.0 / self.n_features) * np.cos(block @ frequencies + phases)
+
+    def fit(self, signal, positions):
+        """
+        Sum up the statistics of all rows before each position, one block of rows at a time.
+
+        Args:
+            signal: The signal, shape (n_samples, n_features) or (n_samples,).
+            positions: Sorted unique positions (0 ... n_samples) segments may start or end at.
+
+        Returns:
+            self
+        """
+        signal = np.asarray(signal, dtype=np.float64)
+        if signal.ndim == 1:
+            signal = signal.reshape(-1, 1)
+        self._n_dims = signal.shape[1]
+        self.positions = np.asarray(positions, dtype=np.int64)
+        rbf_map = self._rbf_map(signal) if self.model == 'rbf' else None
+        # centering keeps the sums of squares small compared to the offset of the signal
+        signal = signal - signal.mean(axis=0)
+        n_stats = len(self._statistics(signal[:1], rbf_map)[0])
+        self._prefix = np.zeros((len(self.positions), n_stats))
+        total = np.zeros(n_stats)
+        for start in range(0, len(signal), self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, len(signal))
+            sums = np.cumsum(self._statistics(signal[start:end], rbf_map), axis=0)
+            # positions in (start, end] are reached by the cumulative sums of this block
+            first, last = np.searchsorted(self.positions, [start, end], side='right')
+            self._prefix[first:last] = total + sums[self.positions[first:last] - start - 1]
+            total = total + sums[-1]
+        return self
+
+    def n_statistics(self):
+        """
+        Get the number of statistics summed up per position.
+
+        Returns:
+            The number of statistics (None before fit).
+        """
+        return None if self._prefix is None else self._prefix.shape[1]
+
+    def error(self, starts, ends):
+        """
+        Compute the costs of segments.
+
+        Args:
+            starts: Start positions of the segments (elements of the fitted positions, scalar or array).
+            ends: End positions of the segments, exclusive (elements of the fitted positions, same shape as starts).
+
+        Returns:
+            Array of the segment costs in the shape of starts and ends.
+        """
+        starts, ends = np.broadcast_arrays(np.asarray(starts), np.asarray(ends))
+        return self.error_at(np.searchsorted(self.positions, starts), np.searchsorted(self.positions, ends))
+
+    def error_at(self, first, last):
+        """
+        Compute the costs of segments given by the indexes of their borders in the fitted positions.
+
+        Args:
+            first: Indexes of the start positions.
+            last: Indexes of the end positions.
+
+        Returns:
+            Array of the segment costs in the shape of first and last.
+        """
+        first, last = np.broadcast_arrays(np.asarray(first), np.asarray(last))
+        shape = first.shape
+        first, last = first.ravel(), last.ravel()
+        sums = self._prefix[last] - self._prefix[first]
+        counts = (self.positions[last] - self.positions[first]).astype(np.float64)
+        d = self._n_dims
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.model == 'l2':
+                costs = sums[:, d] - np.square(sums[:, :d]).sum(axis=1) / counts
+            elif self.model == 'rbf':
+                costs = counts - np.square(sums).sum(axis=1) / counts
+            else:
+                mean = sums[:, :d] / counts[:, None]
+                cov = sums[:, d:].reshape(-1, d, d) / counts[:, None, None] - mean[:, :, None] * mean[:, None, :]
+                if d > 1:  # ruptures uses the unbiased covariance for multivariate and the biased variance for 1D
+                    cov *= (counts / np.maximum(counts - 1, 1))[:, None, None]
+                cov += 1e-6 * np.eye(d)
+                costs = np.linalg.slogdet(cov)[1] * counts
+        return np.where(counts > 0, costs, 0.0).reshape(shape)
@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+from src.classes.ColumnStore import ColumnStore
+from src.classes.Utility import Utility
+
+
+class ResultCache:
+    """
+    Content-addressed cache of segmentation results.
+
+    A result is keyed by the hash of the raw file content and the normalized configuration (model, algorithm, penalty,
+    jump, minimum segment size, chunking and filter settings). Each entry stores the change points and the segment
+    features if they were computed, but no copy of the segmented output: the output is rebuilt from the raw file and the
+    change points, which skips the detection without doubling the disk use of every recording. The index keeps the
+    size and last access of every entry and evicts the least recently used entries once the maximum size or number of
+    entries is exceeded. Content hashes are memoized by path, size and
+    modification time, so unchanged raw files are only read once.
+    """
+    # configuration keys that change the segmentation result
+    RESULT_KEYS = ('model', 'model_parameters', 'model_parameter', 'penalty_term', 'algorithm', 'min_segment_size',
+                   'jump_points', 'window', 'estimated_cps', 'chunk_size', 'chunk_window', 'overlap_region',
+                   'filter_close_cps', 'min_cp_distance', 'fallback', 'resample', 'sample_period', 'max_gap')
+
+    def __init__(self, cache_path, max_size=None, max_entries=None):
+        """
+        Initialize the ResultCache.
+
+        Args:
+            cache_path: The directory of the cache.
+            max_size: Maximum size of all entries in bytes (optional).
+            max_entries: Maximum number of entries (optional).
+        """
+        self._cache_path = cache_path
+        self._max_size = max_size
+        self._max_entries = max_entries
+        self._index_path = os.path.join(cache_path, 'index.json')
+        self._lock = threading.RLock()  # the pipelined batch mode reads and writes from different threads
+        if not os.path.exists(cache_path):
+            os.makedirs(cache_path)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        """
+        Load the index of the cache.
+
+        Returns:
+            The index with the entries and the memoized content hashes.
+        """
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, 'r', encoding='utf-8') as file:
+                    return json.load(file)
+            except json.JSONDecodeError:
+                pass
+        return {'entries': {}, 'hashes': {}}
+
+    def _save_index(self):
+        """Write the index atomically."""
+        with self._lock:
+            tmp_path = self._index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._index, file)
+            os.replace(tmp_path, self._index_path)
+
+    def _content_hash(self, path):
+        """
+        Get the hash of the content of a file, reusing the memoized hash if the file is unchanged. If the file was
+        converted into a ColumnStore, the store is hashed, because the store is what MobileData loads.
+
+        Args:
+            path: The path to the file.
+
+        Returns:
+            The content hash as a hex string.
+        """
+        store = ColumnStore.locate(path)
+        if store is not None:
+            path = store
+        # a store is replaced as a whole, so its meta file changes whenever its content changes
+        stat = os.stat(path if store is None else os.path.join(store, ColumnStore.META_FILE))
+        abs_path = os.path.abspath(path)
+        memo = self._index['hashes'].get(abs_path)
+        if memo is not None and memo['size'] == stat.st_size and memo['mtime'] == stat.st_mtime_ns:
+            return memo['hash']
+        content_hash = Utility.content_hash(path)
+        with self._lock:
+            self._index['hashes'][abs_path] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': content_hash}
+        return content_hash
+
+    @classmethod
+    def normalize_config(cls, config: dict):
+        """
+        Reduce a configuration to the entries that change the result and normalize their spelling.
+
+        Args:
+            config: The configuration for segmentation.
+
+        Returns:
+            The normalized configuration.
+        """
+        normalized = {}
+        for key in cls.RESULT_KEYS:
+            value = config.get(key)
+            if key == 'min_cp_distance' and not config.get('filter_close_cps'):
+                value = None  # only used by the filter
+            if key == 'max_gap' and config.get('resample') in (None, 'clean'):
+                value = None  # only used by the grid
+            normalized[key] = value.lower() if isinstance(value, str) else value
+        return normalized
+
+    def get_key(self, raw_path, config: dict, segment_column_name):
+        """
+        Calculate the cache key of a segmentation.
+
+        Args:
+            raw_path: The path to the raw file.
+            config: The configuration for segmentation.
+            segment_column_name: The name of the segment column of the output.
+
+        Returns:
+            The cache key as a hex string.
+        """
+        return Utility.config_hash({'content': self._content_hash(raw_path),
+                                    'config': self.normalize_config(config),
+                                    'segment_column': segment_column_name})
+
+    def get(self, key, features_path=None):
+        """
+        Look up a cached result.
+
+        Args:
+            key: The cache key.
+            features_path: If given, the cached segment features are copied to this path. A result cached without
+                features counts as not cached.
+
+        Returns:
+            The list of change points or None if the key is not cached.
+        """
+        with self._lock:
+            entry = self._index['entries'].get(key)
+            entry_path = os.path.join(self._cache_path, key)
+            if entry is None or not os.path.exists(os.path.join(entry_path, 'changepoints.json')):
+                return None
+            if features_path is not None and not os.path.exists(os.path.join(entry_path, 'features.csv')):
+                return None
+            with open(os.path.join(entry_path, 'changepoints.json'), 'r', encoding='utf-8') as file:
+                cps = json.load(file)
+            if features_path is not None:
+                shutil.copyfile(os.path.join(entry_path, 'features.csv'), features_path)
+            entry['last_access'] = time.time()
+            self._save_index()
+        return cps
+
+    def put(self, key, cps, process_name=None, features_path=None):
+        """
+        Store a result and evict the least recently used entries if the cache is too large.
+
+        Args:
+            key: The cache key.
+            cps: The list of change points.
+            process_name: The name of the process (informational).
+            features_path: The path of the segment features (optional).
+        """
+        entry_path = os.path.join(self._cache_path, key)
+        tmp_path = entry_path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, 'changepoints.json'), 'w', encoding='utf-8') as file:
+            json.dump([int(cp) for cp in cps], file)
+        if features_path is not None:
+            shutil.copyfile(features_path, os.path.join(tmp_path, 'features.csv'))
+        with self._lock:
+            shutil.rmtree(entry_path, ignore_errors=True)
+            os.replace(tmp_path, entry_path)
+            size = sum(os.path.getsize(os.path.join(entry_path, name)) for name in os.listdir(entry_path))
+            self._index['entries'][key] = {'size': size, 'last_access': time.time(), 'process': process_name}
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """Remove the least recently used entries until the size and entry limits are met."""
+        entries = self._index['entries']
+        by_access = sorted(entries, key=lambda k: entries[k]['last_access'])
+        total_size = sum(entry['size'] for entry in entries.values())
+        while by_access and ((self._max_size is not None and total_size > self._max_size) or
+                             (self._max_entries is not None and len(entries) > self._max_entries)):
+            key = by_access.pop(0)
+            total_size -= entries.pop(key)['size']
+            shutil.rmtree(os.path.join(self._cache_path, key), ignore_errors=True)
+
+    def clear(self):
+        """Remove all entries of the cache."""
+        with self._lock:
+            for key in list(self._index['entries']):
+                shutil.rmtree(os.path.join(self._cache_path, key), ignore_errors=True)
+            self._index['entries'] = {}
+            self._save_index()
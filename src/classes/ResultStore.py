@@ -0,0 +1,336 @@
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.ColumnStore import ColumnStore
+from src.classes.SegmentFeatures import SegmentFeatures
+
+
+class ResultStore:
+    """
+    Queryable store of the segmentation results of all runs.
+
+    An SQLite database records every run with its configuration, the segments of every process with their rows and
+    timestamps, and the outcomes of the quality test. A single segment is read by memory mapping only its rows of a
+    ColumnStore instead of scanning the segmented CSV file: a process loaded unchanged from a ColumnStore references
+    that store, any other signal is kept as a ColumnStore partitioned by run and process. Only the latest max_runs
+    runs are kept with their partitions.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            config_name TEXT,
+            config TEXT,
+            started TEXT,
+            finished TEXT
+        );
+        CREATE TABLE IF NOT EXISTS processes (
+            run_id INTEGER REFERENCES runs(run_id) ON DELETE CASCADE,
+            process TEXT COLLATE NOCASE,
+            source TEXT,
+            n_rows INTEGER,
+            changepoints TEXT,
+            data_path TEXT,
+            columns TEXT,
+            PRIMARY KEY (run_id, process)
+        );
+        CREATE TABLE IF NOT EXISTS segments (
+            run_id INTEGER,
+            process TEXT COLLATE NOCASE,
+            segment_number INTEGER,
+            start_row INTEGER,
+            end_row INTEGER,
+            start_time TEXT,
+            end_time TEXT,
+            rejected INTEGER,
+            PRIMARY KEY (run_id, process, segment_number),
+            FOREIGN KEY (run_id, process) REFERENCES processes(run_id, process) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS segments_rejected ON segments (rejected, run_id, process);
+        CREATE TABLE IF NOT EXISTS quality (
+            run_id INTEGER,
+            process TEXT COLLATE NOCASE,
+            segment_number INTEGER,
+            ground_truth TEXT,
+            similarity REAL,
+            passed INTEGER,
+            FOREIGN KEY (run_id, process, segment_number) REFERENCES segments(run_id, process, segment_number)
+                ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS quality_segment ON quality (run_id, process, segment_number);
+    """
+
+    def __init__(self, store_path, max_runs=None):
+        """
+        Initialize the ResultStore and create its database if necessary.
+
+        Args:
+            store_path: The directory of the store.
+            max_runs: Number of runs kept, older runs are deleted when a run starts (None = all).
+        """
+        self._store_path = store_path
+        self._max_runs = max_runs
+        self._db_path = os.path.join(store_path, 'results.db')
+        self._lock = threading.Lock()  # the pipelined batch mode writes from the writer thread
+        if not os.path.exists(store_path):
+            os.makedirs(store_path)
+        with self._connect() as connection:
+            connection.executescript(self.SCHEMA)
+            # databases created before processes referenced the columns of their signal
+            if 'columns' not in [row[1] for row in connection.execute('PRAGMA table_info(processes)')]:
+                connection.execute('ALTER TABLE processes ADD COLUMN columns TEXT')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """
+        Open a connection that commits on success and is closed afterwards.
+
+        Returns:
+            Context manager of the sqlite3 connection.
+        """
+        connection = sqlite3.connect(self._db_path, timeout=30)
+        connection.execute('PRAGMA foreign_keys = ON')
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _query(self, sql, params=()):
+        """
+        Run a query.
+
+        Args:
+            sql: The SQL query.
+            params: The parameters of the query.
+
+        Returns:
+            DataFrame of the result rows.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    @staticmethod
+    def _now():
+        """
+        Get the current time.
+
+        Returns:
+            The current UTC time as ISO string.
+        """
+        return datetime.now(timezone.utc).isoformat()
+
+    def start_run(self, config_name, config: dict):
+        """
+        Record the start of a run and delete the oldest runs beyond max_runs.
+
+        Args:
+            config_name: The name of the configuration.
+            config: The configuration for segmentation.
+
+        Returns:
+            The id of the run.
+        """
+        with self._lock, self._connect() as connection:
+            cursor = connection.execute('INSERT INTO runs (config_name, config, started) VALUES (?, ?, ?)',
+                                        (config_name, json.dumps(config, default=str), self._now()))
+            run_id = cursor.lastrowid
+        if self._max_runs is not None:
+            expired = self._query('SELECT run_id FROM runs ORDER BY run_id DESC LIMIT -1 OFFSET ?', (self._max_runs,))
+            for expired_id in expired['run_id']:
+                self.delete_run(int(expired_id))
+        return run_id
+
+    def finish_run(self, run_id):
+        """
+        Record the end of a run.
+
+        Args:
+            run_id: The id of the run.
+        """
+        with self._lock, self._connect() as connection:
+            connection.execute('UPDATE runs SET finished = ? WHERE run_id = ?', (self._now(), run_id))
+
+    def add_process(self, run_id, process, data: pd.DataFrame, cps, source=None, store=None):
+        """
+        Record the segmentation of a process. Without a store, the signal is written to the partition of the run and
+        process.
+
+        Args:
+            run_id: The id of the run.
+            process: The name of the process.
+            data: The signal, indexed by time.
+            cps: Sorted list of change points.
+            source: The path of the raw file (optional).
+            store: The ColumnStore the rows of data were read from unchanged, referenced instead of a partition
+                (optional).
+        """
+        if store is not None:
+            data_path = os.path.abspath(store)
+        else:
+            data_path = os.path.join('run_' + str(run_id), process)
+            ColumnStore.write(os.path.join(self._store_path, data_path), data, {'process': process, 'run_id': run_id})
+        numbers, starts, ends = SegmentFeatures.segment_bounds(cps, len(data))
+        index = data.index
+        start_times = index[starts].astype(str)
+        end_times = index[np.maximum(ends - 1, 0)].astype(str)  # timestamp of the last row of the segment
+        rows = [(run_id, process, int(n), int(s), int(e), st, et)
+                for n, s, e, st, et in zip(numbers, starts, ends, start_times, end_times)]
+        with self._lock, self._connect() as connection:
+            connection.execute('DELETE FROM processes WHERE run_id = ? AND process = ?', (run_id, process))
+            connection.execute('INSERT INTO processes (run_id, process, source, n_rows, changepoints, data_path, '
+                               'columns) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (run_id, process, source, len(data), json.dumps([int(cp) for cp in cps]), data_path,
+                                json.dumps([str(column) for column in data.columns])))
+            connection.executemany('INSERT INTO segments (run_id, process, segment_number, start_row, end_row, '
+                                   'start_time, end_time) VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def record_quality(self, run_id, process, results, ground_truth=None):
+        """
+        Record the outcome of a quality test pass and update the rejection state of the segments. Segments that are
+        not recorded for the run are skipped.
+
+        Args:
+            run_id: The id of the run.
+            process: The name of the process.
+            results: List of (segment number, similarity score, whether the segment is accepted after the pass).
+            ground_truth: Description of the ground truth segment of the pass (optional).
+        """
+        with self._lock, self._connect() as connection:
+            connection.executemany('INSERT INTO quality (run_id, process, segment_number, ground_truth, similarity, '
+                                   'passed) SELECT ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM segments '
+                                   'WHERE run_id = ?1 AND process = ?2 AND segment_number = ?3)',
+                                   [(run_id, process, int(n), ground_truth, float(score), int(passed))
+                                    for n, score, passed in results])
+            connection.executemany('UPDATE segments SET rejected = ? WHERE run_id = ? AND process = ? '
+                                   'AND segment_number = ?',
+                                   [(int(not passed), run_id, process, int(n)) for n, _, passed in results])
+
+    def runs(self):
+        """
+        Get all runs.
+
+        Returns:
+            DataFrame with run_id, config_name, config, started and finished.
+        """
+        return self._query('SELECT * FROM runs ORDER BY run_id')
+
+    def latest_run(self, config_name=None):
+        """
+        Get the id of the latest run.
+
+        Args:
+            config_name: Only consider runs of this configuration (optional).
+
+        Returns:
+            The id of the run or None if there is none.
+        """
+        if config_name is None:
+            result = self._query('SELECT MAX(run_id) AS run_id FROM runs')
+        else:
+            result = self._query('SELECT MAX(run_id) AS run_id FROM runs WHERE config_name = ?', (config_name,))
+        run_id = result['run_id'].iloc[0]
+        return None if pd.isna(run_id) else int(run_id)
+
+    def get_changepoints(self, run_id, process):
+        """
+        Get the change points of a process.
+
+        Args:
+            run_id: The id of the run.
+            process: The name of the process.
+
+        Returns:
+            The list of change points.
+
+        Raises:
+            SegmentationError: If the process is not recorded for the run.
+        """
+        return json.loads(self._get_process(run_id, process)['changepoints'])
+
+    def _get_process(self, run_id, process):
+        """
+        Get the record of a process.
+
+        Args:
+            run_id: The id of the run.
+            process: The name of the process.
+
+        Returns:
+            Series of the record.
+
+        Raises:
+            SegmentationError: If the process is not recorded for the run.
+        """
+        result = self._query('SELECT * FROM processes WHERE run_id = ? AND process = ?', (run_id, process))
+        if result.empty:
+            raise SegmentationError('Process ' + str(process) + ' not recorded for run ' + str(run_id))
+        return result.iloc[0]
+
+    def query_segments(self, run_id=None, process=None, rejected=None):
+        """
+        Query the segments.
+
+        Args:
+            run_id: Only segments of this run (optional).
+            process: Only segments of this process (optional).
+            rejected: Only rejected (True) or accepted (False) segments (optional, untested segments never match).
+
+        Returns:
+            DataFrame with run_id, process, segment_number, start_row, end_row, start_time, end_time and rejected.
+        """
+        conditions, params = [], []
+        for column, value in (('run_id', run_id), ('process', process), ('rejected', rejected)):
+            if value is not None:
+                conditions.append(column + ' = ?')
+                params.append(int(value) if isinstance(value, bool) else value)
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return self._query('SELECT * FROM segments' + where + ' ORDER BY run_id, process, segment_number', params)
+
+    def get_segment(self, run_id, process, segment_number):
+        """
+        Read the signal of a segment. Only the rows of the segment are read.
+
+        Args:
+            run_id: The id of the run.
+            process: The name of the process.
+            segment_number: The segment number.
+
+        Returns:
+            DataFrame of the segment indexed by time.
+
+        Raises:
+            SegmentationError: If the segment is not recorded.
+        """
+        segment = self._query('SELECT s.start_row, s.end_row, p.data_path, p.columns FROM segments s JOIN processes p '
+                              'ON s.run_id = p.run_id AND s.process = p.process '
+                              'WHERE s.run_id = ? AND s.process = ? AND s.segment_number = ?',
+                              (run_id, process, int(segment_number)))
+        if segment.empty:
+            raise SegmentationError('Segment ' + str(segment_number) + ' of ' + str(process) + ' not recorded for run '
+                                    + str(run_id))
+        start, end, data_path, columns = segment.iloc[0]
+        # a referenced store is an absolute path and may hold more columns than were segmented
+        return ColumnStore.read(os.path.join(self._store_path, data_path), None if columns is None else
+                                json.loads(columns), rows=(int(start), int(end)))
+
+    def delete_run(self, run_id):
+        """
+        Delete a run with its segments, quality outcomes and signal partitions. Referenced stores are kept.
+
+        Args:
+            run_id: The id of the run.
+        """
+        with self._lock, self._connect() as connection:
+            connection.execute('DELETE FROM runs WHERE run_id = ?', (run_id,))
+        shutil.rmtree(os.path.join(self._store_path, 'run_' + str(run_id)), ignore_errors=True)
@@ -0,0 +1,138 @@
+import json
+import os
+
+from src.classes.Utility import Utility
+
+
+class RunManifest:
+    """
+    On-disk manifest of a segmentation run of a single process.
+
+    The manifest is a JSON-lines file keyed by the fingerprint of the raw file and the hash of the configuration. Every
+    finished chunk is appended with its bounds, the algorithm that processed it and its change points, and the file is
+    marked as done once the segmented output has been written. A restarted run skips the finished chunks and files.
+    """
+    # configuration keys that only control the execution and do not change the result
+    EXECUTION_KEYS = ('process', 'catalog_pattern', 'target_path', 'checkpoint_path', 'memory_budget', 'chunk_timeout',
+                      'max_retries', 'backend')
+
+    def __init__(self, checkpoint_path, process, config: dict):
+        """
+        Initialize the RunManifest and load the records of a previous run.
+
+        Args:
+            checkpoint_path: The directory the manifests are stored in.
+            process: An enum representing the process. The enum value should be the path to the raw file.
+            config: The configuration for segmentation.
+        """
+        if not os.path.exists(checkpoint_path):
+            os.makedirs(checkpoint_path)
+        fingerprint = Utility.file_fingerprint(process.value)
+        config_hash = Utility.config_hash(config, self.EXECUTION_KEYS)
+        self._key = Utility.config_hash({'fingerprint': fingerprint, 'config': config_hash})[:16]
+        self._path = os.path.join(checkpoint_path, process.name + '_' + self._key + '.jsonl')
+        self._chunks = {}
+        self._output = None
+        self._cps = None
+        self._load()
+
+    def _load(self):
+        """
+        Load the records of a previous run. A truncated last line (e.g. from a killed run) is ignored.
+        """
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record['type'] == 'chunk':
+                    self._chunks[tuple(record['bounds'])] = record
+                elif record['type'] == 'done':
+                    self._output = record['output']
+                    self._cps = record.get('cps')
+
+    def _append(self, record: dict):
+        """
+        Append a record to the manifest and flush it to disk.
+
+        Args:
+            record: The record to be appended.
+        """
+        with open(self._path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def get_chunk(self, bounds):
+        """
+        Get the change points of a finished chunk.
+
+        Args:
+            bounds: The (start, end) indexes of the chunk within the general dataset.
+
+        Returns:
+            The list of change points relative to the chunk or None if the chunk has not been finished.
+        """
+        if bounds is None:
+            return None
+        record = self._chunks.get(tuple(bounds))
+        return None if record is None else record['cps']
+
+    def add_chunk(self, bounds, algorithm_name, cps):
+        """
+        Persist the change points of a finished chunk.
+
+        Args:
+            bounds: The (start, end) indexes of the chunk within the general dataset.
+            algorithm_name: The name of the algorithm that processed the chunk.
+            cps: The change points relative to the chunk.
+        """
+        if bounds is None:
+            return
+        record = {'type': 'chunk', 'bounds': [int(b) for b in bounds], 'algorithm': algorithm_name,
+                  'cps': [int(cp) for cp in cps]}
+        self._chunks[tuple(record['bounds'])] = record
+        self._append(record)
+
+    def is_done(self):
+        """
+        Check whether the process has been segmented and its output still exists.
+
+        Returns:
+            True if the segmented output of the process has been written.
+        """
+        return self._output is not None and os.path.exists(self._output)
+
+    def get_changepoints(self):
+        """
+        Get the change points of a process that has been segmented.
+
+        Returns:
+            The list of change points or None if the process is not done or was marked done without them.
+        """
+        return self._cps
+
+    def mark_done(self, output_path, cps=None):
+        """
+        Mark the process as done.
+
+        Args:
+            output_path: The path of the written segmented output.
+            cps: The change points of the process, returned by get_changepoints in a later run (optional).
+        """
+        self._output = output_path
+        self._cps = None if cps is None else [int(cp) for cp in cps]
+        self._append({'type': 'done', 'output': output_path, 'cps': self._cps})
+
+    @property
+    def path(self):
+        """
+        Get the path of the manifest file.
+
+        Returns:
+            The path of the JSON-lines file.
+        """
+        return self._path
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+from ressources.exceptions.SegmentationError import SegmentationError
+
+
+class SampleGrid:
+    """
+    Puts a recording onto a uniform time grid.
+
+    The change point detection counts samples: jump points, minimum segment sizes and the margins of the metrics are
+    only meaningful if every row stands for the same amount of time. The grid first inspects the int64 time index and
+    the values in a single vectorized pass for gaps, jitter, duplicate timestamps and rows with NaNs, drops the
+    duplicates and NaN rows and then interpolates or averages the rows onto a grid with a fixed period. Gaps longer
+    than the maximum gap are not bridged: the grid is split there and restarts at the first row after the gap, so no
+    rows are invented for the missing time. The result is a single contiguous float64 array indexed by a DatetimeIndex
+    that is regular within every run between two split gaps.
+    """
+    METHODS = ('clean', 'interpolate', 'mean')
+    GAP_FACTOR = 1.5  # intervals longer than GAP_FACTOR median intervals are gaps
+    JITTER_TOLERANCE = 0.05  # intervals deviating more than this share of the median interval (but no gaps) are jitter
+
+    def __init__(self, method='interpolate', period=None, max_gap=None):
+        """
+        Initialize the SampleGrid.
+
+        Args:
+            method: 'clean' (only drop duplicate timestamps and NaN rows), 'interpolate' (linear interpolation at the
+                grid points) or 'mean' (mean of the rows closest to every grid point, empty grid points are
+                interpolated).
+            period: The period of the grid (e.g. '10ms', None = median interval of the recording).
+            max_gap: The longest interval between two rows that is bridged by the grid (e.g. '1s', None = no detected
+                gap is bridged). The grid is split at longer intervals.
+
+        Raises:
+            SegmentationError: If the method is not supported.
+        """
+        if method not in self.METHODS:
+            raise SegmentationError('Unknown resampling method: ' + str(method) + ', use one of ' + str(self.METHODS))
+        self._method = method
+        self._period = period
+        self._max_gap = max_gap
+
+    def _get_step(self, interval, unit):
+        """
+        Get the period of the grid in units of the time index.
+
+        Args:
+            interval: The median sampling interval of the recording (None if it has less than two timestamps).
+            unit: The unit of the timestamps (e.g. 'ns').
+
+        Returns:
+            The period as integer or None if no period is configured and the recording has less than two timestamps.
+
+        Raises:
+            SegmentationError: If the configured period is not positive.
+        """
+        if self._period is None:
+            return interval
+        step = int(pd.Timedelta(self._period) / pd.Timedelta(1, unit=unit))
+        if step <= 0:
+            raise SegmentationError('The sample period must be positive: ' + str(self._period))
+        return step
+
+    def _get_max_gap(self, interval, unit):
+        """
+        Get the longest interval that is bridged by the grid in units of the time index.
+
+        Args:
+            interval: The median sampling interval of the recording.
+            unit: The unit of the timestamps.
+
+        Returns:
+            The maximum gap as float.
+
+        Raises:
+            SegmentationError: If the configured maximum gap is negative.
+        """
+        if self._max_gap is None:
+            return self.GAP_FACTOR * interval
+        max_gap = pd.Timedelta(self._max_gap) / pd.Timedelta(1, unit=unit)
+        if max_gap < 0:
+            raise SegmentationError('The maximum gap must not be negative: ' + str(self._max_gap))
+        return max_gap
+
+    def _fill(self, offsets, values, step):
+        """
+        Put one run of rows without split gaps onto the grid.
+
+        Args:
+            offsets: The sorted int64 offsets of the rows to the first row of the run.
+            values: 2D float array of the values (rows x columns).
+            step: The period of the grid in units of the offsets.
+
+        Returns:
+            Tuple of the offsets of the grid points and the values at the grid points.
+        """
+        grid_offsets = np.arange(0, offsets[-1] + 1, step, dtype=np.int64)
+        if self._method == 'interpolate':
+            return grid_offsets, np.column_stack([np.interp(grid_offsets, offsets, column) for column in values.T])
+        # every row belongs to the closest grid point, grid points without rows are interpolated
+        bins = np.minimum((offsets + step // 2) // step, len(grid_offsets) - 1)
+        counts = np.bincount(bins, minlength=len(grid_offsets))
+        sums = np.column_stack([np.bincount(bins, weights=column, minlength=len(grid_offsets)) for column in values.T])
+        filled = counts > 0
+        means = sums[filled] / counts[filled, None]
+        return grid_offsets, np.column_stack([np.interp(grid_offsets, grid_offsets[filled], column)
+                                              for column in means.T])
+
+    def inspect(self, times, values, unit='ns'):
+        """
+        Find gaps, jitter, duplicate timestamps and NaN rows. Gaps and jitter are measured against the median sampling
+        interval of the recording, not against the period of the grid.
+
+        Args:
+            times: The sorted int64 timestamps.
+            values: 2D float array of the values (rows x columns).
+            unit: The unit of the timestamps.
+
+        Returns:
+            Tuple of the mask of the rows to keep (no NaNs, first row of every timestamp), the period of the grid in
+            units of the timestamps and a report with the number of rows, NaN rows, duplicate timestamps, gaps and
+            jittered intervals and the time missing in gaps (in units of the timestamps).
+        """
+        nan_rows = np.isnan(values).any(axis=1)
+        duplicates = np.zeros(len(times), dtype=bool)
+        duplicates[1:] = times[1:] == times[:-1]
+        keep = ~nan_rows & ~duplicates
+        intervals = np.diff(times[~duplicates])
+        interval = max(int(np.median(intervals)), 1) if len(intervals) else None
+        report = {'rows': len(times), 'nan_rows': int(nan_rows.sum()), 'duplicates': int(duplicates.sum()),
+                  'gaps': 0, 'missing': 0, 'jitter': 0}
+        if interval is not None:
+            gaps = intervals > self.GAP_FACTOR * interval
+            jitter = ~gaps & (np.abs(intervals - interval) > self.JITTER_TOLERANCE * interval)
+            report.update({'gaps': int(gaps.sum()), 'missing': int((intervals[gaps] - interval).sum()),
+                           'jitter': int(jitter.sum())})
+        return keep, self._get_step(interval, unit), report
+
+    def apply(self, dataframe: pd.DataFrame):
+        """
+        Put a recording onto the grid.
+
+        Args:
+            dataframe: The recording with a sorted DatetimeIndex.
+
+        Returns:
+            Tuple of the DataFrame on the grid (or only cleaned for 'clean') and the report of inspect, extended by the
+            number of rows on the grid, the number of gaps the grid was split at and the period in seconds.
+
+        Raises:
+            SegmentationError: If the recording has no rows without NaNs.
+        """
+        index = dataframe.index
+        unit = index.unit
+        times = index.asi8
+        values = dataframe.to_numpy(dtype=np.float64)
+        keep, step, report = self.inspect(times, values, unit)
+        if not keep.any():
+            raise SegmentationError('The recording has no rows without NaNs.')
+        splits, starts = np.empty(0, dtype=np.int64), ()
+        if self._method != 'clean' and step is not None:
+            # gaps are measured on the recorded timestamps, rows dropped for NaNs are interpolated like before
+            unique = times[np.concatenate(([True], times[1:] != times[:-1]))]
+            intervals = np.diff(unique)
+            gaps = intervals > self._get_max_gap(max(int(np.median(intervals)), 1), unit)
+            splits = unique[1:][gaps]
+        times, values = times[keep], values[keep]
+        if self._method == 'clean' or step is None:
+            grid = times
+        else:
+            # the grid restarts at the first row after every gap that is longer than the maximum gap
+            starts = np.unique(np.searchsorted(times, splits))
+            starts = starts[(starts > 0) & (starts < len(times))]
+            grids, runs = [], []
+            for run_times, run_values in zip(np.split(times, starts), np.split(values, starts)):
+                grid_offsets, run_values = self._fill(run_times - run_times[0], run_values, step)
+                grids.append(run_times[0] + grid_offsets)
+                runs.append(run_values)
+            grid, values = np.concatenate(grids), np.concatenate(runs)
+        report.update({'grid_rows': len(grid), 'splits': len(starts),
+                       'period': None if step is None else step * pd.Timedelta(1, unit=unit).total_seconds()})
+        grid_index = pd.DatetimeIndex(grid.view('datetime64[' + unit + ']'), name=index.name)
+        if index.tz is not None:
+            grid_index = grid_index.tz_localize('UTC').tz_convert(index.tz)
+        return pd.DataFrame(np.ascontiguousarray(values), index=grid_index, columns=dataframe.columns), report
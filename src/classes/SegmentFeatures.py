@@ -0,0 +1,128 @@
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+
+class SegmentFeatures:
+    """
+    Computes a feature table with one row per segment from the signal and the change points.
+
+    The segments are given by their start rows, so every statistic of every channel is a single ufunc.reduceat over
+    the signal instead of a groupby on the segment column. Large recordings are split into groups of whole segments
+    that are reduced in parallel threads (NumPy releases the GIL while reducing).
+    """
+    STATISTICS = ('Mean', 'RMS', 'Std', 'Min', 'Max', 'Peak', 'Energy')
+
+    def __init__(self, num_workers=1, rows_per_task=2000000):
+        """
+        Initialize the SegmentFeatures engine.
+
+        Args:
+            num_workers: Number of threads reducing groups of segments at the same time.
+            rows_per_task: Minimum number of rows of a group of segments reduced by one thread.
+        """
+        self._num_workers = num_workers
+        self._rows_per_task = rows_per_task
+
+    @staticmethod
+    def segment_bounds(cps, n_samples):
+        """
+        Get the segments of a list of change points, numbered like the segment column of the segmented output.
+
+        Args:
+            cps: Sorted list of change points (the first row of every segment but the first).
+            n_samples: The number of rows of the signal.
+
+        Returns:
+            Tuple of the segment numbers, start rows and end rows (exclusive) of all non-empty segments.
+        """
+        cps = np.asarray(cps, dtype=np.int64)
+        starts = np.concatenate(([0], cps))
+        ends = np.concatenate((cps, [n_samples]))
+        numbers = np.arange(1, len(starts) + 1)
+        keep = (ends > starts) & (starts < n_samples)
+        return numbers[keep], starts[keep], np.minimum(ends[keep], n_samples)
+
+    @staticmethod
+    def _reduce(values, starts, ends):
+        """
+        Reduce the rows of consecutive segments.
+
+        Args:
+            values: 2D array of the rows of the segments (rows x channels), starting at the first segment.
+            starts: The start rows of the segments relative to 'values'.
+            ends: The end rows of the segments relative to 'values'.
+
+        Returns:
+            Dictionary mapping the statistics to arrays of shape (segments x channels).
+        """
+        counts = (ends - starts)[:, None]
+        sums = np.add.reduceat(values, starts, axis=0)
+        energy = np.add.reduceat(np.square(values), starts, axis=0)
+        minimum = np.minimum.reduceat(values, starts, axis=0)
+        maximum = np.maximum.reduceat(values, starts, axis=0)
+        mean = sums / counts
+        # centered second pass, energy / counts - mean^2 cancels badly for signals with a large offset
+        deviation = values - np.repeat(mean, counts[:, 0], axis=0)
+        variance = np.add.reduceat(np.square(deviation), starts, axis=0) / counts
+        return {'Mean': mean, 'RMS': np.sqrt(energy / counts), 'Std': np.sqrt(variance), 'Min': minimum,
+                'Max': maximum, 'Peak': np.maximum(np.abs(minimum), np.abs(maximum)), 'Energy': energy}
+
+    def _groups(self, starts, ends):
+        """
+        Split the segments into consecutive groups of at least 'rows_per_task' rows, one group per task.
+
+        Args:
+            starts: The start rows of the segments.
+            ends: The end rows of the segments.
+
+        Returns:
+            List of (first segment, last segment + 1) of every group.
+        """
+        n_groups = min(max(int((ends[-1] - starts[0]) // self._rows_per_task), 1), self._num_workers * 4, len(starts))
+        if self._num_workers <= 1 or n_groups <= 1:
+            return [(0, len(starts))]
+        # split at the segment closest to every multiple of the group size
+        targets = starts[0] + (ends[-1] - starts[0]) * np.arange(1, n_groups) / n_groups
+        borders = np.unique(np.concatenate(([0], np.searchsorted(starts, targets), [len(starts)])))
+        return list(zip(borders[:-1], borders[1:]))
+
+    def compute(self, data: pd.DataFrame, cps):
+        """
+        Compute the feature table of a segmented signal.
+
+        Args:
+            data: The signal (raw or scaled), one column per channel.
+            cps: Sorted list of change points as returned by the segmentation.
+
+        Returns:
+            DataFrame with one row per segment: 'Segment Number', 'Start', 'End' (rows, end exclusive), 'Samples',
+            'Start Time' and 'Duration' in seconds if the data has a DatetimeIndex, and '<channel> <statistic>' for
+            every channel and statistic in STATISTICS.
+        """
+        values = data.to_numpy(dtype=np.float64)
+        numbers, starts, ends = self.segment_bounds(cps, len(values))
+        table = {'Segment Number': numbers, 'Start': starts, 'End': ends, 'Samples': ends - starts}
+        if isinstance(data.index, pd.DatetimeIndex) and len(starts):
+            index = data.index
+            table['Start Time'] = index[starts]
+            # a segment lasts until the first row of the next segment, the last one until its last row
+            stop = index[np.minimum(ends, len(index) - 1)]
+            table['Duration'] = (stop - index[starts]).total_seconds().to_numpy()
+        if len(starts) == 0:
+            stats = {name: np.empty((0, values.shape[1])) for name in self.STATISTICS}
+        else:
+            groups = self._groups(starts, ends)
+            tasks = [(values[starts[a]:ends[b - 1]], starts[a:b] - starts[a], ends[a:b] - starts[a])
+                     for a, b in groups]
+            if len(tasks) == 1:
+                results = [self._reduce(*tasks[0])]
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self._num_workers) as executor:
+                    results = list(executor.map(lambda task: self._reduce(*task), tasks))
+            stats = {name: np.concatenate([r[name] for r in results]) for name in self.STATISTICS}
+        for i, column in enumerate(data.columns):
+            for name in self.STATISTICS:
+                table[str(column) + ' ' + name] = stats[name][:, i]
+        return pd.DataFrame(table)
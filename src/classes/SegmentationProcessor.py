@@ -1,11 +1,23 @@
 import os
 import multiprocessing
+import queue
+import threading
+from enum import Enum
+import numpy as np
+import pandas as pd
+from src.classes.AlgorithmRegistry import AlgorithmRegistry
 from src.classes.CPDetector import CPDetector
+from src.classes.Instrumentation import Instrumentation
 from src.classes.Utility import Utility
 from src.classes.MobileData import MobileData
 from src.classes.OverlappedChunking import OverlappedChunking
 from src.classes.ChunkProcessor import ChunkProcessor
 from src.classes.Chunk import Chunk
+from src.classes.DatasetCatalog import DatasetCatalog
+from src.classes.RunManifest import RunManifest
+from src.classes.ResultCache import ResultCache
+from src.classes.ResultStore import ResultStore
+from src.classes.SegmentFeatures import SegmentFeatures
 from ressources.enums.DrillingProcess import DrillingProcess
 from ressources.enums.SmoothingProcess import SmoothingProcess
 import gc
@@ -20,11 +32,29 @@ class SegmentationProcessor:
         config: The configuration for segmentation.
         segment_column_name: The name of the segment column.
         cores: Number of CPU cores to use for processing.
+        instrumentation: Instrumentation used to record spans and counters of the pipeline stages (optional).
+        result_cache: ResultCache used to skip the segmentation of unchanged files and configurations (optional).
+        executor: Already running executor used for the chunks instead of a new process pool per process (optional).
+        catalog: DatasetCatalog the processes are selected from with 'catalog_pattern' and that orders a batch by the
+                 size of its recordings (optional).
+        result_store: ResultStore every segmented process is recorded in, one run per call of process_data or
+                      process_file (optional).
     """
-    def __init__(self, config, segment_column_name, cores=None):
+    def __init__(self, config, segment_column_name, cores=None, instrumentation: Instrumentation = None,
+                 result_cache: ResultCache = None, executor=None, catalog: DatasetCatalog = None,
+                 result_store: ResultStore = None):
         self._config = config
+        self._catalog = catalog
+        self._result_store = result_store
+        self._run_id = None
         self._segment_column_name = segment_column_name
-        self._ov_chunking = OverlappedChunking()
+        self._instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+        self._result_cache = result_cache
+        self._executor = executor
+        self._fallback_cpd = None
+        self._degraded_chunks = {}
+        self._changepoints = {}
+        self._features = {}
         cores = self._define_cores(cores)
         self._cores = cores
         config_name, config_val = config
@@ -49,17 +79,34 @@ class SegmentationProcessor:
             raise SegmentationError('cpu number exceeded')
         return cores
 
+    @staticmethod
+    def _get_memory_budget(config):
+        """
+        Get the memory budget for the chunks processed at the same time.
+
+        Args:
+            config: The configuration for segmentation.
+
+        Returns:
+            The memory budget in bytes or None if no budget is configured.
+        """
+        budget_mb = config.get('memory_budget')
+        return None if budget_mb is None else int(budget_mb * 1024 ** 2)
+
     def process_data(self):
         """
         Process the data based on the configuration.
         """
         name, config = self._config
-        cpd = CPDetector(config['model'], config['algorithm'], config['jump_points'],
-                         config.get('min_segment_size'),
-                         config.get('penalty_term'), config.get('model_parameters'), config.get('estimated_cps'),
-                         config.get('window'))
+        cpd = self._create_detector(config)
+        self._fallback_cpd = self._create_fallback_detector(config)
+        self._start_run()
 
-        if config['process'].lower() == 'all':
+        if config.get('catalog_pattern') is not None:
+            if self._catalog is None:
+                raise SegmentationError('catalog_pattern requires a dataset catalog (see catalog_config).')
+            self._process_batch(self._catalog.select(config['catalog_pattern']), cpd, config, name)
+        elif config['process'].lower() == 'all':
             if name.lower() == 'drilling_config':
                 self._process_all(DrillingProcess, cpd, config, name)
             if name.lower() == 'smoothing_config':
@@ -70,6 +117,124 @@ class SegmentationProcessor:
                 self._process_selected(DrillingProcess, processes, cpd, config, name)
             if name.lower() == 'smoothing_config':
                 self._process_selected(SmoothingProcess, processes, cpd, config, name)
+        self._finish_run()
+
+    def _start_run(self):
+        """Record the start of a run in the result store."""
+        if self._result_store is not None:
+            self._run_id = self._result_store.start_run(*self._config)
+
+    def _finish_run(self):
+        """Record the end of the run in the result store."""
+        if self._result_store is not None and self._run_id is not None:
+            self._result_store.finish_run(self._run_id)
+
+    def get_run_id(self):
+        """
+        Get the id of the last run recorded in the result store.
+
+        Returns:
+            The id of the run or None if no result store is used.
+        """
+        return self._run_id
+
+    def process_file(self, name, path):
+        """
+        Segment a single file that is not listed in a process enum.
+
+        Args:
+            name: The name of the process, used as name of the output file.
+            path: The path to the raw file.
+
+        Returns:
+            The list of change points.
+        """
+        config = self._config[1]
+        process = Enum('Process', {name: path})[name]
+        self._fallback_cpd = self._create_fallback_detector(config)
+        self._start_run()
+        self._process_single(process, self._create_detector(config), config, self._config[0])
+        self._finish_run()
+        return self._changepoints[name]
+
+    def segment_data(self, name, data: pd.DataFrame):
+        """
+        Segment data that is already in memory. Nothing is written to the target path.
+
+        Args:
+            name: The name of the data (used for instrumentation).
+            data: The data to be segmented.
+
+        Returns:
+            The list of change points.
+        """
+        config = self._config[1]
+        self._fallback_cpd = self._create_fallback_detector(config)
+        prepared = self._prepare(Enum('Process', {name: None})[name], data, config)
+        self._detect_stage(prepared, self._create_detector(config), config)
+        return prepared['cps']
+
+    @staticmethod
+    def _create_detector(config):
+        """
+        Create the CPDetector of a configuration.
+
+        Args:
+            config: The configuration for segmentation.
+
+        Returns:
+            The CPDetector.
+        """
+        return CPDetector(config['model'], config['algorithm'], config['jump_points'], config.get('min_segment_size'),
+                          config.get('penalty_term'), config.get('model_parameters'), config.get('estimated_cps'),
+                          config.get('window'))
+
+    @staticmethod
+    def _create_fallback_detector(config):
+        """
+        Create the CPDetector used for chunks that exceeded their deadline or whose worker died.
+
+        Args:
+            config: The configuration for segmentation. Values missing in the 'fallback' entry are taken from it.
+
+        Returns:
+            The fallback CPDetector or None if no fallback is configured.
+        """
+        fallback = config.get('fallback')
+        if fallback is None:
+            return None
+        return CPDetector(fallback.get('model', config['model']), fallback['algorithm'],
+                          fallback.get('jump_points', config['jump_points']),
+                          fallback.get('min_segment_size', config.get('min_segment_size')),
+                          fallback.get('penalty_term', config.get('penalty_term')),
+                          fallback.get('model_parameters', config.get('model_parameters')), config.get('estimated_cps'))
+
+    def get_changepoints(self):
+        """
+        Get the change points of the processed processes.
+
+        Returns:
+            Dictionary mapping the process name to its list of change points.
+        """
+        return dict(self._changepoints)
+
+    def get_features(self):
+        """
+        Get the segment features of the processes segmented in this run with 'features' enabled (see SegmentFeatures).
+
+        Returns:
+            Dictionary mapping the process name to its feature table.
+        """
+        return dict(self._features)
+
+    def get_degraded_chunks(self):
+        """
+        Get the chunks that were processed with the fallback detector.
+
+        Returns:
+            Dictionary mapping the process name to a dictionary of chunk id and reason of the degradation.
+        """
+        return dict(self._degraded_chunks)
 
     def _process_all(self, process_enum, cpd, config, config_type):
         """
@@ -81,8 +246,7 @@ class SegmentationProcessor:
             config: The configuration for segmentation.
             config_type: The type of configuration (drilling or smoothing).
         """
-        for process in process_enum:
-            self._process_single(process, cpd, config, config_type)
+        self._process_batch(list(process_enum), cpd, config, config_type)
 
     def _process_selected(self, process_enum, processes, cpd, config, config_type):
         """
@@ -95,9 +259,31 @@ class SegmentationProcessor:
             config: The configuration for segmentation.
             config_type: The type of configuration (drilling or smoothing).
         """
-        for process_name in processes:
-            process = process_enum[process_name.upper()]
-            self._process_single(process, cpd, config, config_type)
+        self._process_batch([process_enum[process_name.upper()] for process_name in processes], cpd, config,
+                            config_type)
+
+    def _process_batch(self, processes, cpd, config, config_type):
+        """
+        Process a list of processes either one after another or pipelined.
+
+        Args:
+            processes: List of processes to be segmented.
+            cpd: The CPDetector instance.
+            config: The configuration for segmentation.
+            config_type: The type of configuration (drilling or smoothing).
+        """
+        if self._catalog is not None and len(processes) > 1:
+            # the largest recordings first, so a large recording does not hold up the end of the batch
+            processes = self._catalog.order_by_size(processes)
+            chunks = [self._catalog.estimate_chunks(p.value, config['chunk_size'], config['overlap_region'])
+                      for p in processes]
+            if None not in chunks:
+                self._instrumentation.count('estimated_chunks', sum(chunks))
+        if config.get('pipeline') and len(processes) > 1:
+            self._process_pipelined(processes, cpd, config)
+        else:
+            for process in processes:
+                self._process_single(process, cpd, config, config_type)
 
     def _process_single(self, process, cpd, config, config_type):
         """
@@ -109,36 +295,374 @@ class SegmentationProcessor:
             config: The configuration for segmentation.
             config_type: The type of configuration (drilling or smoothing).
         """
+        prepared = self._load_stage(process, config)
+        if prepared is None:
+            return
+        self._detect_stage(prepared, cpd, config)
+        self._write_stage(prepared)
+        del prepared
+        gc.collect()
+
+    def _process_pipelined(self, processes, cpd, config):
+        """
+        Process a list of processes with overlapping stages.
+
+        A loader thread reads, scales and chunks the next recording while the current one is detected and a writer
+        thread persists finished recordings. The stages are connected by bounded queues, so at most 'prefetch'
+        recordings wait in front of and behind the detection.
+
+        Args:
+            processes: List of processes to be segmented.
+            cpd: The CPDetector instance.
+            config: The configuration for segmentation.
+        """
+        prefetch = max(config.get('prefetch', 1), 1)
+        loaded = queue.Queue(maxsize=prefetch)
+        finished = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        errors = []
+
+        def load():
+            try:
+                for process in processes:
+                    prepared = self._load_stage(process, config)
+                    if prepared is not None and not self._put(loaded, prepared, stop):
+                        return
+            except BaseException as e:
+                self._put(loaded, e, stop)
+                return
+            self._put(loaded, None, stop)
+
+        def write():
+            while True:
+                try:
+                    prepared = finished.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if prepared is None:
+                    return
+                try:
+                    self._write_stage(prepared)
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+                    return
+                del prepared
+                gc.collect()
+
+        loader = threading.Thread(target=load, name='segmentation-loader', daemon=True)
+        writer = threading.Thread(target=write, name='segmentation-writer', daemon=True)
+        loader.start()
+        writer.start()
+        try:
+            while not stop.is_set():
+                try:
+                    prepared = loaded.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if prepared is None:
+                    break
+                if isinstance(prepared, BaseException):
+                    raise prepared
+                self._detect_stage(prepared, cpd, config)
+                self._put(finished, prepared, stop)
+            self._put(finished, None, stop)
+        finally:
+            stop.set()
+            writer.join()
+            loader.join()
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def _put(target: queue.Queue, item, stop: threading.Event):
+        """
+        Put an item into a bounded queue unless the pipeline has been stopped.
+
+        Args:
+            target: The queue.
+            item: The item to put into the queue.
+            stop: Event that is set once the pipeline stops.
+
+        Returns:
+            True if the item was put into the queue.
+        """
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _load_stage(self, process, config):
+        """
+        Load, scale and chunk a process unless its result is cached or it was finished by a previous run.
+
+        Args:
+            process: The process to be segmented.
+            config: The configuration for segmentation.
+
+        Returns:
+            Dictionary holding the state of the process for the following stages or None if the process is skipped.
+        """
+        instr = self._instrumentation
+        output_file = os.path.join(self._output_path, process.name + '.csv')
+        features_file = None
+        if config.get('features'):
+            # a separate folder, so the feature tables are not taken for segmented files
+            features_file = os.path.join(self._output_path, 'features', process.name + '.csv')
+            os.makedirs(os.path.dirname(features_file), exist_ok=True)
+        cache_key = None
+        if self._result_cache is not None:
+            cache_key = self._result_cache.get_key(process.value, config, self._segment_column_name)
+            cached_cps = self._result_cache.get(cache_key, features_file)
+            if cached_cps is not None:
+                instr.count('cache_hits')
+                mobile_data = self._restore_output(process, config, cached_cps, output_file)
+                self._record_process(process, mobile_data, cached_cps)
+                self._changepoints[process.name] = cached_cps
+                return None
+        manifest = None
+        if config.get('checkpoint_path') is not None:
+            manifest = RunManifest(config['checkpoint_path'], process, config)
+            if manifest.is_done():
+                instr.count('processes_resumed')
+                cps = manifest.get_changepoints()
+                if cps is None:  # manifest written before the change points were recorded
+                    cps = self._read_changepoints(output_file)
+                mobile_data = None
+                if self._result_store is not None or (features_file is not None
+                                                      and not os.path.exists(features_file)):
+                    with instr.span('load', process=process.name):
+                        mobile_data = MobileData(process, config.get('resample'), config.get('sample_period'),
+                                                 config.get('max_gap'))
+                    self._record_process(process, mobile_data, cps)
+                if features_file is not None:
+                    self._restore_features(process, mobile_data, cps, features_file)
+                self._changepoints[process.name] = cps
+                return None
         print('Starting Segmentation of: ' + process.name)
-        data = MobileData(process).df
-        scaled_data = Utility.scale_data(data)
-        chunks = self._ov_chunking.chunk_data(scaled_data, config['chunk_size'], config['overlap_region'], 0)
-        print('Number of chunks created: ' + str(len(chunks)))
-        c_processor = ChunkProcessor(chunks, cpd, self._cores)
-        c_processor.process_chunks()
+        with instr.span('load', process=process.name):
+            mobile_data = MobileData(process, config.get('resample'), config.get('sample_period'),
+                                     config.get('max_gap'))
+            data = mobile_data.df
+        report = mobile_data.get_report()
+        if report is not None:
+            for key in ('gaps', 'splits', 'duplicates', 'nan_rows', 'grid_rows'):
+                instr.count(key, report[key])
+        prepared = self._prepare(process, data, config)
+        prepared.update({'output_file': output_file, 'features_file': features_file, 'cache_key': cache_key,
+                         'manifest': manifest, 'store': mobile_data.get_store()})
+        return prepared
+
+    def _read_changepoints(self, output_file):
+        """
+        Restore the change points of a segmented output file from its segment numbers.
+
+        Args:
+            output_file: The path of the segmented output.
+
+        Returns:
+            The list of change points.
+        """
+        segments = pd.read_csv(output_file, usecols=[self._segment_column_name])[self._segment_column_name].to_numpy()
+        return [int(cp) for cp in np.flatnonzero(np.diff(segments)) + 1]
+
+    def _get_chunk_size(self, data, config):
+        """
+        Get the chunk size of a process. With chunk_size 'auto' the largest chunk size is chosen whose estimated memory
+        fits into the share of the memory budget of a single worker, but small enough that every worker gets a chunk.
+
+        Args:
+            data: The loaded data of the process.
+            config: The configuration for segmentation.
+
+        Returns:
+            The chunk size.
+
+        Raises:
+            SegmentationError: If chunk_size is 'auto' and no memory budget is configured or the budget is too small.
+        """
+        if config['chunk_size'] != 'auto':
+            return config['chunk_size']
+        memory_budget = self._get_memory_budget(config)
+        if memory_budget is None:
+            raise SegmentationError("chunk_size 'auto' requires a memory_budget.")
+        info = AlgorithmRegistry.get(config['algorithm'])
+        chunk_size = info.max_chunk_size(config['model'], memory_budget // self._cores, data.shape[1],
+                                         config['jump_points'], config.get('estimated_cps'))
+        chunk_size = min(chunk_size, -(-len(data) // self._cores) + 2 * config['overlap_region'])
+        if chunk_size <= 2 * config['overlap_region']:
+            raise SegmentationError('memory_budget is too small for the overlap_region of ' + config['algorithm'] + '.')
+        return chunk_size
+
+    def _prepare(self, process, data, config):
+        """
+        Scale and chunk the data of a process.
+
+        Args:
+            process: The process to be segmented.
+            data: The loaded data of the process.
+            config: The configuration for segmentation.
+
+        Returns:
+            Dictionary holding the state of the process for the following stages.
+        """
+        instr = self._instrumentation
+        with instr.span('scale', process=process.name):
+            scaled_data = Utility.scale_data(data)
+        with instr.span('chunk', process=process.name):
+            if config.get('chunk_window') is not None:
+                plan = OverlappedChunking.plan_by_time(scaled_data.index, config['chunk_window'],
+                                                       config['overlap_region'])
+            else:
+                plan = OverlappedChunking.plan(len(scaled_data), self._get_chunk_size(data, config),
+                                               config['overlap_region'])
+        instr.count('rows', len(data))
+        instr.count('chunks', len(plan))
+        return {'process': process, 'output_file': None, 'cache_key': None, 'manifest': None, 'data': data,
+                'scaled_data': scaled_data, 'plan': plan}
+
+    def _detect_stage(self, prepared, cpd, config):
+        """
+        Detect, merge and filter the change points of a loaded process and label its segments.
+
+        Args:
+            prepared: The state of the process returned by the load stage.
+            cpd: The CPDetector instance.
+            config: The configuration for segmentation.
+        """
+        instr = self._instrumentation
+        process = prepared['process']
+        with instr.span('detect', process=process.name):
+            # a DistributedExecutor runs as many chunks at the same time as worker slots are connected
+            num_workers = getattr(self._executor, 'max_workers', self._cores)
+            # the chunks are views of the scaled values, sliced when a worker processes them
+            chunks = OverlappedChunking.get_chunks(prepared.pop('plan'), prepared['scaled_data'].to_numpy())
+            c_processor = ChunkProcessor(chunks, cpd, num_workers, instr,
+                                         self._get_memory_budget(config), config.get('chunk_timeout'),
+                                         config.get('max_retries', 1), self._fallback_cpd, prepared['manifest'],
+                                         self._executor, config.get('backend', 'process'))
+            c_processor.process_chunks()
         results: list[Chunk] = c_processor.get_results()
-        merged_cps = self._ov_chunking.merge_chunks(results)
-        cpd_list = list(merged_cps)
-        cpd_list.sort()
+        degraded = c_processor.get_degraded_chunks()
+        if degraded:
+            self._degraded_chunks[process.name] = degraded
+            instr.count('degraded_chunks', len(degraded))
+        with instr.span('merge', process=process.name):
+            cpd_list = sorted(OverlappedChunking.merge_chunks(results))
+        scaled_data = prepared.pop('scaled_data')
         if config['filter_close_cps'] is True:
-            cpd_list = CPDetector.adaptive_mean_filter(scaled_data, cpd_list, config['min_cp_distance'])
-        print('Changepoints found: ')
-        print(cpd_list)
-        data[self._segment_column_name] = 0
-        current_segment = 1
-        previous_cp = 0
-        for cp in cpd_list:
-            print(f"Assigning segment number {current_segment} from {previous_cp} to {cp}")
-            data.iloc[previous_cp:cp, data.columns.get_loc(self._segment_column_name)] = current_segment
-            current_segment += 1
-            previous_cp = cp
-        data.iloc[previous_cp:, data.columns.get_loc(self._segment_column_name)] = current_segment
-        print(data[self._segment_column_name].value_counts())
+            with instr.span('filter', process=process.name):
+                cpd_list = CPDetector.adaptive_mean_filter(scaled_data, cpd_list, config['min_cp_distance'])
+        instr.count('changepoints', len(cpd_list))
+        print('Changepoints found: ' + str(len(cpd_list)))
+        data = prepared['data']
+        if config.get('features'):
+            with instr.span('features', process=process.name):
+                features = SegmentFeatures(self._cores).compute(data, cpd_list)
+            prepared['features'] = features
+            self._features[process.name] = features
+        self._label_segments(process, data, cpd_list)
+        prepared['cps'] = [int(cp) for cp in cpd_list]
 
-        output_file = os.path.join(self._output_path, process.name + '.csv')
+    def _label_segments(self, process, data, cps):
+        """
+        Add the segment column to the data of a process.
 
-        data.to_csv(output_file, index=True)
-        self._ov_chunking.reset_inkrement()
+        Args:
+            process: The process to be segmented.
+            data: The loaded data of the process.
+            cps: The sorted change points.
+        """
+        with self._instrumentation.span('label', process=process.name):
+            # segment number of a row = number of change points at or before the row + 1
+            data[self._segment_column_name] = np.searchsorted(np.asarray(cps), np.arange(len(data)), side='right') + 1
 
-        del data, scaled_data, chunks, c_processor, results, merged_cps, cpd_list
-        gc.collect()
+    def _restore_output(self, process, config, cps, output_file):
+        """
+        Rebuild the segmented output of a cached result from the raw file and its change points.
+
+        Args:
+            process: The process to be segmented.
+            config: The configuration for segmentation.
+            cps: The cached change points.
+            output_file: The path of the segmented output.
+
+        Returns:
+            The MobileData of the process, its dataframe includes the segment column.
+        """
+        with self._instrumentation.span('load', process=process.name):
+            mobile_data = MobileData(process, config.get('resample'), config.get('sample_period'),
+                                     config.get('max_gap'))
+        self._label_segments(process, mobile_data.df, cps)
+        with self._instrumentation.span('write', process=process.name):
+            mobile_data.df.to_csv(output_file, index=True)
+        return mobile_data
+
+    def _restore_features(self, process, mobile_data: MobileData, cps, features_file):
+        """
+        Restore the segment features of a process finished by a previous run. The feature table written by that run is
+        read; if the run did not write one, the features are computed and written.
+
+        Args:
+            process: The process.
+            mobile_data: The loaded data of the process (only required if there is no feature table).
+            cps: The change points of the process.
+            features_file: The path of the feature table.
+        """
+        if os.path.exists(features_file):
+            features = pd.read_csv(features_file)
+            if 'Start Time' in features.columns:
+                features['Start Time'] = pd.to_datetime(features['Start Time'], format='ISO8601')
+        else:
+            with self._instrumentation.span('features', process=process.name):
+                features = SegmentFeatures(self._cores).compute(mobile_data.df, cps)
+            with self._instrumentation.span('write', process=process.name):
+                features.to_csv(features_file, index=False)
+        self._features[process.name] = features
+
+    def _record_process(self, process, mobile_data: MobileData, cps):
+        """
+        Record a process that was restored from the result cache or a previous run in the result store, so the run
+        holds its segments like those of the segmented processes.
+
+        Args:
+            process: The process.
+            mobile_data: The loaded data of the process.
+            cps: The change points of the process.
+        """
+        if self._result_store is None:
+            return
+        with self._instrumentation.span('store', process=process.name):
+            self._result_store.add_process(self._run_id, process.name,
+                                           mobile_data.df.drop(columns=[self._segment_column_name], errors='ignore'),
+                                           cps, process.value, mobile_data.get_store())
+
+    def _write_stage(self, prepared):
+        """
+        Write the segmented process and record it in the run manifest and the result cache.
+
+        Args:
+            prepared: The state of the process after the detect stage.
+        """
+        process = prepared['process']
+        output_file = prepared['output_file']
+        features_file = prepared.get('features_file')
+        with self._instrumentation.span('write', process=process.name):
+            prepared['data'].to_csv(output_file, index=True)
+            if features_file is not None:
+                prepared['features'].to_csv(features_file, index=False)
+        if prepared['manifest'] is not None:
+            prepared['manifest'].mark_done(output_file, prepared['cps'])
+        if prepared['cache_key'] is not None:
+            self._result_cache.put(prepared['cache_key'], prepared['cps'], process.name, features_file)
+        if self._result_store is not None:
+            with self._instrumentation.span('store', process=process.name):
+                self._result_store.add_process(self._run_id, process.name,
+                                               prepared['data'].drop(columns=[self._segment_column_name]),
+                                               prepared['cps'], process.value, prepared.get('store'))
+        self._changepoints[process.name] = prepared['cps']
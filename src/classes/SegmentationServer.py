@@ -0,0 +1,345 @@
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import BrokenExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from ressources.config.config import seg_config, test_config
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.FairJobQueue import FairJobQueue
+from src.classes.Instrumentation import Instrumentation
+from src.classes.ResultCache import ResultCache
+from src.classes.SegmentationProcessor import SegmentationProcessor
+
+
+class SegmentationServer:
+    """
+    Long-running local server for segmentation and quality-test jobs.
+
+    The server keeps the heavy imports and a pool of worker processes warm, so a job does not pay the startup cost of
+    a fresh 'main.py' run. Jobs are submitted over HTTP as JSON, queued per client and served round robin.
+
+    Endpoints:
+        POST /jobs          submit a job, returns its id ('?wait=1' blocks until the job is finished)
+        GET  /jobs/<id>     status, result and timing of a job
+        GET  /status        number of queued and finished jobs and the number of workers
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, num_workers=None, job_runners=1, result_cache: ResultCache = None,
+                 job_ttl=3600, max_finished_jobs=1000):
+        """
+        Initialize the SegmentationServer.
+
+        Args:
+            host: The host to listen on.
+            port: The port to listen on (0 = any free port).
+            num_workers: Number of worker processes of the warm pool (None = half of the CPUs).
+            job_runners: Number of jobs executed at the same time. All jobs share the warm pool.
+            result_cache: ResultCache shared by all segmentation jobs (optional).
+            job_ttl: Seconds a finished job and its result are kept (None = until max_finished_jobs is exceeded).
+            max_finished_jobs: Maximum number of finished jobs kept, the oldest are dropped first (None = unlimited).
+        """
+        self._num_workers = num_workers or max(multiprocessing.cpu_count() // 2, 1)
+        self._job_runners = job_runners
+        self._result_cache = result_cache
+        self._job_ttl = job_ttl
+        self._max_finished_jobs = max_finished_jobs
+        self._queue = FairJobQueue()
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._runners = []
+        self._http_server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._http_server.segmentation_server = self
+
+    @property
+    def address(self):
+        """
+        Get the address the server listens on.
+
+        Returns:
+            Tuple of host and port.
+        """
+        return self._http_server.server_address[:2]
+
+    def start(self):
+        """
+        Warm up the worker pool and start the job runners and the HTTP server in background threads.
+        """
+        self._get_pool()
+        for i in range(self._job_runners):
+            runner = threading.Thread(target=self._run_jobs, name='job-runner-' + str(i), daemon=True)
+            runner.start()
+            self._runners.append(runner)
+        threading.Thread(target=self._http_server.serve_forever, name='http-server', daemon=True).start()
+
+    def serve_forever(self):
+        """
+        Start the server and block until it is interrupted.
+        """
+        self.start()
+        host, port = self.address
+        print('Segmentation server listening on http://' + host + ':' + str(port))
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop accepting jobs, finish the running jobs and shut down the worker pool."""
+        self._http_server.shutdown()
+        self._http_server.server_close()
+        self._queue.close()
+        for runner in self._runners:
+            runner.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self):
+        """
+        Get the warm worker pool. A pool that broke or was shut down by a job is replaced by a new warm pool.
+
+        Returns:
+            The ProcessPoolExecutor.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                try:
+                    # submit raises at once for a broken or shut down pool; the result is not awaited, because the
+                    # task may queue behind the chunks of another job
+                    self._pool.submit(int)
+                    return self._pool
+                except (BrokenExecutor, RuntimeError):
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self._num_workers)
+            # one blocking task per worker forces every worker to start and to import the detection modules
+            warm_up = [self._pool.submit(SegmentationServer._warm_up_worker) for _ in range(self._num_workers)]
+            concurrent.futures.wait(warm_up)
+            return self._pool
+
+    @staticmethod
+    def _warm_up_worker():
+        """Import the modules needed by the workers. Runs inside a worker process."""
+        import ruptures  # noqa: F401
+        from src.classes.ChunkProcessor import ChunkProcessor  # noqa: F401
+        time.sleep(0.2)
+        return os.getpid()
+
+    def submit(self, job: dict):
+        """
+        Queue a job.
+
+        Args:
+            job: The job description (see 'run_segmentation' and 'run_quality_test').
+
+        Returns:
+            The id of the job.
+        """
+        if job.get('type') not in ('segmentation', 'quality_test'):
+            raise SegmentationError('Job type must be segmentation or quality_test')
+        job_id = uuid.uuid4().hex
+        state = {'id': job_id, 'type': job['type'], 'client': job.get('client', 'default'), 'status': 'queued',
+                 'submitted': time.time(), 'result': None, 'error': None, 'done': threading.Event()}
+        with self._jobs_lock:
+            self._prune_jobs()
+            self._jobs[job_id] = state
+        self._queue.put(state['client'], (state, job))
+        return job_id
+
+    def _prune_jobs(self):
+        """
+        Drop finished jobs older than the TTL and the oldest finished jobs beyond max_finished_jobs. The caller holds
+        the jobs lock.
+        """
+        finished = sorted((state['finished'], job_id) for job_id, state in self._jobs.items() if state['done'].is_set())
+        expired = 0
+        if self._job_ttl is not None:
+            expired = sum(1 for finished_at, _ in finished if finished_at < time.time() - self._job_ttl)
+        if self._max_finished_jobs is not None:
+            expired = max(expired, len(finished) - self._max_finished_jobs)
+        for _, job_id in finished[:expired]:
+            del self._jobs[job_id]
+
+    def get_job(self, job_id, wait=False):
+        """
+        Get the state of a job.
+
+        Args:
+            job_id: The id of the job.
+            wait: Whether to block until the job is finished.
+
+        Returns:
+            Dictionary with status, result, error and timing of the job or None if the id is unknown.
+        """
+        with self._jobs_lock:
+            state = self._jobs.get(job_id)
+        if state is None:
+            return None
+        if wait:
+            state['done'].wait()
+        return {key: value for key, value in state.items() if key != 'done'}
+
+    def get_status(self):
+        """
+        Get the status of the server.
+
+        Returns:
+            Dictionary with the number of jobs per status, the queue length and the number of workers.
+        """
+        with self._jobs_lock:
+            self._prune_jobs()
+            statuses = [state['status'] for state in self._jobs.values()]
+        return {'queued': len(self._queue), 'workers': self._num_workers,
+                'jobs': {status: statuses.count(status) for status in set(statuses)}}
+
+    def _run_jobs(self):
+        """Execute queued jobs until the queue is closed."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            state, job = item
+            state['status'] = 'running'
+            state['started'] = time.time()
+            try:
+                if job['type'] == 'segmentation':
+                    state['result'] = self.run_segmentation(job)
+                else:
+                    state['result'] = self.run_quality_test(job)
+                state['status'] = 'done'
+            except Exception as e:
+                state['status'] = 'failed'
+                state['error'] = type(e).__name__ + ': ' + str(e)
+            state['finished'] = time.time()
+            state['timing'] = {'queued': state['started'] - state['submitted'],
+                               'run': state['finished'] - state['started']}
+            state['done'].set()
+
+    @staticmethod
+    def _resolve_config(config, configs, overrides=None):
+        """
+        Resolve the configuration of a job.
+
+        Args:
+            config: The name of a configuration in config.py or a complete configuration dictionary.
+            configs: List of (name, configuration) tuples the name is looked up in.
+            overrides: Entries replacing those of the configuration (optional).
+
+        Returns:
+            Tuple of the configuration name and a copy of the configuration.
+        """
+        if isinstance(config, dict):
+            name, resolved = 'job_config', dict(config)
+        else:
+            matches = [c for n, c in configs if n == config]
+            if not matches:
+                raise SegmentationError('Configuration not defined: ' + str(config))
+            name, resolved = config, dict(matches[0])
+        resolved.update(overrides or {})
+        return name, resolved
+
+    def run_segmentation(self, job: dict):
+        """
+        Execute a segmentation job.
+
+        Args:
+            job: Dictionary with 'config' (name or dictionary), optional 'overrides' and either 'path' (raw file,
+                 the segmented output is written to the target path of the configuration) with optional 'name' or
+                 'data' (list of rows) with optional 'columns'.
+
+        Returns:
+            Dictionary with the change points, the degraded chunks, the spans and the counters of the job.
+        """
+        name, config = self._resolve_config(job.get('config'), seg_config, job.get('overrides'))
+        instrumentation = Instrumentation()
+        seg_proc = SegmentationProcessor((name, config), 'Segment Number', self._num_workers, instrumentation,
+                                         self._result_cache, self._get_pool())
+        if job.get('path') is not None:
+            process_name = job.get('name') or os.path.splitext(os.path.basename(job['path']))[0]
+            cps = seg_proc.process_file(process_name, job['path'])
+        elif job.get('data') is not None:
+            data = pd.DataFrame(job['data'], columns=job.get('columns'))
+            cps = seg_proc.segment_data(job.get('name', 'data'), data)
+        else:
+            raise SegmentationError('A segmentation job needs a path or data')
+        return {'changepoints': [int(cp) for cp in cps], 'degraded_chunks': seg_proc.get_degraded_chunks(),
+                'spans': instrumentation.summary().to_dict('records'), 'counters': instrumentation.get_counters()}
+
+    def run_quality_test(self, job: dict):
+        """
+        Execute a quality-test job.
+
+        Args:
+            job: Dictionary with 'config' (name or dictionary of a test configuration), optional 'overrides',
+                 'source_path' (directory of the segmented files) and optional 'processes' (separated by ';' or as a
+                 list, default: the process of the test configuration).
+
+        Returns:
+            Dictionary with the spans and the counters of the job.
+        """
+        from tests.classes.QualityTest import QualityTest
+
+        name, config = self._resolve_config(job.get('config'), test_config, job.get('overrides'))
+        instrumentation = Instrumentation()
+        quality_test = QualityTest(instrumentation=instrumentation)
+        processes = job.get('processes', config['process'])
+        if isinstance(processes, list):
+            processes = ';'.join(processes)
+        quality_test.run(job['source_path'], processes, config['target_path'],
+                         config['gt_source_path'], config['gt_seg_nums'], config['gt_thresholds'])
+        return {'spans': instrumentation.summary().to_dict('records'), 'counters': instrumentation.get_counters()}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """HTTP interface of the SegmentationServer."""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server: SegmentationServer = self.server.segmentation_server
+        url = urlparse(self.path)
+        if url.path != '/jobs':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            job_id = server.submit(job)
+        except (ValueError, SegmentationError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        if parse_qs(url.query).get('wait', ['0'])[0] in ('1', 'true'):
+            self._send_json(200, server.get_job(job_id, wait=True))
+        else:
+            self._send_json(202, {'id': job_id})
+
+    def do_GET(self):
+        server: SegmentationServer = self.server.segmentation_server
+        url = urlparse(self.path)
+        if url.path == '/status':
+            self._send_json(200, server.get_status())
+        elif url.path.startswith('/jobs/'):
+            wait = parse_qs(url.query).get('wait', ['0'])[0] in ('1', 'true')
+            state = server.get_job(url.path[len('/jobs/'):], wait)
+            self._send_json(200, state) if state is not None else self._send_json(404, {'error': 'Unknown job'})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,46 @@
+import concurrent.futures
+
+
+class SerialExecutor(concurrent.futures.Executor):
+    """
+    Executor that runs every task immediately in the calling thread.
+
+    Avoids the startup and pickling costs of a pool for small workloads. Deadlines cannot be enforced, because 'submit'
+    only returns once the task is finished.
+    """
+
+    def __init__(self):
+        """Initialize the SerialExecutor."""
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs):
+        """
+        Run a task.
+
+        Args:
+            fn: The function to execute.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+
+        Returns:
+            A finished Future of the result.
+        """
+        if self._shutdown:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """
+        Stop accepting tasks.
+
+        Args:
+            wait: Ignored, no task is running after 'submit' returned.
+            cancel_futures: Ignored, tasks are never queued.
+        """
+        self._shutdown = True
@@ -0,0 +1,125 @@
+import bisect
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d
+
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.PrefixCost import PrefixCost
+
+
+class SlidingWindow:
+    """
+    Window sliding change point detection computed from cumulative sums.
+
+    The engine follows ruptures' Window: for every admissible index k (every 'jump'-th sample at least width / 2 away
+    from the borders) the discrepancy cost(k - w/2, k + w/2) - cost(k - w/2, k) - cost(k, k + w/2) is computed, the
+    local maxima of these scores are the candidates and the candidates with the largest scores are chosen. Instead of
+    evaluating the cost on both halves of every window one after the other, the sufficient statistics of the model are
+    summed up once at the positions the windows start, split and end at (see PrefixCost), so the scores of all windows
+    are a few array operations. The rbf kernel is approximated with random Fourier features, so no gram matrix is built.
+    The engine is registered as 'slidingwindow'; 'window' stays ruptures' Window, which supports every model.
+    """
+    MODELS = PrefixCost.MODELS
+
+    def __init__(self, model='l2', width=100, jump=5, min_size=2, n_features=PrefixCost.N_FEATURES, gamma=None,
+                 seed=0):
+        """
+        Initialize the SlidingWindow engine.
+
+        Args:
+            model: The cost model, one out of MODELS.
+            width: The window length, rounded down to an even number.
+            jump: Only every jump-th sample is an admissible change point.
+            min_size: Minimum segment size, widens the neighbourhood of the peak search like in ruptures.
+            n_features: Number of random Fourier features approximating the rbf kernel.
+            gamma: Bandwidth of the rbf kernel (None = median heuristic like ruptures).
+            seed: Seed of the random Fourier features, fixed so repeated runs detect the same change points.
+
+        Raises:
+            SegmentationError: If the model is not supported.
+        """
+        self.cost = PrefixCost(model, n_features, gamma, seed)
+        self.width = 2 * (width // 2)
+        self.jump = max(int(jump), 1)
+        self.min_size = min_size
+        self.n_samples = None
+        self.inds = None
+        self.score = None
+
+    def fit(self, signal):
+        """
+        Compute the scores of all windows.
+
+        Args:
+            signal: The signal, shape (n_samples, n_features) or (n_samples,).
+
+        Returns:
+            self
+        """
+        self.n_samples = len(signal)
+        half = self.width // 2
+        inds = np.arange(0, self.n_samples, self.jump)
+        self.inds = inds[(inds >= half) & (inds < self.n_samples - half)]
+        self.cost.fit(signal, np.unique(np.concatenate(([0, self.n_samples], self.inds - half, self.inds,
+                                                        self.inds + half))))
+        if len(self.inds):
+            starts, ends = self.inds - half, self.inds + half
+            error = self.cost.error
+            self.score = error(starts, ends) - error(starts, self.inds) - error(self.inds, ends)
+        else:
+            self.score = np.empty(0)
+        return self
+
+    def _peaks(self):
+        """
+        Find the local maxima of the scores like scipy.signal.argrelmax with mode 'wrap'.
+
+        Returns:
+            Indexes into the scores of all scores larger than every other score within 'order' windows on both sides.
+        """
+        m = len(self.score)
+        if m == 0:
+            return np.empty(0, dtype=np.int64)
+        order = max(max(self.width, 2 * self.min_size) // (2 * self.jump), 1)
+        padded = self.score[np.arange(-order, m + order) % m]
+        # maximum of padded[j:j + order] for every j, taken from the centered filter
+        window_max = maximum_filter1d(padded, order, mode='nearest')[order // 2:]
+        left = window_max[:m]
+        right = window_max[order + 1:order + 1 + m]
+        return np.flatnonzero((self.score > left) & (self.score > right))
+
+    def predict(self, n_bkps=None, pen=None):
+        """
+        Choose the change points out of the peaks of the scores.
+
+        With n_bkps the n_bkps highest peaks are chosen. With a penalty the peaks are added in decreasing order of their
+        score as long as splitting the segment they fall into lowers the total cost by more than the penalty.
+
+        Args:
+            n_bkps: Number of change points to detect (rounded up, the pipeline passes fractional numbers per chunk).
+            pen: Penalty value (> 0).
+
+        Returns:
+            Sorted list of change points, ending with the number of samples.
+
+        Raises:
+            SegmentationError: If neither n_bkps nor pen is given or fit was not called.
+        """
+        if n_bkps is None and pen is None:
+            raise SegmentationError('Either pen or n_bkps must be provided.')
+        if self.score is None:
+            raise SegmentationError('The sliding window must be fitted before predicting.')
+        peaks = self._peaks()
+        # highest score first, ties go to the later index like in ruptures
+        ranked = self.inds[peaks[np.lexsort((self.inds[peaks], self.score[peaks]))[::-1]]]
+        if n_bkps is not None:
+            return sorted(int(cp) for cp in ranked[:int(np.ceil(n_bkps))]) + [self.n_samples]
+        bkps = [0, self.n_samples]
+        for cp in ranked:
+            i = bisect.bisect(bkps, cp)
+            a, b = bkps[i - 1], bkps[i]
+            gain = self.cost.error(a, b) - self.cost.error(a, cp) - self.cost.error(cp, b)
+            if gain <= pen:
+                break
+            bkps.insert(i, int(cp))
+        return bkps[1:]
@@ -0,0 +1,143 @@
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+from ressources.exceptions.SegmentationError import SegmentationError
+
+
+class TimeWindowPlanner:
+    """
+    Plans windows of fixed duration over a sorted DatetimeIndex.
+
+    The window edges are aligned like pandas' Grouper (multiples of the window duration from midnight of the first
+    day) and are located with a binary search on the index, so a plan is an array of (start, end) row offsets and no
+    data is grouped or copied.
+    """
+
+    def __init__(self, index: pd.DatetimeIndex):
+        """
+        Initialize the TimeWindowPlanner.
+
+        Args:
+            index: The sorted time index of the data.
+
+        Raises:
+            SegmentationError: If the index is not a sorted DatetimeIndex.
+        """
+        if not isinstance(index, pd.DatetimeIndex):
+            raise SegmentationError('Time windows require a DatetimeIndex.')
+        if not index.is_monotonic_increasing:
+            raise SegmentationError('Time windows require a sorted index.')
+        self._index = index
+
+    @staticmethod
+    def _to_timedelta(duration):
+        """
+        Convert a duration to a Timedelta.
+
+        Args:
+            duration: A Timedelta or a fixed frequency string (e.g. '20s', '10min').
+
+        Returns:
+            The Timedelta.
+
+        Raises:
+            SegmentationError: If the duration is not a positive fixed duration.
+        """
+        try:
+            delta = pd.Timedelta(duration)
+        except ValueError:
+            raise SegmentationError('Time window must be a fixed duration: ' + str(duration))
+        if delta <= pd.Timedelta(0):
+            raise SegmentationError('Time window must be positive: ' + str(duration))
+        return delta
+
+    def edges(self, window):
+        """
+        Get the window edges covering the index.
+
+        Args:
+            window: The duration of a window (e.g. '20s').
+
+        Returns:
+            DatetimeIndex of the window edges, the last edge lies after the last timestamp.
+        """
+        step = self._to_timedelta(window)
+        if len(self._index) == 0:
+            return self._index[:0]
+        first, last = self._index[0], self._index[-1]
+        origin = first.normalize()
+        origin = origin + ((first - origin) // step) * step
+        n_windows = (last - origin) // step + 1
+        return origin + pd.TimedeltaIndex(np.arange(n_windows + 1) * step.value)
+
+    def plan(self, window, overlap=None, drop_empty=False):
+        """
+        Plan the windows of the index.
+
+        Args:
+            window: The duration of a window (e.g. '20s').
+            overlap: Duration by which every window is extended to both sides (optional).
+            drop_empty: Whether to leave out windows without rows (e.g. gaps in the recording).
+
+        Returns:
+            Array of shape (number of windows, 2) with the start and end row offset of every window.
+        """
+        edges = self.edges(window)
+        delta = self._to_timedelta(overlap) if overlap is not None else pd.Timedelta(0)
+        starts = self._index.searchsorted(edges[:-1] - delta, side='left')
+        ends = self._index.searchsorted(edges[1:] + delta, side='left')
+        offsets = np.column_stack((starts, ends)).astype(np.int64)
+        if drop_empty:
+            core = self._index.searchsorted(edges, side='left')
+            offsets = offsets[np.diff(core) > 0]
+        return offsets
+
+    def windows(self, data, window, overlap=None, drop_empty=False):
+        """
+        Get the windows of data indexed by the index of the planner.
+
+        Args:
+            data: The DataFrame or Series to be windowed.
+            window: The duration of a window (e.g. '20s').
+            overlap: Duration by which every window is extended to both sides (optional).
+            drop_empty: Whether to leave out windows without rows.
+
+        Returns:
+            TimeWindows, a sequence that slices a window only when it is accessed.
+        """
+        return TimeWindows(data, self.plan(window, overlap, drop_empty))
+
+
+class TimeWindows(Sequence):
+    """Sequence of the windows of a DataFrame or Series, every window is a positional slice taken on access."""
+
+    def __init__(self, data, offsets):
+        """
+        Initialize the TimeWindows.
+
+        Args:
+            data: The DataFrame or Series.
+            offsets: Array of the start and end row offset of every window.
+        """
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return TimeWindows(self._data, self._offsets[i])
+        start, end = self._offsets[i]
+        return self._data.iloc[start:end]
+
+    def get_offsets(self):
+        """
+        Get the row offsets of the windows.
+
+        Returns:
+            Array of shape (number of windows, 2) with the start and end row offset of every window.
+        """
+        return self._offsets
@@ -1,6 +1,11 @@
-from sklearn.preprocessing import StandardScaler
+import hashlib
+import json
+import os
 import pandas as pd
 import numpy as np
+from src.classes.ColumnStore import ColumnStore
+from src.classes.PlotReducer import PlotReducer
+from src.classes.TimeWindowPlanner import TimeWindowPlanner
 
 
 class Utility:
@@ -11,7 +16,8 @@ class Utility:
     @staticmethod
     def scale_data(data: pd.DataFrame):
         """
-        Scale the data using StandardScaler.
+        Scale the data to zero mean and unit variance, like sklearn's StandardScaler but without importing sklearn.
+        Constant columns are only centered.
 
         Args:
             data: A pandas DataFrame to be scaled.
@@ -19,11 +25,19 @@ class Utility:
         Returns:
             Scaled data as a pandas DataFrame.
         """
-        sc = StandardScaler().set_output(transform='pandas')
-        return sc.fit_transform(data)
+        values = data.to_numpy(dtype=np.float64)
+        mean = values.mean(axis=0)
+        var = values.var(axis=0)
+        # same tolerance as StandardScaler for columns whose variance is only floating point noise
+        eps = np.finfo(np.float64).eps
+        constant = var <= len(values) * eps * var + (len(values) * mean * eps) ** 2
+        scale = np.where(constant, 1.0, np.sqrt(var))
+        return pd.DataFrame((values - mean) / scale, index=data.index, columns=data.columns)
 
     @staticmethod
     def inverse_scaling(data: pd.DataFrame):
+        from sklearn.preprocessing import StandardScaler  # only loaded on first use
+
         scaler = StandardScaler()
         return scaler.inverse_transform(data)
 
@@ -55,15 +69,23 @@ class Utility:
             return pen
 
     @staticmethod
-    def plot_data(pd_obj, interval, process_name, process_type):
+    def plot_data(pd_obj, interval, process_name, process_type, changepoints=None, boundaries=None,
+                  max_points=PlotReducer.MAX_POINTS, method='lttb'):
         """
-        Plot the data using pandas' plot function.
+        Plot the data downsampled to the resolution of the figure (see PlotReducer).
 
         Args:
             pd_obj: A pandas DataFrame or Series to plot.
             interval: The time interval for the x-axis.
             process_name: The name of the process.
             process_type: The type of the process.
+            changepoints: Sample positions of change points drawn over the data (optional).
+            boundaries: Sample positions of segment boundaries, e.g. the ground truth, drawn over the data (optional).
+            max_points: The maximum number of points drawn per column.
+            method: The reduction method ('lttb' or 'minmax').
+
+        Returns:
+            The matplotlib axes.
         """
         if isinstance(pd_obj, pd.DataFrame):
             column_list = pd_obj.columns
@@ -75,22 +97,8 @@ class Utility:
         else:
             plt_title = process_type + ' / ' + process_name + ' / ' + pd_obj.name
             y_label = pd_obj.name
-        if interval is None:
-            pd_obj.plot(title=plt_title,
-                        xlabel='Time',
-                        ylabel=y_label,
-                        figsize=(20, 10),
-                        grid=True,
-                        linewidth=1)
-
-        else:
-            pd_obj.plot(title=plt_title,
-                        xlabel='Time',
-                        ylabel=y_label,
-                        figsize=(20, 10),
-                        grid=True,
-                        xlim=interval,
-                        linewidth=1)
+        return PlotReducer.plot(pd_obj, interval, plt_title, 'Time', y_label, changepoints, boundaries, max_points,
+                                method)
 
     @staticmethod
     def whiten_penalty_by_ac(pen, ac_value):
@@ -111,19 +119,85 @@ class Utility:
         return w_pen
 
     @staticmethod
-    def chunk_df_by_time(dataframe, time):
+    def chunk_df_by_time(dataframe, time, overlap=None):
         """
-        Chunk the DataFrame by time intervals.
+        Chunk the DataFrame by time intervals. The windows are located on the sorted time index and every window is
+        only sliced from the DataFrame when it is accessed (see TimeWindowPlanner).
 
         Args:
             dataframe: The pandas DataFrame to be chunked.
             time: The time interval for chunking.
+            overlap: Duration by which every chunk is extended to both sides (optional).
+
+        Returns:
+            A sequence of the chunked DataFrames, including empty chunks for intervals without data.
+        """
+        return TimeWindowPlanner(dataframe.index).windows(dataframe, time, overlap)
+
+    @staticmethod
+    def file_fingerprint(path, sample_size=1024 ** 2):
+        """
+        Calculate a cheap fingerprint of a file from its size, modification time and its first and last bytes. If the
+        file was converted into a ColumnStore, the fingerprint is the one of the meta file of the store, because the
+        store is what MobileData loads.
+
+        Args:
+            path: The path to the file.
+            sample_size: Number of bytes read from the start and the end of the file.
+
+        Returns:
+            The fingerprint as a hex string.
+        """
+        store = ColumnStore.locate(path)
+        if store is not None:
+            path = os.path.join(store, ColumnStore.META_FILE)
+        stat = os.stat(path)
+        digest = hashlib.sha256(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        with open(path, 'rb') as file:
+            digest.update(file.read(sample_size))
+            if stat.st_size > sample_size:
+                file.seek(max(stat.st_size - sample_size, sample_size))
+                digest.update(file.read(sample_size))
+        return digest.hexdigest()
+
+    @staticmethod
+    def content_hash(path):
+        """
+        Calculate the SHA-256 hash of the full content of a file or of all files of a ColumnStore.
+
+        Args:
+            path: The path to the file or store.
+
+        Returns:
+            The content hash as a hex string.
+        """
+        digest = hashlib.sha256()
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        else:
+            files = [path]
+        for file_path in files:
+            if file_path != path:
+                digest.update(os.path.basename(file_path).encode())  # the name of a column file is part of a store
+            with open(file_path, 'rb') as file:
+                for block in iter(lambda: file.read(1024 ** 2), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def config_hash(config: dict, ignored_keys=()):
+        """
+        Calculate a stable hash of a configuration.
+
+        Args:
+            config: The configuration dictionary.
+            ignored_keys: Keys that do not influence the result and are excluded from the hash.
 
         Returns:
-            A list of chunked DataFrames.
+            The hash as a hex string.
         """
-        interval = time
-        return [group for _, group in dataframe.groupby(pd.Grouper(freq=interval))]
+        normalized = {key: value for key, value in config.items() if key not in ignored_keys}
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
 
     @staticmethod
     def filter_cps_by_treshold(changepoints: list, treshold: int):
@@ -0,0 +1,135 @@
+import concurrent.futures
+import multiprocessing
+import pickle
+import threading
+import time
+import zlib
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Client
+
+
+class WorkerAgent:
+    """
+    Worker side of the DistributedExecutor.
+
+    The agent opens one connection per slot to the coordinator and runs the received tasks in a local process pool,
+    so a crashing task does not take the agent down. The results are sent back compressed.
+    """
+
+    def __init__(self, address, authkey: bytes, slots=1, compress_level=1, retry_interval=2.0):
+        """
+        Initialize the WorkerAgent.
+
+        Args:
+            address: Tuple of host and port of the coordinator.
+            authkey: The shared key of the coordinator.
+            slots: Number of tasks executed at the same time (usually the number of CPUs of the machine).
+            compress_level: zlib compression level of the results.
+            retry_interval: Seconds between two connection attempts while the coordinator is not reachable.
+        """
+        self._address = tuple(address)
+        self._authkey = authkey
+        self._slots = slots
+        self._compress_level = compress_level
+        self._retry_interval = retry_interval
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def run(self, persistent=False):
+        """
+        Execute tasks until the coordinator shuts down.
+
+        Args:
+            persistent: Whether to reconnect and wait for the next coordinator instead of returning.
+        """
+        try:
+            while True:
+                threads = [threading.Thread(target=self._run_slot, name='slot-' + str(i)) for i in range(self._slots)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                if not persistent:
+                    return
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+
+    def _get_pool(self, broken_pool=None):
+        """
+        Get the local process pool, replacing it if it broke.
+
+        Args:
+            broken_pool: The pool that broke, it is replaced unless another slot replaced it already (optional).
+
+        Returns:
+            The ProcessPoolExecutor.
+        """
+        with self._pool_lock:
+            if self._pool is None or self._pool is broken_pool:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                # spawned processes do not inherit the connections, so the coordinator notices when the agent dies
+                self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self._slots,
+                                                                    mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _connect(self):
+        """
+        Connect to the coordinator, retrying until it is reachable.
+
+        Returns:
+            The authenticated connection.
+        """
+        while True:
+            try:
+                return Client(self._address, authkey=self._authkey)
+            except (ConnectionRefusedError, ConnectionResetError, EOFError):
+                time.sleep(self._retry_interval)
+
+    def _run_slot(self):
+        """Receive and execute tasks on a single connection until the coordinator sends the stop message."""
+        connection = self._connect()
+        try:
+            while True:
+                try:
+                    payload = connection.recv_bytes()
+                except (EOFError, OSError):
+                    return  # coordinator gone
+                if not payload:
+                    return
+                pool = self._get_pool()
+                try:
+                    response = pool.submit(WorkerAgent._execute, payload, self._compress_level).result()
+                except BrokenProcessPool:
+                    self._get_pool(pool)
+                    response = zlib.compress(pickle.dumps(('lost', None)), self._compress_level)
+                try:
+                    connection.send_bytes(response)
+                except (EOFError, OSError):
+                    return
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _execute(payload, compress_level):
+        """
+        Execute a task. Runs inside a process of the local pool.
+
+        Args:
+            payload: The compressed task.
+            compress_level: zlib compression level of the result.
+
+        Returns:
+            The compressed tuple of status ('ok' or 'error') and result or exception.
+        """
+        try:
+            fn, args, kwargs = pickle.loads(zlib.decompress(payload))
+            response = ('ok', fn(*args, **kwargs))
+        except Exception as e:
+            response = ('error', e)
+        try:
+            data = pickle.dumps(response)
+        except Exception as e:  # unpicklable result or exception
+            data = pickle.dumps(('error', RuntimeError(type(e).__name__ + ': ' + str(e))))
+        return zlib.compress(data, compress_level)
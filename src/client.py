@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import urllib.error
+import urllib.request
+
+from ressources.config.config import server_config
+
+
+def request(url, payload=None):
+    """
+    Send a request to the segmentation server.
+
+    Args:
+        url: The URL of the endpoint.
+        payload: The JSON payload of a POST request (None = GET request).
+
+    Returns:
+        The decoded JSON response.
+    """
+    data = None if payload is None else json.dumps(payload).encode()
+    req = urllib.request.Request(url, data, {'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        return json.load(e)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Submit jobs to the segmentation server.')
+    parser.add_argument('--url', default='http://' + server_config['host'] + ':' + str(server_config['port']))
+    parser.add_argument('--client', default=os.environ.get('USER', 'default'), help='Name used for fair queueing')
+    parser.add_argument('--no-wait', action='store_true', help='Return the job id instead of waiting for the result')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    segment = commands.add_parser('segment', help='Segment a raw file')
+    segment.add_argument('config', help='Name of a segmentation configuration, e.g. drilling_config')
+    segment.add_argument('path', help='Path of the raw file (as seen by the server)')
+    segment.add_argument('--name', help='Name of the output file (default: file name)')
+    segment.add_argument('--set', nargs='*', default=[], metavar='KEY=VALUE',
+                         help='Override configuration entries, values are parsed as JSON')
+
+    quality = commands.add_parser('quality-test', help='Test segmented files against the ground truth')
+    quality.add_argument('config', help='Name of a test configuration, e.g. drill_test_config')
+    quality.add_argument('source_path', help='Directory of the segmented files (as seen by the server)')
+    quality.add_argument('--processes', nargs='*', help='Processes to test (default: from the test configuration)')
+
+    status = commands.add_parser('status', help='Show the status of the server or of a job')
+    status.add_argument('job_id', nargs='?')
+
+    args = parser.parse_args()
+    if args.command == 'status':
+        result = request(args.url + ('/jobs/' + args.job_id if args.job_id else '/status'))
+    else:
+        if args.command == 'segment':
+            overrides = {}
+            for item in args.set:
+                key, value = item.split('=', 1)
+                try:
+                    overrides[key] = json.loads(value)
+                except json.JSONDecodeError:
+                    overrides[key] = value
+            job = {'type': 'segmentation', 'config': args.config, 'path': args.path, 'name': args.name,
+                   'overrides': overrides}
+        else:
+            job = {'type': 'quality_test', 'config': args.config, 'source_path': args.source_path}
+            if args.processes:
+                job['processes'] = ';'.join(args.processes)
+        job['client'] = args.client
+        result = request(args.url + '/jobs' + ('' if args.no_wait else '?wait=1'), job)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,65 @@
+import argparse
+import os
+import subprocess
+import sys
+
+from ressources.config.config import import_time_budget
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import_time(module, repeats=3):
+    """
+    Measure the import time of a module in a fresh interpreter using '-X importtime'.
+
+    Args:
+        module: The name of the module.
+        repeats: Number of measurements, the fastest one is reported to reduce the noise of a cold file cache.
+
+    Returns:
+        Tuple of the total import time in seconds and a list of (seconds, name) of the direct imports of the module,
+        slowest first.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT_PATH + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    best = None
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], cwd=ROOT_PATH, env=env,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise ImportError(module + ': ' + result.stderr.strip().splitlines()[-1])
+        imports = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line.split('|')
+            imports.append((int(cumulative) / 1e6, name[1:]))
+        # the module itself is the last line; its direct imports are indented by two spaces
+        total = imports[-1][0]
+        direct = sorted(((t, n.strip()) for t, n in imports if n.startswith('  ') and not n.startswith('   ')),
+                        reverse=True)
+        if best is None or total < best[0]:
+            best = (total, direct)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report the import time of the entry points and worker bootstraps.')
+    parser.add_argument('modules', nargs='*', help='Modules to measure (default: all modules of import_time_budget)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest direct imports shown per module')
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules or import_time_budget:
+        total, direct = measure_import_time(module, args.repeats)
+        budget = import_time_budget.get(module)
+        exceeded = budget is not None and total > budget
+        print(f'{module}: {total:.3f} s' + ('' if budget is None else f' (budget {budget} s)')
+              + (' EXCEEDED' if exceeded else ''))
+        for seconds, name in direct[:args.top]:
+            print(f'    {seconds:8.3f} s  {name}')
+        if exceeded:
+            over_budget.append(module)
+
+    if over_budget:
+        sys.exit('Import time budget exceeded: ' + ', '.join(over_budget))
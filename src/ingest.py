@@ -0,0 +1,45 @@
+import asyncio
+
+from ressources.config.config import ingestion_config
+from src.classes.CPDetector import CPDetector
+from src.classes.FrameSource import SocketFrameSource, CsvTailFrameSource, SimulatedFrameSource
+from src.classes.IngestionService import IngestionService
+from ressources.exceptions.SegmentationError import SegmentationError
+
+
+def create_source(source_config: dict):
+    """
+    Create a frame source from its configuration.
+
+    Args:
+        source_config: The configuration of the source (see 'sources' of ingestion_config).
+
+    Returns:
+        The FrameSource instance.
+    """
+    source_config = dict(source_config)
+    source_type = source_config.pop('type').lower()
+    if source_type == 'socket':
+        return SocketFrameSource(**source_config)
+    if source_type == 'csv':
+        return CsvTailFrameSource(**source_config)
+    if source_type == 'simulated':
+        return SimulatedFrameSource(**source_config)
+    raise SegmentationError('Source type not defined: ' + source_type)
+
+
+def print_changepoints(result):
+    if result['changepoints']:
+        print(result['source'] + ': ' + str(result['changepoints']))
+
+
+if __name__ == '__main__':
+    config = ingestion_config
+    cpd = CPDetector(config['model'], config['algorithm'], config['jump_points'], config.get('min_segment_size'),
+                     config.get('penalty_term'), config.get('model_parameters'), config.get('estimated_cps'),
+                     config.get('window'))
+    service = IngestionService(cpd, config['window_size'], config.get('overlap', 0), config.get('workers'),
+                               config.get('max_in_flight'), on_changepoints=print_changepoints)
+    for s_conf in config['sources']:
+        service.add_source(create_source(s_conf))
+    asyncio.run(service.run())
@@ -1,17 +1,46 @@
 import os
 
-from ressources.config.config import seg_config, test_config, testing_enabled
-from src.classes.SegmentationProcessor import SegmentationProcessor
-from tests.classes.QualityTest import QualityTest
+from ressources.config.config import seg_config, test_config, testing_enabled, instrumentation_enabled, \
+    instrumentation_path, cache_path, cache_max_size, distributed_config, catalog_config, result_store_path, \
+    result_store_max_runs
 from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.DatasetCatalog import DatasetCatalog
+from src.classes.DistributedExecutor import DistributedExecutor
+from src.classes.Instrumentation import Instrumentation
+from src.classes.ResultCache import ResultCache
+from src.classes.ResultStore import ResultStore
+from src.classes.SegmentationProcessor import SegmentationProcessor
 
 if __name__ == '__main__':
-    quality_test = QualityTest()
+    instrumentation = Instrumentation(instrumentation_enabled, instrumentation_path)
+    result_store = None if result_store_path is None else ResultStore(result_store_path, result_store_max_runs)
+    if testing_enabled:
+        from tests.classes.QualityTest import QualityTest  # fastdtw is only loaded when testing is enabled
+
+        quality_test = QualityTest(instrumentation=instrumentation, result_store=result_store)
+    result_cache = None if cache_path is None else ResultCache(cache_path, cache_max_size * 1024 ** 2)
+    catalog = None
+    if catalog_config['data_root'] is not None:
+        catalog = DatasetCatalog(catalog_config['data_root'], catalog_config['index_path'],
+                                 catalog_config['name_pattern'], catalog_config['hash_content'])
+        catalog.refresh()
+    executor = None
+    if distributed_config['enabled']:
+        authkey = os.environ.get(distributed_config['authkey_env'])
+        if not authkey:
+            raise SegmentationError('Set ' + distributed_config['authkey_env'] + ' to distribute the segmentation.')
+        executor = DistributedExecutor(distributed_config['host'], distributed_config['port'], authkey.encode(),
+                                       distributed_config['max_requeues'],
+                                       worker_timeout=distributed_config['worker_timeout'])
+        print('Waiting for workers on port ' + str(executor.address[1]))
+        if not executor.wait_for_workers(distributed_config['min_workers'], distributed_config['worker_timeout']):
+            raise SegmentationError('Not enough workers connected.')
 
     # Iterate through the segmentation configurations
     for i, s_conf in enumerate(seg_config):
         # Initialize the segmentation processor with the current configuration
-        seg_proc = SegmentationProcessor(s_conf, 'Segment Number', None)
+        seg_proc = SegmentationProcessor(s_conf, 'Segment Number', None, instrumentation, result_cache, executor,
+                                         catalog, result_store)
         seg_proc.process_data()  # Process the data based on the segmentation configuration
 
         if testing_enabled:
@@ -19,30 +48,22 @@ if __name__ == '__main__':
             test_config_type = test_config[i][1]
             seg_config_type = s_conf[1]
             processes = seg_config_type['process']
-            gt_seg_nums = test_config_type['gt_seg_nums']
-            gt_thresholds = test_config_type['gt_thresholds']
-            source_path = seg_config_type['target_path']
-            target_path = test_config_type['target_path']
-
-            # Ensure ground truth information is provided
-            if gt_seg_nums is None or gt_thresholds is None or test_config_type['gt_source_path'] is None:
-                raise SegmentationError('For testing a ground truth has to be provided')
-
-            # Ensure the number of thresholds matches the number of ground truth segments
-            if len(gt_thresholds) != len(gt_seg_nums):
-                raise SegmentationError('You cannot have more thresholds than ground truths')
+            if seg_config_type.get('catalog_pattern') is not None:
+                processes = ';'.join(p.name for p in catalog.select(seg_config_type['catalog_pattern']))
 
             # If the execution type is manually set, use the processes defined in the test configuration
             if test_config_type['exec_type'] == 'manually':
                 # then the processes are set in test_config
                 processes = test_config_type['process']
 
-            # Iterate through the ground truth segment numbers and run the quality test
-            quality_test.set_ground_truth(test_config_type['gt_source_path'], gt_seg_nums[0])
-            quality_test.set_threshold(gt_thresholds[0])
-            quality_test.run_fastdtw(source_path, processes, target_path, initial_step=True)
-            source_path = target_path
-            for j in range(1, len(gt_seg_nums)):
-                quality_test.set_ground_truth(test_config_type['gt_source_path'], gt_seg_nums[j])
-                quality_test.set_threshold(gt_thresholds[j])
-                quality_test.run_fastdtw(source_path, processes, target_path, initial_step=False)
+            quality_test.run(seg_config_type['target_path'], processes, test_config_type['target_path'],
+                             test_config_type['gt_source_path'], test_config_type['gt_seg_nums'],
+                             test_config_type['gt_thresholds'], seg_proc.get_run_id())
+
+    if executor is not None:
+        executor.shutdown()
+
+    if instrumentation.enabled:
+        instrumentation.export_jsonl()
+        print(instrumentation.summary().to_string(index=False))
+        print(instrumentation.get_counters())
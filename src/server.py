@@ -0,0 +1,18 @@
+import argparse
+
+from ressources.config.config import server_config, cache_path, cache_max_size
+from src.classes.ResultCache import ResultCache
+from src.classes.SegmentationServer import SegmentationServer
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the segmentation server with warm worker processes.')
+    parser.add_argument('--host', default=server_config['host'])
+    parser.add_argument('--port', type=int, default=server_config['port'])
+    parser.add_argument('--workers', type=int, default=server_config['workers'])
+    parser.add_argument('--job-runners', type=int, default=server_config['job_runners'])
+    args = parser.parse_args()
+
+    result_cache = None if cache_path is None else ResultCache(cache_path, cache_max_size * 1024 ** 2)
+    server = SegmentationServer(args.host, args.port, args.workers, args.job_runners, result_cache,
+                                server_config['job_ttl'], server_config['max_finished_jobs'])
+    server.serve_forever()
@@ -0,0 +1,20 @@
+import argparse
+import os
+
+from ressources.config.config import distributed_config
+from ressources.exceptions.SegmentationError import SegmentationError
+from src.classes.WorkerAgent import WorkerAgent
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a worker agent that processes chunks for a coordinator.')
+    parser.add_argument('--host', default=distributed_config['host'], help='Host of the coordinator')
+    parser.add_argument('--port', type=int, default=distributed_config['port'], help='Port of the coordinator')
+    parser.add_argument('--slots', type=int, default=os.cpu_count() or 1, help='Chunks processed at the same time')
+    parser.add_argument('--persistent', action='store_true', help='Wait for the next run after the coordinator stops')
+    args = parser.parse_args()
+
+    authkey = os.environ.get(distributed_config['authkey_env'])
+    if not authkey:
+        raise SegmentationError('Set ' + distributed_config['authkey_env'] + ' to the key of the coordinator.')
+    print('Worker with ' + str(args.slots) + ' slots connecting to ' + args.host + ':' + str(args.port))
+    WorkerAgent((args.host, args.port), authkey.encode(), args.slots).run(args.persistent)
@@ -1,22 +1,31 @@
 import os
-from fastdtw import fastdtw
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from src.classes.PlotReducer import PlotReducer
+from src.classes.ResultStore import ResultStore
 from src.classes.Utility import Utility
+from src.classes.Instrumentation import Instrumentation
+from ressources.exceptions.SegmentationError import SegmentationError
 
 
 class QualityTest:
 
-    def __init__(self, threshold=0.1):
+    def __init__(self, threshold=0.1, instrumentation: Instrumentation = None, result_store: ResultStore = None):
         """
         Initialize the QualityTest instance.
 
         Args:
             threshold: The similarity score threshold for rejecting segments.
+            instrumentation: Instrumentation used to record spans and counters of the test stages (optional).
+            result_store: ResultStore the similarity scores and rejections are recorded in for the run passed to
+                          'run' (optional).
         """
+        self._result_store = result_store
+        self._run_id = None
+        self._ground_truth_name = None
         self._ground_truth = None
         self._threshold = threshold
+        self._instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
 
     def _calc_similarity_score(self, segment):
         """
@@ -28,6 +37,8 @@ class QualityTest:
         Returns:
             The mean similarity score.
         """
+        from fastdtw import fastdtw  # only loaded on first use
+
         dtw_distances = []
         segment = Utility.scale_data(segment)
         gt = Utility.scale_data(self._ground_truth)
@@ -59,8 +70,7 @@ class QualityTest:
         if sim_score < self._threshold:
             pass_val = abs(segment_num)  # Make segment number positive
             data.loc[data['Segment Number'] == segment_num, 'Segment Number'] = pass_val
-            print('File/Segment: ' + process + '/' + str(
-                pass_val) + ' has passed due to similarity score of: ' + str(sim_score) + '.')
+            self._instrumentation.count('segments_passed')
         return data
 
     def _process_file(self, full_path_src, full_path_target, initial_step):
@@ -72,20 +82,32 @@ class QualityTest:
             full_path_target: The target file path.
             initial_step: If True, all segment numbers are negated to mark them as rejected.
         """
+        instr = self._instrumentation
+        process = os.path.basename(full_path_src)
         # Load and process data
-        data = self._load_data(full_path_src)
+        with instr.span('test_load', process=process):
+            data = self._load_data(full_path_src)
         if initial_step:
             data = self._mark_data_as_rejected(data)
         unique_segments = data['Segment Number'].unique()
+        instr.count('segments_tested', len(unique_segments))
 
         # Calculate similarity scores for each segment
-        for segment_num in unique_segments:
-            segment_data = data[data['Segment Number'] == segment_num]
-            sim_score = self._calc_similarity_score(segment_data)
-            data = self._reject_false_segments(sim_score, data, segment_num, os.path.basename(full_path_src))
+        scores = []
+        with instr.span('test_similarity', process=process):
+            for segment_num in unique_segments:
+                segment_data = data[data['Segment Number'] == segment_num]
+                sim_score = self._calc_similarity_score(segment_data)
+                data = self._reject_false_segments(sim_score, data, segment_num, process)
+                scores.append((abs(segment_num), sim_score, segment_num > 0 or sim_score < self._threshold))
+
+        if self._result_store is not None and self._run_id is not None:
+            self._result_store.record_quality(self._run_id, os.path.splitext(process)[0], scores,
+                                              self._ground_truth_name)
 
         # save file to target
-        data.to_csv(full_path_target, index=True)
+        with instr.span('test_write', process=process):
+            data.to_csv(full_path_target, index=True)
 
     def run_fastdtw(self, source_path, file='all', target_path=None, initial_step=True):
         """
@@ -122,6 +144,41 @@ class QualityTest:
                 full_path_target = os.path.join(target_path, process + '.csv')
                 self._process_file(full_path_src, full_path_target, initial_step)
 
+    def run(self, source_path, processes, target_path, gt_source_path, gt_seg_nums, gt_thresholds, run_id=None):
+        """
+        Run the quality test for every ground truth segment. The first run rejects all segments, every run passes the
+        segments similar to its ground truth segment.
+
+        Args:
+            source_path: The directory containing the segmented files.
+            processes: Specific file(s) to process, or 'all' to process all files.
+            target_path: The directory to save the tested files.
+            gt_source_path: The path to the file containing the ground truth segments.
+            gt_seg_nums: List of the ground truth segment numbers.
+            gt_thresholds: List of the similarity thresholds of the ground truth segments.
+            run_id: The run of the result store the segmented files belong to (optional).
+
+        Raises:
+            SegmentationError: If the ground truth is incomplete.
+        """
+        # Ensure ground truth information is provided
+        if gt_seg_nums is None or gt_thresholds is None or gt_source_path is None:
+            raise SegmentationError('For testing a ground truth has to be provided')
+
+        # Ensure the number of thresholds matches the number of ground truth segments
+        if len(gt_thresholds) != len(gt_seg_nums):
+            raise SegmentationError('You cannot have more thresholds than ground truths')
+
+        # Iterate through the ground truth segment numbers and run the quality test
+        self._run_id = run_id
+        self.set_ground_truth(gt_source_path, gt_seg_nums[0])
+        self.set_threshold(gt_thresholds[0])
+        self.run_fastdtw(source_path, processes, target_path, initial_step=True)
+        for j in range(1, len(gt_seg_nums)):
+            self.set_ground_truth(gt_source_path, gt_seg_nums[j])
+            self.set_threshold(gt_thresholds[j])
+            self.run_fastdtw(target_path, processes, target_path, initial_step=False)
+
     def _mark_data_as_rejected(self, data):
         """
         Mark all segment numbers as rejected by negating them.
@@ -162,26 +219,33 @@ class QualityTest:
         data = self._load_data(source_path)
         gt = data.loc[data['Segment Number'] == segment_num]
         self._ground_truth = gt
+        self._ground_truth_name = os.path.basename(source_path) + '#' + str(segment_num)
 
-    def plot_rejected_segments(self, data):
+    def plot_rejected_segments(self, data, max_points=PlotReducer.MAX_POINTS, method='lttb'):
         """
-        Plot all rejected segments for visualization.
+        Plot all rejected segments for visualization, downsampled to the resolution of the figure.
 
         Args:
             data: The dataset containing the rejected segments.
+            max_points: The maximum number of points drawn per column.
+            method: The reduction method ('lttb' or 'minmax').
         """
-        rejected_segments = data[data['Segment Number'] < 0]['Segment Number'].unique()
-
-        for segment_num in rejected_segments:
-            segment_data = data[data['Segment Number'] == segment_num]
-            plt.figure(figsize=(12, 6))
-            plt.plot(segment_data.index, segment_data['Bending Moment'], label='Bending Moment')
-            plt.plot(segment_data.index, segment_data['Axial Force'], label='Axial Force')
-            plt.plot(segment_data.index, segment_data['Torsion'], label='Torsion')
-            plt.xlabel('Time')
-            plt.ylabel('Values')
-            plt.title(f'Rejected Segment: {abs(segment_num)}')
-            plt.legend()
+        import matplotlib.pyplot as plt  # only loaded on first use
+
+        # the segments are contiguous runs of the segment number, so they are sliced by position instead of masking
+        # the whole dataset once per segment
+        labels = data['Segment Number'].to_numpy()
+        starts = PlotReducer.run_starts(labels)
+        ends = np.append(starts[1:], len(labels))
+        columns = ['Bending Moment', 'Axial Force', 'Torsion']
+
+        for start, end in zip(starts, ends):
+            segment_num = labels[start]
+            if segment_num >= 0:
+                continue
+            segment_data = data[columns].iloc[start:end]
+            PlotReducer.plot(segment_data, title=f'Rejected Segment: {abs(segment_num)}', ylabel='Values',
+                             max_points=max_points, method=method, figsize=(12, 6))
             plt.tight_layout()
             plt.show()
 
@@ -0,0 +1,30 @@
+import os
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+from src.classes.ColumnStore import ColumnStore
+from src.classes.DatasetCatalog import DatasetCatalog
+
+
+def _recording(rows):
+    index = pd.date_range('2024-01-01', periods=rows, freq='10ms', name='time')
+    values = np.zeros((rows, 3))
+    return pd.DataFrame(values, index=index, columns=['Bending Moment', 'Axial Force', 'Torsion'])
+
+
+def test_converted_only_recording_is_found_by_csv_path(tmp_path):
+    data_root = tmp_path / 'data'
+    data_root.mkdir()
+    _recording(50).reset_index().to_csv(data_root / 'process_1.csv', index=False)
+    ColumnStore.write(ColumnStore.store_path(str(data_root / 'process_2.csv')), _recording(200))
+    catalog = DatasetCatalog(str(data_root), str(tmp_path / 'index.json'), hash_content=False)
+    catalog.refresh()
+    process = Enum('Process', {'PROCESS_1': str(data_root / 'process_1.csv'),
+                               'PROCESS_2': str(data_root / 'process_2.csv')})
+    assert not os.path.exists(process.PROCESS_2.value)
+    assert catalog.get_entry(process.PROCESS_2.value)['rows'] == 200
+    assert catalog.get_entry(process.PROCESS_2.value)['name'] == 'PROCESS_2'
+    assert catalog.order_by_size(list(process)) == [process.PROCESS_2, process.PROCESS_1]
+    assert catalog.estimate_chunks(process.PROCESS_2.value, 100, 10) == 3
@@ -0,0 +1,56 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.classes.CPDetector import CPDetector
+from src.classes.FrameSource import FrameSource
+from src.classes.IngestionService import IngestionService
+
+
+class ArrayFrameSource(FrameSource):
+
+    def __init__(self, name, frames, batch_size=100):
+        super().__init__(name, frames.shape[1])
+        self._frames = frames
+        self._batch_size = batch_size
+
+    async def frames(self):
+        for start in range(0, len(self._frames), self._batch_size):
+            yield self._frames[start:start + self._batch_size]
+
+
+def _jump(n_frames, jump):
+    rng = np.random.default_rng(0)
+    frames = rng.normal(0, 1, (n_frames, 3))
+    frames[jump:] += 10
+    return frames
+
+
+def _run(service, sources):
+    results = []
+    service._on_changepoints = results.append
+    for source in sources:
+        service.add_source(source)
+    asyncio.run(service.run())
+    return results
+
+
+@pytest.mark.parametrize('n_frames', [1000, 1001])
+def test_stream_ending_on_window_boundary_keeps_tail(n_frames):
+    service = IngestionService(CPDetector('l2', 'PELT', 5, 1, 'BIC', 2, 10), window_size=400, overlap=100,
+                               num_workers=1, scale=False)
+    results = _run(service, [ArrayFrameSource('S', _jump(n_frames, 950))])
+    assert sorted(cp for result in results for cp in result['changepoints']) == [950]
+
+
+def test_callback_error_is_raised():
+    def fail(result):
+        if result['window'] == 0:
+            raise RuntimeError('callback failed')
+
+    service = IngestionService(CPDetector('l2', 'PELT', 5, 1, 'BIC', 2, 10), window_size=400, overlap=100,
+                               num_workers=1, on_changepoints=fail, scale=False)
+    service.add_source(ArrayFrameSource('S', _jump(3000, 950)))
+    with pytest.raises(RuntimeError, match='callback failed'):
+        asyncio.run(service.run())